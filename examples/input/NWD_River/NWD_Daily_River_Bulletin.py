@@ -33,7 +33,7 @@
 from time                   import mktime, localtime
 from subprocess             import Popen
 import java.lang
-import os, sys, inspect, datetime, time, RADARAPI, DBAPI
+import os, sys, inspect, datetime, time, RADARAPI, DBAPI, PrefetchPlanner
 
 # -------------------------------------------------------------------
 # Import database pathnames and plotting functions
@@ -90,7 +90,7 @@
     importlib.reload(Server_Utils)
 else:
     reload(Server_Utils)
-from Server_Utils import lineNo, outputDebug, retrieveLocationLevel, retrievePublicName, retrieveElevatonDatum
+from Server_Utils import lineNo, outputDebug, preloadLocationLevels, retrieveLocationLevel, retrievePublicName, retrieveElevatonDatum
 
 #
 # Input
@@ -144,8 +144,8 @@ def bulletinFooter( debug,  # Set to True to print all debug statements
 def checkTs(timeseries,
             conn,) :
     if isinstance(conn, RADARAPI.RadarAccess):
-        result = conn.getCatalogedPathnames(timeseries)
-        if len(result) > 0:
+        # Answered from the catalog snapshot loaded once per session
+        if conn.exists(timeseries):
             return 'true'
         else:
             return 'false'
@@ -382,10 +382,10 @@ def table1Data( debug,      # Set to True to print all debug statements
                     if checkTs(TscPathname, conn) == 'true' or project in ['CAFE'] :
                         if project not in ['SYS'] :
                             try :
-                                Tsc = CwmsDb.get(TscPathname, startTime, endTime)
-
-                                PrevElev = Tsc.values[-1] # Previous day's midnight value
-                                Prev2xElev = Tsc.values[0] # 2 days previous midnight value
+                                # Only the two midnight values are needed, not the whole window
+                                Prev2xElev, PrevElev = CwmsDb.getValuesAt(TscPathname, [startTime, endTime])[TscPathname]
+                                if PrevElev is None : PrevElev = Constants.UNDEFINED # Previous day's midnight value
+                                if Prev2xElev is None : Prev2xElev = Constants.UNDEFINED # 2 days previous midnight value
                             
                                 # If previous day's value is missing raise an exception and using the missing value
                                 outputDebug(debug, lineNo(), 'PrevElev = ', PrevElev, '\tPrev2xElev = ', Prev2xElev)
@@ -593,16 +593,17 @@ def table1Data( debug,      # Set to True to print all debug statements
                     else :
                         TscPathname = DataBlockDict['DataBlocks'][TableDataName][data] % project
 
-                    if checkTs(TscPathname, conn) == 'true' :
-                    #if TscPathname in DbPathnameList :
-                        # Set database time zone to GMT-6 so met data can be retrieved
-                        try :
-                            Value = 0.
-                            CellData = Phrase(Chunk(Missing, TextFont))
-                            Tsc = CwmsDb.get(TscPathname, startTime, endTime)
-            
-                            if Tsc != Null :
-                                Value = Tsc.values[-1]
+                    # A single retrieval answers both whether the time series exists and its values
+                    # Set database time zone to GMT-6 so met data can be retrieved
+                    try :
+                        Value = 0.
+                        CellData = Phrase(Chunk(Missing, TextFont))
+                        Tsc = CwmsDb.get(TscPathname, startTime, endTime, missing='none')
+                        if Tsc is None :
+                            #Timeseries not found in the database, set value to Null
+                            CellData = Phrase(Chunk(Null, TextFont))
+                        else :
+                            Value = Tsc.values[-1]
                             
                             if project in ['CAFE'] and data == 'Precip' :
                                 CellData = Phrase(Chunk(Null, TextFont))
@@ -620,15 +621,12 @@ def table1Data( debug,      # Set to True to print all debug statements
                                 else :
                                     CellData = Phrase(Chunk(Missing, TextFont))
             
-                        except Exception as e :
-                            print("AirTemp/Precip Exception = " + str(e) + "; Tsc = " + TscPathname)
-                            CellData = Phrase(Chunk(Missing, TextFont))
-                        
-                        # Reset database time zone to US/Central
-                        #CwmsDb.setTimeZone('US/Central')
-                    else :
-                        #Timeseries not found in the database, set value to Null
-                        CellData = Phrase(Chunk(Null, TextFont))
+                    except Exception as e :
+                        print("AirTemp/Precip Exception = " + str(e) + "; Tsc = " + TscPathname)
+                        CellData = Phrase(Chunk(Missing, TextFont))
+                    
+                    # Reset database time zone to US/Central
+                    #CwmsDb.setTimeZone('US/Central')
                 else :
                     #Precip set to None
                     if project in ['SYS'] and data == 'Precip':
@@ -960,14 +958,31 @@ def titleBlock( debug,      # Set to True to print all debug statements
     outputDebug(debug, lineNo(), 'Start of Time Window = ', StartTwStr, '\tEnd of Time Window = ', EndTwStr, 
         '\tProject Date and Time = ', ProjectDateTimeStr)
     
+    # Every location used in the bulletin
+    locations = list(LocationDict.keys())
+    ProjectList = []
+    for TableDataName in DataBlockDict['DataBlocks'] :
+        ProjectList.extend(DataBlockDict['DataBlocks'][TableDataName].get('ProjectList', []))
+
     #
-    # Open database connection
+    # Open database connection; with CDA the catalog, units and location records start loading in the background
     #
-    CwmsDb = RADARAPI.open(office=OFFICE, url=CDA_URL) if USE_CDA else DBAPI.open()
+    CwmsDb = RADARAPI.open(office=OFFICE, url=CDA_URL, accessLog=True, bootstrap=locations + ProjectList) if USE_CDA else DBAPI.open(accessLog=True)
     CwmsDb.setTimeZone('UTC')
     CwmsDb.setTimeWindow(StartTwStr, EndTwStr)
     CwmsDb.setOfficeId(OFFICE)
     CwmsDb.setTrimMissing(False)
+    # Reuse values retrieved by previous runs; only the recent tail of each window is fetched again
+    if os.path.isdir('/data') :
+        CwmsDb.enableDiskCache(os.path.join('/data', 'tscache'))
+    # Load the units of every parameter used in the data blocks up front, in one pass
+    TsTemplates = []
+    for TableDataName in DataBlockDict['DataBlocks'] :
+        for value in DataBlockDict['DataBlocks'][TableDataName].values() :
+            for item in (value if isinstance(value, list) else [value]) :
+                if isinstance(item, str) and item.count('.') == 5 :
+                    TsTemplates.append(item)
+    CwmsDb.preloadParameterUnits(TsTemplates)
 
     if USE_CDA:
         conn = CwmsDb
@@ -980,7 +995,28 @@ def titleBlock( debug,      # Set to True to print all debug statements
     # 
     # Retrieve public names for all projects shown in bulletin. Remove 'Reservoir' from public name for spacing purposes
     #
-    locations = list(LocationDict.keys())
+    # Retrieve the records of every location used in the bulletin in one bulk call; later lookups are served from the cache
+    CwmsDb.getLocations(locations + ProjectList, unitSystem='EN')
+    # Retrieve the flood stages of all data block projects in one batch
+    FloodStageIds = []
+    for TableDataName in DataBlockDict['DataBlocks'] :
+        FloodStage = DataBlockDict['DataBlocks'][TableDataName].get('FloodStage')
+        if isinstance(FloodStage, str) :
+            FloodStageIds.extend([FloodStage % project for project in DataBlockDict['DataBlocks'][TableDataName].get('ProjectList', [])])
+    if FloodStageIds :
+        preloadLocationLevels(debug, CwmsDb, FloodStageIds)
+    # Retrieve the time series read by the data blocks in parallel batches, so the table code is served from memory
+    Planner = PrefetchPlanner.PrefetchPlanner()
+    for TableDataName in DataBlockDict['DataBlocks'] :
+        DataBlockInfo = DataBlockDict['DataBlocks'][TableDataName]
+        if TableDataName == 'Table1Data1' :
+            PlanStartTime, PlanEndTime = StartMainStem, EndMainStem
+        else :
+            PlanStartTime, PlanEndTime = StartTribTwStr, EndTribStr
+        for data in ['FlowIn', 'Storage', 'Precip', 'AirTempMax', 'AirTempMin'] :
+            Planner.add(DataBlockInfo.get(data), DataBlockInfo.get('ProjectList', []), PlanStartTime, PlanEndTime)
+    PrefetchSummary = Planner.prefetch(CwmsDb)
+    outputDebug(debug, lineNo(), 'Prefetch = ', PrefetchSummary)
     for location in locations :
         PublicName = retrievePublicName(debug, conn, CwmsDb, location)
         BulletinName = PublicName.replace(' & Reservoir', '')
@@ -1117,6 +1153,10 @@ def titleBlock( debug,      # Set to True to print all debug statements
     except : pass
     try : CsvFile.close()
     except : pass
+    # Per-method call counts and timings for this run
+    if USE_CDA :
+        try : RADARAPI.writeMetricsSummary(os.path.join(OutputDirectory, 'NWD_Daily_River_Bulletin_metrics.json'))
+        except : pass
     try : BulletinTsFile.close()
     except : pass
     try : BulletinProperties.close()
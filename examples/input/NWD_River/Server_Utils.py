@@ -13,9 +13,6 @@
 from hec.script             import Constants, AxisMarker
 from hec.script.Constants   import TRUE, FALSE
 from wcds.dbi.oracle        import CwmsDaoServiceLookup
-from hec.db.cwms            import CwmsLocationDao, CwmsLevelDao
-from mil.army.usace.hec.metadata.location import LocationTemplate
-from hec.data.level         import JDomLocationLevelImpl
 import inspect, math
 from java.text              import SimpleDateFormat
 import RADARAPI
@@ -330,48 +327,38 @@ def retrieveElevatonDatum(  debug,          # Set to True to print all debug sta
                             BaseLocation,   # Full name of time series container
                             ) :
     ElevationDatum = 'None'
-    if isinstance(conn, RADARAPI.RadarAccess):
-        try :
-            dak = conn._factory.getDataAccessKey("retrieveLocation")
-            location_dao = CwmsDaoServiceLookup.getDao(CwmsLocationDao, conn._factory.getDbConnection())
+    # Location records are retrieved in bulk and cached by the DBAPI/RADARAPI object
+    Location = CwmsDb.getLocation(BaseLocation, unitSystem='EN')
+    if Location is not None and Location['elevation'] is not None :
+        ElevationDatum = str(Location['elevation'])
+    return ElevationDatum
 
-            loc = LocationTemplate(conn.getOfficeId(), BaseLocation)
-            location = location_dao.retrieveLocation(dak, loc)
-            ElevationDatum = str(location.getElevation())
-        except :
-            pass
-    else:
-        rs = None
-        try :
-            stmt = conn.prepareStatement('''
-                                        select distinct
-                                        bl.elevation as base_location_elevation
-                                        from cwms_v_loc loc
-                                        inner join cwms_v_loc bl on bl.base_location_code = loc.base_location_code
-                                            and bl.db_office_id = loc.db_office_id
-                                            and bl.unit_system = loc.unit_system
-                                        where loc.UNIT_SYSTEM = 'EN'
-                                            and loc.db_office_id = :1
-                                            and bl.location_id = :2
-                                        ''')
-            stmt.setString(1, CwmsDb.getOfficeId())
-            stmt.setString(2, BaseLocation)
-            rs = stmt.executeQuery()
+#
+# locationLevelUnits Function       : Units used to retrieve a location level
+#
+def locationLevelUnits( LevelId,        # Location level id
+                        ) :
+    Parameter = LevelId.split('.')[1]
+    if Parameter == 'Stor' : return 'ac-ft'
+    elif Parameter == 'Elev' or Parameter == 'Stage' : return 'ft'
+    elif Parameter == 'Flow' : return 'cfs'
+    return None
 
-            while next(rs) :
-                ElevationDatum = str(rs.getString(1))
-                break
-        except java.lang.Exception as e:
-            # Java exceptions must be explicitly named
-            # raise a regular python exception to pass it through
-            raise Exception(e)
-        finally :
-            try :
-                stmt.close()
-                if rs: rs.close()
-            except :
-                pass
-    return ElevationDatum
+#
+# preloadLocationLevels Function    : Retrieves many location levels in one batch so later calls to retrieveLocationLevel are cached
+#
+def preloadLocationLevels(  debug,          # Set to True to print all debug statements
+                            CwmsDb,         # DBAPI connection
+                            LevelIds,       # List of location level ids
+                            ) :
+    import datetime
+
+    CurDate         = datetime.datetime.now() # Current date
+    StartTimeStr    = CurDate.strftime('%d%b%Y ') + '0000' # Start date formatted as ddmmmyyy 0000
+    Units           = dict([(LevelId, locationLevelUnits(LevelId)) for LevelId in LevelIds])
+    LocationLevels  = CwmsDb.getLocationLevels(LevelIds, StartTimeStr, Units)
+    outputDebug(debug, lineNo(), 'Preloaded location levels = ', LocationLevels)
+    return LocationLevels
 
 #
 # retrieveLocationLevel Function    : Retrieves reservoir zone data
@@ -387,64 +374,13 @@ def retrieveLocationLevel(  debug,          # Set to True to print all debug sta
     
     CurDate         = datetime.datetime.now() # Current date
     StartTimeStr    = CurDate.strftime('%d%b%Y ') + '0000' # Start date formatted as ddmmmyyy 0000
-    EndTimeStr      = CurDate.strftime('%d%b%Y ') + '0000' # End date formatted as ddmmmyyy 0000
 
-    level_1a = TimeSeriesContainer()
-    level_1a_parts = TscFullName.split('.')
-    level_1aId_parts = level_1a_parts[:]
-    level_1aId = '.'.join(level_1aId_parts)
-    outputDebug(debug, lineNo(), 'level_1a_parts = ', level_1a_parts, '\tlevel_1aId_parts = ', level_1aId_parts, 
-        '\n\t\tlevel_1aId = ', level_1aId)
-    
-    level_1a.fullName  = TscFullName
-    level_1a.location  = level_1a_parts[0]
-    level_1a.parameter = level_1a_parts[1]
-    level_1a.interval  = 0
-    level_1a.version   = level_1a_parts[-1]
-    if level_1a_parts[1] == 'Stor' : level_1a.units = 'ac-ft'
-    elif level_1a_parts[1] == 'Elev' or level_1a_parts[1] == 'Stage' : level_1a.units = 'ft'
-    elif level_1a_parts[1] == 'Flow' : level_1a.units = 'cfs'
-    level_1a.type      = 'INST-VAL'
+    level_1aId = TscFullName
+    level_1aUnits = locationLevelUnits(level_1aId)
+    outputDebug(debug, lineNo(), 'level_1aId = ', level_1aId, '\tlevel_1aUnits = ', level_1aUnits)
    
-    LocationLevel = None
-    if isinstance(conn, RADARAPI.RadarAccess):
-        try:
-            dak = conn._factory.getDataAccessKey("retrieveLocationLevel")
-            level_dao = CwmsDaoServiceLookup.getDao(CwmsLevelDao, conn._factory.getDbConnection())
-
-            if level_dao is not None:
-                ll = JDomLocationLevelImpl(conn.getOfficeId(), level_1aId, SimpleDateFormat("ddMMMyyyy HHmm").parse(StartTimeStr), level_1a.units, None, None, None)
-                LocationLevel = level_dao.retrieveLocationLevel(dak, ll)
-        except :
-            pass
-    else:
-        rs = None
-        try :
-            stmt = conn.prepareStatement('''
-                                  select * from table(cwms_level.retrieve_location_level_values(
-                                  p_location_level_id => :1,
-                                  p_level_units       => :2,
-                                  p_start_time        => to_date(:3, 'ddmonyyyy hh24mi'),
-                                  p_end_time          => to_date(:4, 'ddmonyyyy hh24mi'),
-                                  p_timezone_id       => :5))
-                            ''')   
-            stmt.setString(1, level_1aId)
-            stmt.setString(2, level_1a.units)
-            stmt.setString(3, StartTimeStr)
-            stmt.setString(4, EndTimeStr)
-            stmt.setString(5, CwmsDb.getTimeZoneName())
-            rs = stmt.executeQuery()
-            
-            while next(rs) : 
-                LocationLevel = rs.getDouble(2)
-                break
-        except java.lang.Exception as e:
-            # Java exceptions must be explicitly named
-            # raise a regular python exception to pass it through
-            raise Exception(e)
-        finally :
-            stmt.close()
-            if rs: rs.close()
+    # Location levels are retrieved in batches and cached by effective date by the DBAPI/RADARAPI object
+    LocationLevel = CwmsDb.getLocationLevel(level_1aId, StartTimeStr, level_1aUnits)
         
     return LocationLevel
 #
@@ -458,46 +394,10 @@ def retrieveLongName(   debug,          # Set to True to print all debug stateme
                         BaseLocation,   # Full name of time series container
                         ) :
     LongName = BaseLocation
-    if isinstance(conn, RADARAPI.RadarAccess):
-        try :
-            dak = conn._factory.getDataAccessKey("retrieveLocation")
-            location_dao = CwmsDaoServiceLookup.getDao(CwmsLocationDao, conn._factory.getDbConnection())
-
-            loc = LocationTemplate(conn.getOfficeId(), BaseLocation)
-            location = location_dao.retrieveLocation(dak, loc)
-            LongName = location.getLongName()
-        except :
-            pass
-    else:
-        rs = None
-        try :
-            stmt = conn.prepareStatement('''
-                                        select distinct
-                                        bl.long_name as base_location_long_name
-                                        from cwms_v_loc loc 
-                                        inner join cwms_v_loc bl on bl.base_location_code = loc.base_location_code
-                                            and bl.db_office_id = loc.db_office_id 
-                                            and bl.unit_system = loc.unit_system
-                                        where loc.UNIT_SYSTEM = 'EN' 
-                                            and loc.db_office_id = :1 
-                                            and bl.location_id = :2
-                                        ''')   
-            stmt.setString(1, CwmsDb.getOfficeId())
-            stmt.setString(2, BaseLocation)
-            rs = stmt.executeQuery()
-            
-            while next(rs) : 
-                LongName = str(rs.getString(1))
-                break 
-        except java.lang.Exception as e:
-            # Java exceptions must be explicitly named
-            # raise a regular python exception to pass it through
-            raise Exception(e)
-        finally :
-            stmt.close()
-            if rs:
-                rs.close()
-        
+    # Location records are retrieved in bulk and cached by the DBAPI/RADARAPI object
+    Location = CwmsDb.getLocation(BaseLocation, unitSystem='EN')
+    if Location is not None and Location['longName'] :
+        LongName = str(Location['longName'])
     return LongName
 
 #
@@ -511,45 +411,9 @@ def retrievePublicName( debug,          # Set to True to print all debug stateme
                         BaseLocation,   # Full name of time series container
                         ) :
     PublicName = BaseLocation
-
-    if isinstance(conn, RADARAPI.RadarAccess):
-        try :
-            dak = conn._factory.getDataAccessKey("retrieveLocation")
-            location_dao = CwmsDaoServiceLookup.getDao(CwmsLocationDao, conn._factory.getDbConnection())
-
-            loc = LocationTemplate(conn.getOfficeId(), BaseLocation)
-            location = location_dao.retrieveLocation(dak, loc)
-            PublicName = location.getPublicName()
-        except :
-            pass
-    else:
-        rs = None
-        try :
-            stmt = conn.prepareStatement('''
-                                        select distinct
-                                        bl.public_name as base_location_public_name
-                                        from cwms_v_loc loc 
-                                        inner join cwms_v_loc bl on bl.base_location_code = loc.base_location_code
-                                            and bl.db_office_id = loc.db_office_id 
-                                            and bl.unit_system = loc.unit_system
-                                        where loc.UNIT_SYSTEM = 'EN' 
-                                            and loc.db_office_id = :1 
-                                            and bl.location_id = :2
-                                        ''')   
-            stmt.setString(1, CwmsDb.getOfficeId())
-            stmt.setString(2, BaseLocation)
-            rs = stmt.executeQuery()
-            
-            while next(rs) : 
-                PublicName = str(rs.getString(1))
-                break 
-        except java.lang.Exception as e:
-            # Java exceptions must be explicitly named
-            # raise a regular python exception to pass it through
-            raise Exception(e)
-        finally :
-            stmt.close()
-            if rs: rs.close()
-        
+    # Location records are retrieved in bulk and cached by the DBAPI/RADARAPI object
+    Location = CwmsDb.getLocation(BaseLocation, unitSystem='EN')
+    if Location is not None and Location['publicName'] :
+        PublicName = str(Location['publicName'])
     return PublicName
 
@@ -0,0 +1,129 @@
+'''
+This module provides an asyncio facade over RADARAPI for reports run on CPython
+through the JPype launcher. It is not available under Jython.
+
+The blocking RadarAccess calls run on a dedicated thread pool, and a semaphore
+bounds the number of requests in flight, so a report can overlap many CDA
+requests with its own layout work:
+
+   db = RADARAPI.aopen(office=OFFICE, url=CDA_URL)
+   tscs = await asyncio.gather(*[db.get(tsId, start, end) for tsId in tsIds])
+   await db.close()
+
+Version History
+
+   22.1  18Oct2026   Original version
+
+'''
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+
+import RADARAPI
+
+DEFAULT_MAX_CONCURRENCY = 8
+
+class AsyncRadarAccess :
+	'''
+	Awaitable wrapper around a RadarAccess object. Methods that read from the server are
+	coroutines; any other attribute is passed through to the wrapped object.
+	'''
+	def __init__(self, db, maxConcurrency=DEFAULT_MAX_CONCURRENCY) :
+		maxConcurrency = int(maxConcurrency)
+		if maxConcurrency < 1 :
+			raise ValueError("Maximum concurrency must be a positive integer")
+		self._db = db
+		self._executor = ThreadPoolExecutor(max_workers=maxConcurrency, thread_name_prefix="RADARAPI-aio")
+		self._semaphore = asyncio.Semaphore(maxConcurrency)
+		self._db.setConcurrentReads(True)
+
+	def __getattr__(self, name) :
+		return getattr(self._db, name)
+
+	async def __aenter__(self) :
+		return self
+
+	async def __aexit__(self, excType, excValue, tb) :
+		await self.close()
+
+	def getRadarAccess(self) :
+		'''
+		Return the wrapped blocking RadarAccess object
+		'''
+		return self._db
+
+	async def _call_(self, func, *args, **kwargs) :
+		'''
+		Run a blocking call on the executor, bounded by the semaphore
+		'''
+		async with self._semaphore :
+			loop = asyncio.get_running_loop()
+			return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+	async def get(self, *args, **kwargs) :
+		'''
+		Awaitable RadarAccess.get()
+		'''
+		return await self._call_(self._db.get, *args, **kwargs)
+
+	async def read(self, *args, **kwargs) :
+		'''
+		Awaitable RadarAccess.read()
+		'''
+		return await self._call_(self._db.read, *args, **kwargs)
+
+	async def getTimeSeriesContainer(self, *args, **kwargs) :
+		'''
+		Awaitable RadarAccess.getTimeSeriesContainer()
+		'''
+		return await self._call_(self._db.getTimeSeriesContainer, *args, **kwargs)
+
+	async def getTimeSeriesContainers(self, *args, **kwargs) :
+		'''
+		Awaitable RadarAccess.getTimeSeriesContainers()
+		'''
+		return await self._call_(self._db.getTimeSeriesContainers, *args, **kwargs)
+
+	async def getRating(self, *args) :
+		'''
+		Awaitable RadarAccess.getRating()
+		'''
+		return await self._call_(self._db.getRating, *args)
+
+	async def readRating(self, *args) :
+		'''
+		Awaitable RadarAccess.readRating()
+		'''
+		return await self._call_(self._db.readRating, *args)
+
+	async def getCatalogedPathnames(self, *args) :
+		'''
+		Awaitable RadarAccess.getCatalogedPathnames()
+		'''
+		return await self._call_(self._db.getCatalogedPathnames, *args)
+
+	async def getMany(self, ids, *args, **kwargs) :
+		'''
+		Get each of a list of identifiers concurrently with the same remaining arguments. Returns
+		the results in the order of the identifiers, with an exception object in place of the
+		result of any identifier that failed
+		'''
+		return await asyncio.gather(*[self.get(id, *args, **kwargs) for id in ids], return_exceptions=True)
+
+	async def close(self) :
+		'''
+		Wait for outstanding calls, then close the executor and the RadarAccess object
+		'''
+		loop = asyncio.get_running_loop()
+		await loop.run_in_executor(None, functools.partial(self._executor.shutdown, wait=True))
+		self._db.close()
+
+
+def open(*args, **kwargs) :
+	'''
+	Return a new AsyncRadarAccess object. The maxConcurrency keyword argument sets the number
+	of requests that may be in flight at once; all other arguments are passed to RADARAPI.open()
+	'''
+	maxConcurrency = kwargs.pop("maxConcurrency", DEFAULT_MAX_CONCURRENCY)
+	return AsyncRadarAccess(RADARAPI.open(*args, **kwargs), maxConcurrency)
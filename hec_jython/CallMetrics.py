@@ -0,0 +1,170 @@
+'''
+This module keeps in-process call statistics for the RADARAPI instrumentation
+and writes an end-of-run summary as JSON or Prometheus text. It uses only the
+Python standard library so that it behaves the same under Jython 2.7 and
+CPython (JPype).
+
+   metrics = CallMetrics.CallMetrics()
+   metrics.record("getTimeSeriesContainer", 0.125)
+   metrics.count("getTimeZone")
+   metrics.write("/output/RADARAPI_metrics.json")
+
+Version History
+
+   22.1  18Oct2026   Original version
+
+'''
+
+import threading, time, random, json, os
+
+DEFAULT_MAX_SAMPLES = 1024
+
+#--------------------------------------------------------#
+# the most precise wall clock available for elapsed time #
+#--------------------------------------------------------#
+clock = getattr(time, "perf_counter", time.time)
+
+def _percentile(sortedSamples, fraction) :
+	if not sortedSamples :
+		return None
+	index = int(round(fraction * (len(sortedSamples) - 1)))
+	return sortedSamples[index]
+
+class CallMetrics :
+	'''
+	Thread-safe call counts and durations by method name.
+
+	Durations (in seconds) are kept in a uniform reservoir sample of at most maxSamples per
+	name, so percentiles stay cheap for methods called many times. Names that are only
+	counted report a count and no durations.
+	'''
+	def __init__(self, maxSamples=DEFAULT_MAX_SAMPLES) :
+		self._lock       = threading.Lock()
+		self._maxSamples = maxSamples
+		self._stats      = {}
+		self._started    = time.time()
+
+	def _stats_(self, name) :
+		stats = self._stats.get(name)
+		if stats is None :
+			stats = self._stats[name] = {"count" : 0, "timed" : 0, "total" : 0.0, "max" : 0.0, "samples" : []}
+		return stats
+
+	def count(self, name) :
+		'''
+		Count a call without timing it
+		'''
+		self._lock.acquire()
+		try     : self._stats_(name)["count"] += 1
+		finally : self._lock.release()
+
+	def record(self, name, elapsed) :
+		'''
+		Count a call and record its duration in seconds
+		'''
+		self._lock.acquire()
+		try :
+			stats = self._stats_(name)
+			stats["count"] += 1
+			stats["timed"] += 1
+			stats["total"] += elapsed
+			if elapsed > stats["max"] :
+				stats["max"] = elapsed
+			samples = stats["samples"]
+			if len(samples) < self._maxSamples :
+				samples.append(elapsed)
+			else :
+				i = random.randint(0, stats["timed"] - 1)
+				if i < self._maxSamples :
+					samples[i] = elapsed
+		finally :
+			self._lock.release()
+
+	def reset(self) :
+		'''
+		Discard all statistics
+		'''
+		self._lock.acquire()
+		try :
+			self._stats   = {}
+			self._started = time.time()
+		finally :
+			self._lock.release()
+
+	def getSummary(self) :
+		'''
+		Return a dictionary keyed by name of count, and for timed names total, max, p50, p95
+		and p99, all in seconds
+		'''
+		self._lock.acquire()
+		try :
+			items = [(name, dict(stats), sorted(stats["samples"])) for name, stats in self._stats.items()]
+		finally :
+			self._lock.release()
+		summary = {}
+		for name, stats, samples in items :
+			entry = {"count" : stats["count"]}
+			if stats["timed"] :
+				entry["total"] = stats["total"]
+				entry["max"]   = stats["max"]
+				entry["p50"]   = _percentile(samples, 0.50)
+				entry["p95"]   = _percentile(samples, 0.95)
+				entry["p99"]   = _percentile(samples, 0.99)
+			summary[name] = entry
+		return summary
+
+	def toJson(self) :
+		'''
+		Return the summary as a JSON document, slowest total time first
+		'''
+		summary = self.getSummary()
+		names = sorted(summary.keys(), key=lambda name : (-summary[name].get("total", 0.0), name))
+		return json.dumps({
+			"started" : self._started,
+			"ended"   : time.time(),
+			"methods" : [dict([("name", name)] + list(summary[name].items())) for name in names]},
+			indent=1, sort_keys=True)
+
+	def toPrometheus(self, prefix="radarapi") :
+		'''
+		Return the summary in the Prometheus text exposition format
+		'''
+		summary = self.getSummary()
+		lines = [
+			"# HELP %s_call_seconds Duration of instrumented calls" % prefix,
+			"# TYPE %s_call_seconds summary" % prefix]
+		for name in sorted(summary.keys()) :
+			entry = summary[name]
+			if "total" not in entry :
+				continue
+			for quantile, key in (("0.5", "p50"), ("0.95", "p95"), ("0.99", "p99")) :
+				lines.append('%s_call_seconds{method="%s",quantile="%s"} %.9f' % (prefix, name, quantile, entry[key]))
+			lines.append('%s_call_seconds_sum{method="%s"} %.9f' % (prefix, name, entry["total"]))
+			lines.append('%s_call_seconds_count{method="%s"} %d' % (prefix, name, entry["count"]))
+		lines.append("# HELP %s_calls_total Number of calls" % prefix)
+		lines.append("# TYPE %s_calls_total counter" % prefix)
+		for name in sorted(summary.keys()) :
+			lines.append('%s_calls_total{method="%s"} %d' % (prefix, name, summary[name]["count"]))
+		return "\n".join(lines) + "\n"
+
+	def write(self, fileName, format=None) :
+		'''
+		Write the summary to a file. The format is "json" or "prometheus"; if not given it is
+		"prometheus" for .prom and .txt files and "json" otherwise
+		'''
+		if format is None :
+			format = "prometheus" if os.path.splitext(fileName)[1].lower() in (".prom", ".txt") else "json"
+		format = format.lower()
+		if format == "json" :
+			text = self.toJson()
+		elif format == "prometheus" :
+			text = self.toPrometheus()
+		else :
+			raise ValueError("Format must be json or prometheus")
+		directory = os.path.dirname(fileName)
+		if directory and not os.path.isdir(directory) :
+			os.makedirs(directory)
+		f = open(fileName, "w")
+		try     : f.write(text)
+		finally : f.close()
+		return fileName
@@ -12,6 +12,22 @@
    getVersion()
       Returns the version of this module in the form "YY.n ddMMMyyyy"
 
+   fetchMany(db, requests[, maxWorkers])
+      Runs a list of read requests against a DbAccess (or RADARAPI RadarAccess)
+      object on a bounded pool of maxWorkers threads (default 4) and returns two
+      lists in the same order as the requests: the results, with an exception
+      object in place of the result of any request that failed, and the elapsed
+      seconds of each request. Each request is either an identifier string,
+      which is passed to get(), or a tuple of a method name followed by the
+      method's positional arguments and an optional keyword argument dictionary,
+      e.g. ("get", tsId, startTime, endTime) or ("getRating", ratingId). Only
+      get... and read... methods may be requested. The requests run with
+      concurrent reads enabled on the worker threads only, leaving the
+      object's setConcurrentReads() setting unchanged for other threads, and
+      the time windows of the get, read and getTimeSeriesContainer requests
+      are announced to the window cache so that requests for the same time
+      series over overlapping windows are retrieved together.
+
    open([connectString[, startTime, endTime]])
       Returns a DbAccess object. The object has the default store rule set
       to "Replace All" and the units system set to "English".
@@ -47,6 +63,10 @@
          overrideProtection = False
          maxVersion         = True
 
+      If the accessLog keyword argument is True or a log name, the object
+      records its reads in an access log and replays the previous run's log
+      in the background (see enableAccessLog).
+
    ==[DbAcess object methods]===================================================
 
    isOpen()
@@ -110,10 +130,155 @@
       parameter, it will override any default vertical datum that has been spec-
       ified.
 
+   getIfExists(...)
+   get(..., missing='none')
+      Same as get(), but returns None instead of raising an exception if the
+      time series or rating does not exist, so no separate existence check is
+      needed. Identifiers found not to exist are remembered for two minutes,
+      and identifiers absent from a loaded catalog snapshot (see exists()) are
+      not requested at all. Storing an object through the same DbAccess object
+      forgets that it was missing.
+
+   clearMissingCache()
+      Forgets the identifiers found not to exist by getIfExists().
+
    getRating(ratingLoadMethod, ratingID)
       Retrieves a RatingSetContainer object for the specified ID, using the
       specified rating load method.
 
+   iterTimeSeries(timeSeriesID[, startTime, endTime[, chunkDays[, ...]]])
+      Returns a generator of TimeSeriesContainer objects covering consecutive
+      chunks of chunkDays days (default 30) of the time window, in time order,
+      so a long window can be processed without holding it all in memory.
+      Chunks are retrieved in parallel on a small thread pool, with up to
+      prefetch (default 2) chunks in progress at a time, starting with the one
+      to be processed next. Each value belongs to exactly
+      one chunk; chunks are not trimmed and bypass the caches. The remaining
+      keyword arguments are units, timeZone, startInclusive, endInclusive,
+      versionDate, maxVersion, officeId and prefetch.
+
+   getTimeSeriesVersions(timeSeriesID[, startTime, endTime[, versionDates[, ...]]])
+      Reads several versions of a versioned time series over the same time
+      window in a single query, and returns an ordered dictionary of
+      TimeSeriesContainer objects keyed by version date. If versionDates is
+      omitted, all versions with values in the window are read, oldest first,
+      keyed by version date strings in the 'ddMMMyyyy HHmm' format. The
+      remaining keyword arguments are units, timeZone, trim, startInclusive,
+      endInclusive and officeId.
+
+   getTimeSeriesContainers(timeSeriesIDs[, startTime, endTime[, units[, ...]]])
+      Reads many time series in batches of up to batchSize series per query
+      (by default the batch size set by setBatchSize()), retrieving the
+      vertical datum information of all elevation series in the batch in one
+      more query. When the window or disk cache is enabled, series that can
+      be cached are read through those caches and only their uncached periods
+      are queried, in the same batches. Returns a dictionary of
+      TimeSeriesContainer objects keyed by time series ID; IDs that could not
+      be retrieved map to None. units may be a single unit or a dictionary of
+      units keyed by time series ID. The remaining keyword arguments are
+      timeZone, trim, startInclusive, endInclusive, getPrevious, getNext,
+      versionDate, maxVersion, officeId and batchSize.
+
+   getValuesAt(timeSeriesIDs, instants[, policy[, units[, timeZone[, versionDate[, maxVersion[, officeId[, withTimes]]]]]]])
+      Retrieves only the values of many time series at a few instants, in
+      batches of up to 100 series/instant pairs per query, without building
+      TimeSeriesContainer objects. Returns a dictionary keyed by time series
+      ID of lists with one entry per instant: the value, or None if there is
+      no value. If withTimes is True each entry is instead a (time, value,
+      quality) tuple, with the time in milliseconds of the wall clock time
+      treated as UTC. The policy selects the sample "exact"ly at (the
+      default), at or "previous" to, or at or "next" after each instant. units
+      may be a single unit or a dictionary of units keyed by time series ID.
+      If a batch query fails, each time series is queried separately and
+      time series that still fail map to None instead of a list.
+
+   fetchMany(requests[, maxWorkers])
+      Runs a list of read requests in parallel as described for the fetchMany()
+      function and returns the list of results (or exceptions) in request order.
+
+   getFetchLatencies()
+      Gets the elapsed seconds of each request of the last fetchMany() call, in
+      request order.
+
+   enableCache([maxBytes[, ttl]])
+      Keeps retrieved TimeSeriesContainer objects in an in-memory cache, keyed
+      by office, identifier, time window, units, time zone, trim and inclusion
+      flags, version date and max version flag. Entries expire after ttl
+      seconds (default 300) and the least recently used entries are evicted
+      when the estimated size exceeds maxBytes (default 32 MB). Copies are
+      returned from the cache, and storing or deleting a time series through
+      the DbAccess object discards its cached windows.
+
+   disableCache()
+      Stops caching TimeSeriesContainer objects and discards the cache.
+
+   clearCache()
+      Discards all cached TimeSeriesContainer objects.
+
+   getCacheStatistics()
+      Gets a dictionary of the cache counters (hits, misses, evictions,
+      expirations, entries, bytes), or None if caching is disabled.
+
+   enableDiskCache([directory[, volatilePeriod[, maxAge]]])
+      Keeps retrieved time series values in one file per series under
+      directory (default /data/tscache) so they are reused by later runs.
+      Each file records the time intervals it covers, and a read only
+      retrieves the parts of its window that are not covered. Values newer
+      than volatilePeriod seconds (default 6 hours) before they were fetched
+      are always fetched again, and files older than maxAge seconds (default
+      7 days) are rebuilt. Reads that include the previous or next value
+      bypass the disk cache.
+
+   disableDiskCache()
+      Stops using the disk cache, leaving its files in place.
+
+   clearDiskCache()
+      Removes all files from the disk cache.
+
+   getDiskCacheStatistics()
+      Gets a dictionary of the disk cache counters, or None if the disk cache
+      is disabled.
+
+   enableWindowCache([maxBytes[, ttl]])
+      Coalesces reads of the same time series over different time windows.
+      The values retrieved for each series, and the time intervals they cover,
+      are kept in memory so that a read only retrieves the parts of its window
+      that are not covered, and callers receive slices honoring their own trim
+      and inclusion flags. Series expire ttl seconds (default 300) after they
+      are first retrieved and the least recently used series are evicted when
+      the estimated size exceeds maxBytes (default 32 MB). The window cache is
+      disabled by default. Reads that include the previous or next value
+      bypass it, and storing or deleting a time series through the DbAccess
+      object discards its values. Values stored by other writers are not seen
+      until the cached values expire.
+
+   disableWindowCache()
+      Stops coalescing reads and discards the window cache.
+
+   clearWindowCache()
+      Discards all values kept by the window cache.
+
+   getWindowCacheStatistics()
+      Gets a dictionary of the window cache counters (hits, fetches,
+      coalesced, entries, bytes), or None if the window cache is disabled.
+
+   enableAccessLog([name[, directory[, replay]]])
+      Records the id and window of every time series read in an access log
+      named for the running script (or name) under directory (default
+      /data/accesslog), written when the object is closed or the process
+      exits. Unless replay is False, the reads of the previous run's log are
+      started in the background as soon as the default time window is known,
+      shifted by the change in the end of the default time window, so that
+      the script's own reads are answered from the caches. The replayed reads
+      are retrieved in batches with getTimeSeriesContainers() on background
+      threads that do not hold the object lock. The in-memory cache is
+      enabled for the replay if necessary. PrefetchPlanner.prefetch() waits
+      for the replayed reads instead of repeating them, and close() drops the
+      replayed reads that have not started and waits for the others.
+
+   disableAccessLog()
+      Writes the access log and stops recording reads.
+
    read(objectID)
       Retrieves a non-container object from the database. If objectID is a
       time series identifier, a TimeSeriesMath object will be returned with
@@ -180,6 +345,15 @@
       If officeId is specified, it overrides the default office id. Specify
       officeId as a string.
 
+   putTimeSeriesContainers(timeSeriesContainers[,units[,timeZone[,storeRule[,overrideProtection[,versionDate[,officeId[,batchSize]]]]]]])
+      Stores a list of TimeSeriesContainer objects to the database, up to
+      batchSize (default 50) series per database call and one commit per call.
+      The parameters are as for put(), except that units may also be a
+      dictionary of units keyed by time series id. Returns an ordered
+      dictionary keyed by time series id of None for each series stored, or
+      the error message for each series that was not. A series that fails does
+      not prevent the others from being stored.
+
    put(ratingSetContainer[, failIfExists])
       Stores a rating specified as a RatingSetContainer to the database. If
       failIfExists is specified, it must be True or False. If not specified,
@@ -250,6 +424,11 @@
       series ids and rating specification ids are returned. Equivalent to
       getPathnameList()
 
+      The time series and rating catalogs are each loaded once into a snapshot
+      that is reused until it is older than the catalog time-to-live (see
+      setCatalogTtl). Storing or deleting through the DbAccess object keeps
+      the snapshots current.
+
    getCatalogedPathnames(pattern)
       Returns a list of all object ids in the database that match the specified
       pattern. Currently only time series ids and rating specification ids are
@@ -259,8 +438,8 @@
       LIKE pattern.
 
    getCatalogedPathnames(forceNew)
-      Simply calls getCatalogedPathnames() as the CWMS database catalog never
-      needs refreshing.
+      Calls getCatalogedPathnames(), first reloading the catalog snapshots if
+      forceNew is True.
 
       Although Python supports Boolean tests on strings, passing a string to
       this method will result in it being interpreted as a pattern (see above)
@@ -268,8 +447,8 @@
       the greatest clarity.
 
    getCatalogedPathnames(pattern, forceNew)
-      Simply calls getCatalogedPathnames(pattern) as the CWMS database catalog
-      never needs refreshing.
+      Calls getCatalogedPathnames(pattern), first reloading the catalog
+      snapshots if forceNew is True.
 
       The pattern must be a glob (file name mask) style pattern and not an SQL
       LIKE pattern.
@@ -278,6 +457,29 @@
       Returns a list of all object ids in the database. Currently only time
       series ids and rating specification ids are returned.
 
+   exists(objectID)
+      Returns whether a time series or rating specification id is in the
+      catalog, ignoring case. Only the time series or the rating catalog
+      snapshot is loaded, depending on the form of the id.
+
+   getCatalogedTimeSeriesIds([pattern])
+      Returns the time series ids in the catalog that match the glob pattern.
+
+   getCatalogedRatingIds([pattern])
+      Returns the rating specification ids in the catalog that match the glob
+      pattern.
+
+   setCatalogTtl(seconds)
+      Sets the number of seconds (default 3600) a catalog snapshot is used
+      before it is reloaded. None keeps the snapshot for the whole session.
+
+   getCatalogTtl()
+      Gets the number of seconds a catalog snapshot is used before it is
+      reloaded.
+
+   refreshCatalog()
+      Discards the catalog snapshots so the next catalog call reloads them.
+
    setTimeZone(timezone)
      Sets the default time zone for the DBAccess object. The time zone may be
      specified as a string or a TimeZone object.
@@ -377,6 +579,18 @@
    getStoreRule()
       Gets the default store rule.
 
+   setStoreChangedOnly(state)
+      Sets whether time series put() and write() methods first read the values
+      already stored in the time window of the data and send only the values
+      that the store rule would change (default False). Values that are
+      unchanged, or that the store rule or protection would not replace, are
+      not sent, and a series with nothing to change is not stored at all. The
+      stored values of all series in one putTimeSeriesContainers() call are
+      read together.
+
+   getStoreChangedOnly()
+      Gets whether only changed time series values are stored.
+
    setRatingLoadMethod(ratingLoadMethod)
       Sets the default method for loading ratings from the database. Valid
       methods are:
@@ -388,11 +602,44 @@
    getRatingLoadMethod()
       Gets the default method for loading ratings from the database.
 
+   setConcurrentReads(concurrentReads)
+      Sets whether time series, rating, and catalog reads may run in parallel
+      from several threads through the same DbAccess object. When False (the
+      default) every read holds the object lock for its duration; when True
+      the lock is only held while the object defaults are read, and each read
+      uses its own pooled connection and thread-local date formatters.
+
+   getConcurrentReads()
+      Gets whether reads may run in parallel from several threads.
+
+   setFetchSize(rows)
+      Sets the number of rows fetched per database round trip when reading
+      time series values and catalogs (default 1000).
+
+   getFetchSize()
+      Gets the number of rows fetched per database round trip.
+
+   setBatchSize(batchSize)
+      Sets the default number of time series read per query by
+      getTimeSeriesContainers() (default 100).
+
+   getBatchSize()
+      Gets the default number of time series read per query by
+      getTimeSeriesContainers().
+
    setUnitSystem(system)
       Sets the units system for the DbAccess object. The unit system is used
       for all subsequent calls to the get() and read() time series  methods.
       Valid unit systems are "English" and "SI".
 
+   preloadParameterUnits([names])
+      Loads the default units of all parameters into a registry shared by every
+      DbAccess and RadarAccess object in the process, and persisted under
+      /data/units for one day, so that later objects and runs do not query them
+      again. names may list the parameters or time series ids a report will
+      use; any not in the display units table are looked up together. Returns
+      the names for which no units were found.
+
    setOfficeId()
       Sets the default office identifier.
 
@@ -424,6 +671,35 @@
       Retrieves the location's indicated vertical datum. If officeId is not
       specified, the current default office identifier is used.
 
+    getLocations(locationIds [,officeId [,unitSystem]])
+      Retrieves the records of many locations in one query. Returns a
+      dictionary keyed by location id of dictionaries with the keys locationId,
+      officeId, publicName, longName, description, elevation, elevationUnits,
+      verticalDatum, latitude, longitude, horizontalDatum, timeZone,
+      locationKind, nearestCity and active, or None for unknown locations.
+      Records are cached for a day. If unitSystem ("EN" or "SI") is not
+      specified, the current unit system is used for the elevation.
+
+    getLocation(locationId [,officeId [,unitSystem]])
+      Retrieves the record of one location, as for getLocations().
+
+    clearLocationCache()
+      Discards the cached location records.
+
+    getLocationLevels(levelIds [,atTime [,units [,officeId [,timeZone]]]])
+      Retrieves the values of many location levels at once, in batches of up
+      to 100 per query. Returns a dictionary keyed by level id of the level
+      value at atTime (default now), or None for unknown levels. units may be a
+      single unit, a dictionary of units keyed by level id, or None for the
+      default units of each level's parameter. Values are cached by level id,
+      units and effective date for six hours.
+
+    getLocationLevel(levelId [,atTime [,units [,officeId [,timeZone]]]])
+      Retrieves the value of one location level, as for getLocationLevels().
+
+    clearLocationLevelCache()
+      Discards the cached location level values.
+
     setVerticalDatumOffset(locationId, verticalDatumId1, verticalDatumId2, value, unit)
       Sets a known vertical datum offset for a location and pair of vertical
       datums. The value is the offset that must be added to an elevation WRT
@@ -565,7 +841,8 @@
 	from hec.login            import ServerSuiteUtil
 	from hec.login.data       import ServerLoginState
 
-import os, string, threading, re, socket, collections, traceback
+import os, sys, string, threading, re, socket, collections, traceback
+import WorkerPool, DataCache, PrefetchPlanner, atexit
 
 if IS_CPYTHON:
 	basestring = str
@@ -666,6 +943,19 @@ def isUndefined(value) :
 	'''
 	return value < Const.UNDEFINED_DOUBLE / 2
 
+NOT_FOUND_MARKERS = ("TS_ID_NOT_FOUND", "ITEM_DOES_NOT_EXIST", "LOCATION_ID_NOT_FOUND", "NOT FOUND")
+
+def isNotFoundError(e) :
+	'''
+	Determine if an exception (Python or Java) reports that an object does not exist
+	'''
+	try    : message = str(e).upper()
+	except : return False
+	for marker in NOT_FOUND_MARKERS :
+		if marker in message :
+			return True
+	return False
+
 def nonVersionedDate() :
 	'''
 	Return a date string for non-versioned dates
@@ -861,6 +1151,275 @@ def removeConnectionFactoryInstance() :
 	except:
 		pass
 
+def makeTimeSeriesContainer(tsId, times, values, qualities, units, timeZone, startTime, endTime, vertDatumInfo=None) :
+	'''
+	Build a TimeSeriesContainer from UTC millisecond times, values and qualities. The times are
+	reported in the specified time zone, and units may include a vertical datum (e.g. 'u=ft|v=NAVD88')
+	'''
+	#----------------#
+	# parse the unit #
+	#----------------#
+	for part1 in map(string.strip, units.split('|')) :
+		parts2 = list(map(string.strip, part1.split('=', 1)))
+		if len(parts2) == 2 and parts2[0].upper() == 'U' :
+			units = parts2[1]
+			break
+	#-----------------------------------------------------------------#
+	# convert java millis into HecTime minutes in specified time zone #
+	#-----------------------------------------------------------------#
+	times = list(times)
+	cal = Calendar.getInstance()
+	cal.setTimeZone(timeZone)
+	cal.clear()
+	time = HecTime()
+	i = 0
+	while i < len(times) :
+		cal.setTimeInMillis(times[i])
+		time.set(cal)
+		times[i] = time.value()
+		i += 1
+	cal.setTimeInMillis(startTime)
+	time.set(cal)
+	startTime = time.value()
+	cal.setTimeInMillis(endTime)
+	time.set(cal)
+	endTime = time.value()
+	#-----------------------------------------------#
+	# build and return a TimeSeriesContainer object #
+	#-----------------------------------------------#
+	tsc = TimeSeriesContainer()
+	loc, param, paramType, intvl, dur, ver = tsId.split('.')
+	tsc.watershed = ''
+	tsc.fullName  = tsId
+	try    : tsc.location,  tsc.subLocation  = loc.split('-', 1)
+	except : tsc.location,  tsc.subLocation  = loc, ''
+	try    : tsc.parameter, tsc.subParameter = param.split('-', 1)
+	except : tsc.parameter, tsc.subParameter = param, ''
+	try    : tsc.version,   tsc.subVersion   = ver.split('-', 1)
+	except : tsc.version,   tsc.subVersion   = ver, ''
+	tsc.startTime         = startTime
+	tsc.endTime           = endTime
+	tsc.times             = times
+	tsc.values            = values
+	tsc.quality           = qualities
+	tsc.numberValues      = len(times)
+	tsc.interval          = Interval(intvl).getMinutes()
+	tsc.type              = DSSTimeSeries.getDSSType(
+	                        	Parameter(param),
+	                        	ParameterType(paramType))
+	tsc.units             = units
+	tsc.timeZoneID        = timeZone.getID()
+	tsc.timeZoneRawOffset = timeZone.getRawOffset()
+	if vertDatumInfo :
+		tsc = TimeSeriesContainerVertDatum(
+			tsc,
+			VerticalDatumContainer(vertDatumInfo))
+	return tsc
+
+def getTimesInMillis(tsc) :
+	'''
+	Return the times of a TimeSeriesContainer as milliseconds, treating them as UTC
+	'''
+	if getattr(tsc, "timeGranularitySeconds", 60) == 1 :
+		time = HecTime(HecTime.SECOND_INCREMENT)
+	else :
+		time = HecTime()
+	millis = []
+	for t in tsc.times :
+		time.set(t)
+		millis.append(time.getTimeInMillis())
+	return millis
+
+DEFAULT_FETCH_SIZE = 1000
+
+def javaArray(values, typeCode) :
+	'''
+	Return a sequence as a Java primitive array of longs ("l"), doubles ("d") or ints ("i"), or
+	as a String array ("s"). A Java array of the requested type is returned as is
+	'''
+	if IS_CPYTHON :
+		import jpype
+		arrayType = jpype.JArray({"l" : jpype.JLong, "d" : jpype.JDouble, "i" : jpype.JInt, "s" : jpype.JString}[typeCode])
+		if isinstance(values, arrayType) :
+			return values
+		return arrayType(list(values))
+	import jarray
+	if typeCode == "s" :
+		from java.lang import String
+		return jarray.array(values, String)
+	if getattr(values, "typecode", None) == typeCode :
+		return values
+	return jarray.array(values, typeCode)
+
+DEFAULT_STORE_BATCH_SIZE = 50
+DEFAULT_RETRIEVE_BATCH_SIZE = 100
+
+def readColumns(rs, columnTypes, fetchSize=DEFAULT_FETCH_SIZE, calendar=None) :
+	'''
+	Read all rows of a JDBC result set in one pass and return a list of values per column.
+	Each column type is "time" (milliseconds of a DATE or TIMESTAMP read in the time zone of
+	calendar, or UTC), "double" (Const.UNDEFINED_DOUBLE for nulls), "int" or "string". Reading
+	stops at the first null time. The result set is not closed
+	'''
+	if fetchSize :
+		rs.setFetchSize(int(fetchSize))
+	if calendar is None :
+		calendar = Calendar.getInstance(TimeZone.getTimeZone("UTC"))
+	columns = [[] for columnType in columnTypes]
+	readers = [(i + 1, columnTypes[i], columns[i].append) for i in range(len(columnTypes))]
+	#------------------------------------------------------------------#
+	# bind the accessors once; each cell is then a single bridge call  #
+	# and times are read as millis instead of being formatted and      #
+	# parsed back                                                      #
+	#------------------------------------------------------------------#
+	next, wasNull = rs.next, rs.wasNull
+	getTimestamp, getDouble, getInt, getString = rs.getTimestamp, rs.getDouble, rs.getInt, rs.getString
+	done = False
+	while not done and next() :
+		for column, columnType, append in readers :
+			if columnType == "time" :
+				timestamp = getTimestamp(column, calendar)
+				if timestamp is None :
+					done = True
+					break
+				append(timestamp.getTime())
+			elif columnType == "double" :
+				value = getDouble(column)
+				if wasNull() : value = Const.UNDEFINED_DOUBLE
+				append(value)
+			elif columnType == "int" :
+				append(getInt(column))
+			else :
+				append(getString(column))
+	if done :
+		count = min([len(values) for values in columns])
+		columns = [values[:count] for values in columns]
+	return columns
+
+def _parseFetchRequest_(request) :
+	'''
+	Split a fetchMany() request into a method name, positional arguments, and keyword arguments
+	'''
+	if isinstance(request, basestring) :
+		return "get", (request,), {}
+	request = tuple(request)
+	if not request or not isinstance(request[0], basestring) :
+		raise ValueError("Fetch request must start with a method name: %s" % repr(request))
+	methodName, args, kwargs = request[0], request[1:], {}
+	if args and isinstance(args[-1], dict) :
+		args, kwargs = args[:-1], args[-1]
+	if not (methodName.startswith("get") or methodName.startswith("read")) :
+		raise ValueError("Method %s cannot be used in a fetch request" % methodName)
+	return methodName, args, kwargs
+
+def _runConcurrent_(db, method, args, kwargs) :
+	'''
+	Call a read method with concurrent reads enabled for the calling thread only
+	'''
+	state = db._threadLocal
+	concurrent = getattr(state, "concurrent", False)
+	state.concurrent = True
+	try     : return method(*args, **kwargs)
+	finally : state.concurrent = concurrent
+
+def fetchMany(db, requests, maxWorkers=WorkerPool.DEFAULT_MAX_WORKERS) :
+	'''
+	Run a list of read requests against a DbAccess or RadarAccess object on a bounded thread pool.
+	Returns the list of results (or exceptions) and the list of elapsed seconds, in request order.
+	The requests run in parallel whatever getConcurrentReads() returns; the setting is not changed
+	'''
+	calls = []
+	windows = []
+	for request in requests :
+		methodName, args, kwargs = _parseFetchRequest_(request)
+		method = getattr(db, methodName, None)
+		if not callable(method) :
+			raise ValueError("No such method: %s" % methodName)
+		calls.append((method, args, kwargs))
+		if methodName in ("get", "getIfExists", "read", "getTimeSeriesContainer") and len(args) >= 3 and isTsId(args[0]) \
+			and isinstance(args[1], basestring) and isinstance(args[2], basestring) :
+			windows.append((args[0], args[1], args[2], args[3] if len(args) > 3 else kwargs.get("units")))
+	if not calls :
+		return [], []
+	#------------------------------------------------------------#
+	# let reads of the same series over several windows coalesce #
+	#------------------------------------------------------------#
+	if windows :
+		db._expectWindows_(windows)
+	pool = WorkerPool.WorkerPool(min(int(maxWorkers), len(calls)), "fetchMany")
+	try :
+		futures = [pool.submit(_runConcurrent_, db, method, args, kwargs) for method, args, kwargs in calls]
+		results = WorkerPool.waitAll(futures)
+		latencies = [future.elapsed for future in futures]
+	finally :
+		pool.shutdown(False)
+	return results, latencies
+
+DEFAULT_CHUNK_DAYS      = 30
+DEFAULT_PREFETCH_CHUNKS = 2
+
+def iterTimeSeriesChunks(db, request, chunkDays, prefetch, retrieve) :
+	'''
+	Return a generator of the TimeSeriesContainers of consecutive chunks of chunkDays days of a
+	resolved time series request, in order. Each chunk is retrieved untrimmed by calling
+	retrieve(chunkRequest) on a pool of prefetch threads with concurrent reads enabled, keeping up
+	to prefetch chunks in progress; chunks for which retrieve returns None are skipped
+	'''
+	chunkMillis = int(chunkDays * 86400000)
+	if chunkMillis < 60000 :
+		raise ValueError("Chunk length must be at least one minute")
+	prefetch = int(prefetch)
+	if prefetch < 1 :
+		raise ValueError("Number of chunks to prefetch must be a positive integer")
+	#----------------------------------------------------------------#
+	# chunks share their boundaries, which belong to the later chunk #
+	#----------------------------------------------------------------#
+	startTime, endTime = request["startTime"], request["endTime"]
+	chunkRequests = []
+	chunkStart = startTime
+	while True :
+		chunkEnd = min(chunkStart + chunkMillis, endTime)
+		chunkRequest = dict(request)
+		chunkRequest.update({
+			"startTime"          : chunkStart,
+			"endTime"            : chunkEnd,
+			"trim"               : False,
+			"startTimeInclusive" : request["startTimeInclusive"] if chunkStart == startTime else True,
+			"endTimeInclusive"   : request["endTimeInclusive"] if chunkEnd == endTime else False,
+			"getPrevious"        : False,
+			"getNext"            : False})
+		chunkRequests.append(chunkRequest)
+		if chunkEnd == endTime :
+			break
+		chunkStart = chunkEnd
+
+	def read(chunkRequest) :
+		locked = db._readLock_()
+		try     : return retrieve(chunkRequest)
+		finally : db._readUnlock_(locked)
+
+
+	def chunks() :
+		pool = WorkerPool.WorkerPool(min(prefetch, len(chunkRequests)), "iterTimeSeries")
+		try :
+			pending = collections.deque()
+			submitted = 0
+			for i in range(len(chunkRequests)) :
+				#-----------------------------------------------------------#
+				# the chunks are read alongside each other without changing #
+				# the object's concurrent reads setting                     #
+				#-----------------------------------------------------------#
+				while submitted < len(chunkRequests) and submitted < i + prefetch :
+					pending.append(pool.submit(_runConcurrent_, db, read, (chunkRequests[submitted],), {}))
+					submitted += 1
+				tsc = pending.popleft().result()
+				if tsc is not None :
+					yield tsc
+		finally :
+			pool.shutdown(False)
+
+	return chunks()
+
 ##############################################################################
 
 class OracleTypes :
@@ -931,6 +1490,7 @@ def __init__(self, *args, **kwargs) :
 		self._clientLock.acquire()
 		try :
 			self._initValues_()
+			accessLog = None
 			#----------------------------------#
 			# process the positional arguments #
 			#----------------------------------#
@@ -973,6 +1533,8 @@ def __init__(self, *args, **kwargs) :
 				elif key == "endTime" :
 					if self._endTimeStr : raise ValueError("End time already specified in positional parameters")
 					self._endTimeStr = kwargs[key]
+				elif key == "accessLog" :
+					accessLog = kwargs[key]
 				else :
 					raise ValueError('Invalid keyword parameter "%s"' % key)
 			#---------------------------------#
@@ -1082,6 +1644,8 @@ def __init__(self, *args, **kwargs) :
 				stmt.close()
 				conn.close()
 				print("Connected to %s as user %s, office %s, via %s" % (self._connectionInfo, self._user, self._officeId, self._connectionMethod))
+				if accessLog :
+					self.enableAccessLog(accessLog if isinstance(accessLog, basestring) else None)
 			else :
 				raise Exception("Could not connect to database")
 		finally :
@@ -1116,13 +1680,25 @@ def _initValues_(self) :
 		self._maxVersion            = True
 		self._parameterUnits        = None
 		self._ratingLoadMethod      = "LAZY"
-		self._utcCal                = Calendar.getInstance()
-		self._sdf                   = SimpleDateFormat('yyyy/MM/dd HHmm')
-		self._sdfDATE               = SimpleDateFormat('yyyy-MM-dd HH:mm:ss')
-		self._hts                   = HecTime(HecTime.SECOND_INCREMENT)
+		self._concurrentReads       = False
+		self._threadLocal           = threading.local()
+		self._fetchLatencies        = []
+		self._tsCache               = None
+		self._diskCache             = None
+		self._windowCache           = None
+		self._catalogTtl            = DataCache.DEFAULT_CATALOG_TTL
+		self._catalogs              = {}
+		self._catalogLock           = threading.Lock()
+		self._locationCache         = DataCache.LocationCache()
+		self._levelCache            = DataCache.LocationLevelCache()
+		self._missingCache          = DataCache.LruCache(DataCache.DEFAULT_MISSING_ENTRIES, DataCache.DEFAULT_MISSING_TTL)
+		self._accessLog             = None
+		self._accessLogReplay       = False
+		self._fetchSize             = DEFAULT_FETCH_SIZE
+		self._batchSize             = DEFAULT_RETRIEVE_BATCH_SIZE
+		self._arrayStore            = None
+		self._storeChangedOnly      = False
 		self._canWrite              = {}
-		self._utcCal.setTimeZone(self._utcTimeZone)
-		self._sdf.setTimeZone(self._utcTimeZone)
 		self._catalogTsSql = ' '.join('''
 			select cwms_ts_id
 			  from cwms_v_ts_id where db_office_id = :1
@@ -1148,6 +1724,256 @@ def unlock(self) :
 		'''
 		self._clientLock.release()
 
+	def _readLock_(self) :
+		'''
+		Lock the client lock for a read unless concurrent reads are enabled for the object or
+		the calling thread. Returns whether the lock was acquired, to be passed to _readUnlock_
+		'''
+		if self._concurrentReads or getattr(self._threadLocal, "concurrent", False) :
+			return False
+		self.lock()
+		return True
+
+	def _readUnlock_(self, locked) :
+		'''
+		Unlock the client lock if it was acquired by _readLock_
+		'''
+		if locked :
+			self.unlock()
+
+	def _threadState_(self) :
+		'''
+		Return the calendar and formatters for the calling thread, creating them on first use
+		'''
+		state = self._threadLocal
+		if not hasattr(state, "sdfDATE") :
+			state.utcCal = Calendar.getInstance()
+			state.utcCal.setTimeZone(self._utcTimeZone)
+			state.sdf = SimpleDateFormat('yyyy/MM/dd HHmm')
+			state.sdf.setTimeZone(self._utcTimeZone)
+			state.sdfDATE = SimpleDateFormat('yyyy-MM-dd HH:mm:ss')
+			state.hts = HecTime(HecTime.SECOND_INCREMENT)
+		return state
+
+	def setConcurrentReads(self, state) :
+		'''
+		Set whether reads may run in parallel from several threads
+		'''
+		self.lock()
+		try     : self._concurrentReads = bool(state)
+		finally : self.unlock()
+
+	def getConcurrentReads(self) :
+		'''
+		Get whether reads may run in parallel from several threads
+		'''
+		self.lock()
+		try     : return self._concurrentReads
+		finally : self.unlock()
+
+	def setFetchSize(self, rows) :
+		'''
+		Set the number of rows fetched per database round trip for time series values and catalogs
+		'''
+		rows = int(rows)
+		if rows < 1 :
+			raise ValueError("Fetch size must be a positive integer")
+		self.lock()
+		try     : self._fetchSize = rows
+		finally : self.unlock()
+
+	def getFetchSize(self) :
+		'''
+		Get the number of rows fetched per database round trip
+		'''
+		self.lock()
+		try     : return self._fetchSize
+		finally : self.unlock()
+
+	def setBatchSize(self, batchSize) :
+		'''
+		Set the default number of time series retrieved per query by getTimeSeriesContainers
+		'''
+		batchSize = int(batchSize)
+		if batchSize < 1 :
+			raise ValueError("Batch size must be a positive integer")
+		self.lock()
+		try     : self._batchSize = batchSize
+		finally : self.unlock()
+
+	def getBatchSize(self) :
+		'''
+		Get the default number of time series retrieved per query by getTimeSeriesContainers
+		'''
+		self.lock()
+		try     : return self._batchSize
+		finally : self.unlock()
+
+	def fetchMany(self, requests, maxWorkers=WorkerPool.DEFAULT_MAX_WORKERS) :
+		'''
+		Run a list of read requests in parallel and return the results (or exceptions) in request order
+		'''
+		results, latencies = fetchMany(self, requests, maxWorkers)
+		self.lock()
+		try     : self._fetchLatencies = latencies
+		finally : self.unlock()
+		return results
+
+	def getFetchLatencies(self) :
+		'''
+		Get the elapsed seconds of each request of the last fetchMany call
+		'''
+		self.lock()
+		try     : return self._fetchLatencies[:]
+		finally : self.unlock()
+
+	def enableCache(self, maxBytes=DataCache.DEFAULT_MAX_BYTES, ttl=DataCache.DEFAULT_TTL) :
+		'''
+		Cache retrieved TimeSeriesContainers in memory, up to maxBytes, for ttl seconds
+		'''
+		self.lock()
+		try     : self._tsCache = DataCache.TimeSeriesCache(maxBytes, ttl)
+		finally : self.unlock()
+
+	def disableCache(self) :
+		'''
+		Stop caching retrieved TimeSeriesContainers and discard the cache
+		'''
+		self.lock()
+		try     : self._tsCache = None
+		finally : self.unlock()
+
+	def clearCache(self) :
+		'''
+		Discard all cached TimeSeriesContainers
+		'''
+		cache = self._tsCache
+		if cache is not None : cache.clear()
+
+	def getCacheStatistics(self) :
+		'''
+		Get a dictionary of the cache hit, miss, eviction and size counters, or None if caching is disabled
+		'''
+		cache = self._tsCache
+		if cache is None : return None
+		return cache.getStatistics()
+
+	def enableDiskCache(
+		self,
+		directory = DataCache.DEFAULT_DISK_CACHE_DIR,
+		volatilePeriod = DataCache.DEFAULT_VOLATILE_PERIOD,
+		maxAge = DataCache.DEFAULT_DISK_MAX_AGE) :
+		'''
+		Keep retrieved time series values in a cache directory that persists between runs
+		'''
+		self.lock()
+		try     : self._diskCache = DataCache.DiskTimeSeriesCache(directory, volatilePeriod, maxAge)
+		finally : self.unlock()
+
+	def disableDiskCache(self) :
+		'''
+		Stop using the disk cache. The cache files are left in place
+		'''
+		self.lock()
+		try     : self._diskCache = None
+		finally : self.unlock()
+
+	def clearDiskCache(self) :
+		'''
+		Remove all files from the disk cache
+		'''
+		diskCache = self._diskCache
+		if diskCache is not None : diskCache.clear()
+
+	def getDiskCacheStatistics(self) :
+		'''
+		Get a dictionary of the disk cache counters, or None if the disk cache is disabled
+		'''
+		diskCache = self._diskCache
+		if diskCache is None : return None
+		return diskCache.getStatistics()
+
+	def enableWindowCache(self, maxBytes=DataCache.DEFAULT_MAX_BYTES, ttl=DataCache.DEFAULT_TTL) :
+		'''
+		Coalesce reads of the same time series over different windows, keeping the values retrieved
+		in memory, up to maxBytes, for ttl seconds. This is disabled by default
+		'''
+		self.lock()
+		try     : self._windowCache = DataCache.WindowCache(maxBytes, ttl)
+		finally : self.unlock()
+
+	def disableWindowCache(self) :
+		'''
+		Stop coalescing reads of the same time series and discard the cached values
+		'''
+		self.lock()
+		try     : self._windowCache = None
+		finally : self.unlock()
+
+	def clearWindowCache(self) :
+		'''
+		Discard all values kept for coalescing reads
+		'''
+		windowCache = self._windowCache
+		if windowCache is not None : windowCache.clear()
+
+	def getWindowCacheStatistics(self) :
+		'''
+		Get a dictionary of the window cache counters, or None if it is disabled
+		'''
+		windowCache = self._windowCache
+		if windowCache is None : return None
+		return windowCache.getStatistics()
+
+	def enableAccessLog(self, name=None, directory=PrefetchPlanner.DEFAULT_ACCESS_LOG_DIR, replay=True) :
+		'''
+		Record the time series reads of this run in an access log and, unless replay is False,
+		replay the previous run's reads in the background once the default time window is known
+		'''
+		accessLog = PrefetchPlanner.AccessLog(name, directory)
+		self.lock()
+		try :
+			self._accessLog = accessLog
+			self._accessLogReplay = bool(replay)
+		finally :
+			self.unlock()
+		atexit.register(accessLog.save)
+		self._replayAccessLog_()
+
+	def disableAccessLog(self) :
+		'''
+		Write the access log and stop recording reads
+		'''
+		self.lock()
+		try :
+			accessLog = self._accessLog
+			self._accessLog = None
+		finally :
+			self.unlock()
+		if accessLog is not None : accessLog.save()
+
+	def _replayAccessLog_(self) :
+		'''
+		Start replaying the previous run's access log if it is enabled and the default time window is set
+		'''
+		accessLog = self._accessLog
+		if accessLog is not None and self._accessLogReplay and self._endTimeStr :
+			accessLog.replay(self, self._endTimeStr)
+
+	def _invalidateCache_(self, tsId, officeId=None) :
+		'''
+		Discard all cached windows of a time series after it is modified
+		'''
+		cache = self._tsCache
+		diskCache = self._diskCache
+		windowCache = self._windowCache
+		if cache is not None or diskCache is not None or windowCache is not None :
+			if officeId : officeId = officeId.upper()
+			else : officeId = self.getOfficeId()
+			if cache is not None : cache.invalidate(officeId, tsId)
+			if diskCache is not None : diskCache.invalidate((officeId, tsId.upper()))
+			if windowCache is not None : windowCache.invalidate((officeId, tsId.upper()))
+
 	def isOpen(self) :
 		'''
 		Return whether we can use the dbapi object
@@ -1373,9 +2199,10 @@ def setVersionDate(self, dateStr=None) :
 		self.lock()
 		try :
 			if dateStr and not isNonVersioned(dateStr) :
-				self._hts.set(dateStr)
-				self._sdfDATE.setTimeZone(self._utcTimeZone)
-				self._versionDate = self._sdfDATE.format(self._hts.getTimeInMillis())
+				state = self._threadState_()
+				state.hts.set(dateStr)
+				state.sdfDATE.setTimeZone(self._utcTimeZone)
+				self._versionDate = state.sdfDATE.format(state.hts.getTimeInMillis())
 			else :
 				self._versionDate = dateStr
 		finally :
@@ -1430,6 +2257,7 @@ def setTimeWindow(self, *args) :
 			self._startTime.showTimeAsBeginningOfDay(True)
 			self._startTimeStr = self._startTime.dateAndTime(4)
 			self._endTimeStr = self._endTime.dateAndTime(4)
+			if self._isOpen : self._replayAccessLog_()
 
 	def getTimeWindow(self) :
 		'''
@@ -1478,6 +2306,22 @@ def getStoreRule(self) :
 		try     : return self._storeRule
 		finally : self.unlock()
 
+	def setStoreChangedOnly(self, state) :
+		'''
+		Sets whether time series writes send only the values the store rule would change
+		'''
+		self.lock()
+		try     : self._storeChangedOnly = bool(state)
+		finally : self.unlock()
+
+	def getStoreChangedOnly(self) :
+		'''
+		Gets whether time series writes send only the values the store rule would change
+		'''
+		self.lock()
+		try     : return self._storeChangedOnly
+		finally : self.unlock()
+
 	def setRatingLoadMethod(self, loadMethodStr) :
 		'''
 		Sets the default rating load method.
@@ -1507,6 +2351,8 @@ def setOfficeId(self, officeId) :
 				stmt.execute()
 				stmt.close()
 				conn.commit()
+				if _officeId != self._officeId :
+					self._parameterUnits = None
 				self._officeId = _officeId
 			finally :
 				conn.close()
@@ -1591,69 +2437,299 @@ def getLocationVerticalDatum(self, locationId, officeId=None) :
 		finally :
 			self.unlock()
 
-	def setVerticalDatumOffset(self, locationId, verticalDatumId1, verticalDatumId2, value, unit) :
+	def getLocations(self, locationIds, officeId=None, unitSystem=None) :
 		'''
-		Set the offset from vertical datum id 1 to vertical datum id 2 at a location
+		Retrieve the records of many locations at once, as a dictionary keyed by location id of
+		dictionaries of location attributes, or None for unknown locations. Records are cached for
+		a day, so only locations not already retrieved are queried
 		'''
+		if isinstance(locationIds, basestring) :
+			locationIds = [locationIds]
 		self.lock()
 		try :
-			conn = self.getConnection()
-			try :
-				stmt = conn.prepareCall('''
-					begin
-					   cwms_loc.store_vertical_datum_offset(
-					      p_location_id          => :1,
-					      p_vertical_datum_id_1  => :2,
-					      p_vertical_datum_id_2  => :3,
-					      p_offset               => :4,
-					      p_unit                 => :5,
-					      p_office_id            => :6);
-					end;''')
-				stmt.setString(1, locationId)
-				stmt.setString(2, verticalDatumId1)
-				stmt.setString(3, verticalDatumId2)
-				stmt.setDouble(4, value)
-				stmt.setString(5, unit)
-				stmt.setString(6, self.getOfficeId())
-				stmt.execute()
-				stmt.close()
-				conn.commit()
-			finally :
-				conn.close()
+			if officeId is None : officeId = self._officeId
+			if unitSystem is None : unitSystem = self._unitSystem
+			locationCache = self._locationCache
 		finally :
 			self.unlock()
+		officeId = officeId.upper()
+		unitSystem = unitSystem[:2].upper()
+		return locationCache.getLocations(
+			officeId,
+			unitSystem,
+			locationIds,
+			lambda ids : self._queryLocations_(ids, officeId, unitSystem))
 
-	def getVerticalDatumOffset1(self, locationId, verticalDatumId1, verticalDatumId2, unit, officeId=None) :
+	def getLocation(self, locationId, officeId=None, unitSystem=None) :
 		'''
-		Retrieve the offset from vertical datum id 1 to vertical datum id 2 at a location
+		Retrieve the record of one location (see getLocations), or None if it is unknown
 		'''
-		self.lock()
+		return self.getLocations([locationId], officeId, unitSystem)[locationId]
+
+	def clearLocationCache(self) :
+		'''
+		Discard the cached location records
+		'''
+		self._locationCache.clear()
+
+	def _queryLocations_(self, locationIds, officeId, unitSystem) :
+		'''
+		Returns a dictionary of location records keyed by upper-case location id, querying up to
+		500 locations per statement, and a set of the upper-case ids whose query failed
+		'''
+		records, failed = {}, set()
+		locked = self._readLock_()
 		try :
 			conn = self.getConnection()
 			try :
-				stmt = conn.prepareCall('''
-					begin
-					   :1 := cwms_loc.get_vertical_datum_offset(
-					      p_location_id          => :2,
-					      p_vertical_datum_id_1  => :3,
-					      p_vertical_datum_id_2  => :4,
-					      p_unit                 => :5,
-					      p_office_id            => :6);
-					end;''')
-				stmt.registerOutParameter(1, Types.DOUBLE)
-				stmt.setString(2, locationId)
-				stmt.setString(3, verticalDatumId1)
-				stmt.setString(4, verticalDatumId2)
-				stmt.setString(5, unit)
-				stmt.setString(6, (officeId,self.getOfficeId())[officeId is None])
-				stmt.execute()
-				data = stmt.getDouble(1)
-				stmt.close()
-				return data
+				for i in range(0, len(locationIds), 500) :
+					ids = [id.upper() for id in locationIds[i:i+500]]
+					try :
+						self._queryLocationRecords_(conn, ids, officeId, unitSystem, records)
+					except :
+						print("Error retrieving locations %s: %s" % (", ".join(ids), sys.exc_info()[1]))
+						failed.update(ids)
 			finally :
 				conn.close()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
+		return records, failed
+
+	def _queryLocationRecords_(self, conn, ids, officeId, unitSystem, records) :
+		'''
+		Add the records of a list of upper-case location ids to a dictionary keyed by upper-case
+		location id, in one statement
+		'''
+		stmt = conn.prepareStatement('''
+			select location_id,
+			       public_name,
+			       long_name,
+			       description,
+			       elevation,
+			       unit_id,
+			       vertical_datum,
+			       latitude,
+			       longitude,
+			       horizontal_datum,
+			       time_zone_name,
+			       location_kind_id,
+			       nearest_city,
+			       active_flag
+			  from cwms_v_loc
+			 where db_office_id = :1
+			   and unit_system = :2
+			   and upper(location_id) in (%s)'''.strip() % ", ".join([":%d" % (j + 3) for j in range(len(ids))]))
+		try :
+			stmt.setString(1, officeId)
+			stmt.setString(2, unitSystem)
+			for j in range(len(ids)) :
+				stmt.setString(j + 3, ids[j])
+			rs = stmt.executeQuery()
+			try :
+				while rs.next() :
+					locationId = rs.getString(1)
+					elevation, latitude, longitude = [rs.getString(col) for col in (5, 8, 9)]
+					records[locationId.upper()] = {
+						"locationId"      : locationId,
+						"officeId"        : officeId,
+						"publicName"      : rs.getString(2),
+						"longName"        : rs.getString(3),
+						"description"     : rs.getString(4),
+						"elevation"       : float(elevation) if elevation else None,
+						"elevationUnits"  : rs.getString(6),
+						"verticalDatum"   : rs.getString(7),
+						"latitude"        : float(latitude) if latitude else None,
+						"longitude"       : float(longitude) if longitude else None,
+						"horizontalDatum" : rs.getString(10),
+						"timeZone"        : rs.getString(11),
+						"locationKind"    : rs.getString(12),
+						"nearestCity"     : rs.getString(13),
+						"active"          : rs.getString(14) == "T"}
+			finally :
+				rs.close()
+		finally :
+			stmt.close()
+
+	def getLocationLevels(self, levelIds, atTime=None, units=None, officeId=None, timeZone=None) :
+		'''
+		Retrieve the values of many location levels at a time (default now), as a dictionary
+		keyed by level id, or None for unknown levels. Values are cached by effective date, so
+		each level is queried at most once per day
+		'''
+		if isinstance(levelIds, basestring) :
+			levelIds = [levelIds]
+		self.lock()
+		try :
+			if officeId is None : officeId = self._officeId
+			timeZone = (TimeZone.getTimeZone(timeZone), self._timeZone)[timeZone is None]
+			levelCache = self._levelCache
+		finally :
+			self.unlock()
+		officeId = officeId.upper()
+		sdf = self._threadState_().sdf
+		if atTime :
+			atTimeStr = sdf.format(Date(RMAIO.parseDate(atTime.replace(":", "").replace(",", ""), self._utcTimeZone)))
+		else :
+			sdf.setTimeZone(timeZone)
+			try     : atTimeStr = sdf.format(Date())
+			finally : sdf.setTimeZone(self._utcTimeZone)
+		levelUnits = []
+		for levelId in levelIds :
+			if isinstance(units, dict) :
+				levelUnit = units.get(levelId)
+			else :
+				levelUnit = units
+			if not levelUnit :
+				levelUnit = self.unitsForParameter(levelId.split('.')[1])
+			levelUnits.append((levelId, levelUnit))
+		return levelCache.getLevels(
+			officeId,
+			levelUnits,
+			"%s %s" % (atTimeStr[:10], timeZone.getID()),
+			lambda pairs : self._queryLocationLevels_(pairs, atTimeStr, timeZone.getID(), officeId))
+
+	def getLocationLevel(self, levelId, atTime=None, units=None, officeId=None, timeZone=None) :
+		'''
+		Retrieve the value of one location level (see getLocationLevels), or None if it is unknown
+		'''
+		return self.getLocationLevels([levelId], atTime, units, officeId, timeZone)[levelId]
+
+	def clearLocationLevelCache(self) :
+		'''
+		Discard the cached location level values
+		'''
+		self._levelCache.clear()
+
+	def _queryLocationLevels_(self, levelUnits, atTimeStr, timeZoneId, officeId) :
+		'''
+		Returns a dictionary of location level values keyed by upper-case level id, querying up
+		to 100 levels per statement, and a set of the upper-case level ids whose query failed
+		'''
+		values, failed = {}, set()
+		locked = self._readLock_()
+		try :
+			conn = self.getConnection()
+			try :
+				for i in range(0, len(levelUnits), 100) :
+					batch = levelUnits[i:i+100]
+					try :
+						self._queryLocationLevelValues_(conn, batch, atTimeStr, timeZoneId, officeId, values)
+					except :
+						#--------------------------------------------------------#
+						# a level that does not exist fails the whole statement, #
+						# so query the levels of the batch one by one            #
+						#--------------------------------------------------------#
+						for levelUnit in batch :
+							try :
+								self._queryLocationLevelValues_(conn, [levelUnit], atTimeStr, timeZoneId, officeId, values)
+							except :
+								e = sys.exc_info()[1]
+								if not isNotFoundError(e) :
+									print("Error retrieving location level %s: %s" % (levelUnit[0], e))
+									failed.add(levelUnit[0].upper())
+			finally :
+				conn.close()
+		finally :
+			self._readUnlock_(locked)
+		return values, failed
+
+	def _queryLocationLevelValues_(self, conn, batch, atTimeStr, timeZoneId, officeId, values) :
+		'''
+		Add the values of a list of (levelId, units) pairs to a dictionary keyed by upper-case
+		level id, in one statement
+		'''
+		selects = []
+		for j in range(len(batch)) :
+			selects.append('''
+				select %d, t.value
+				  from table(cwms_level.retrieve_location_level_values(
+				           p_location_level_id => :%d,
+				           p_level_units       => :%d,
+				           p_start_time        => to_date(:%d, 'yyyy/mm/dd hh24mi'),
+				           p_end_time          => to_date(:%d, 'yyyy/mm/dd hh24mi'),
+				           p_timezone_id       => :%d,
+				           p_office_id         => :%d)) t'''.strip() % tuple([j] + [6 * j + k for k in range(1, 7)]))
+		stmt = conn.prepareStatement("\nunion all\n".join(selects))
+		try :
+			for j in range(len(batch)) :
+				levelId, units = batch[j]
+				for k, value in enumerate((levelId, units, atTimeStr, atTimeStr, timeZoneId, officeId)) :
+					stmt.setString(6 * j + k + 1, value)
+			rs = stmt.executeQuery()
+			try :
+				while rs.next() :
+					levelId = batch[rs.getInt(1)][0].upper()
+					value = rs.getString(2)
+					if value and levelId not in values :
+						values[levelId] = float(value)
+			finally :
+				rs.close()
+		finally :
+			stmt.close()
+
+	def setVerticalDatumOffset(self, locationId, verticalDatumId1, verticalDatumId2, value, unit) :
+		'''
+		Set the offset from vertical datum id 1 to vertical datum id 2 at a location
+		'''
+		self.lock()
+		try :
+			conn = self.getConnection()
+			try :
+				stmt = conn.prepareCall('''
+					begin
+					   cwms_loc.store_vertical_datum_offset(
+					      p_location_id          => :1,
+					      p_vertical_datum_id_1  => :2,
+					      p_vertical_datum_id_2  => :3,
+					      p_offset               => :4,
+					      p_unit                 => :5,
+					      p_office_id            => :6);
+					end;''')
+				stmt.setString(1, locationId)
+				stmt.setString(2, verticalDatumId1)
+				stmt.setString(3, verticalDatumId2)
+				stmt.setDouble(4, value)
+				stmt.setString(5, unit)
+				stmt.setString(6, self.getOfficeId())
+				stmt.execute()
+				stmt.close()
+				conn.commit()
+			finally :
+				conn.close()
+		finally :
+			self.unlock()
+
+	def getVerticalDatumOffset1(self, locationId, verticalDatumId1, verticalDatumId2, unit, officeId=None) :
+		'''
+		Retrieve the offset from vertical datum id 1 to vertical datum id 2 at a location
+		'''
+		self.lock()
+		try :
+			conn = self.getConnection()
+			try :
+				stmt = conn.prepareCall('''
+					begin
+					   :1 := cwms_loc.get_vertical_datum_offset(
+					      p_location_id          => :2,
+					      p_vertical_datum_id_1  => :3,
+					      p_vertical_datum_id_2  => :4,
+					      p_unit                 => :5,
+					      p_office_id            => :6);
+					end;''')
+				stmt.registerOutParameter(1, Types.DOUBLE)
+				stmt.setString(2, locationId)
+				stmt.setString(3, verticalDatumId1)
+				stmt.setString(4, verticalDatumId2)
+				stmt.setString(5, unit)
+				stmt.setString(6, (officeId,self.getOfficeId())[officeId is None])
+				stmt.execute()
+				data = stmt.getDouble(1)
+				stmt.close()
+				return data
+			finally :
+				conn.close()
+		finally :
+			self.unlock()
 
 	def getVerticalDatumOffset2(self, locationId, unit=None, officeId=None) :
 		'''
@@ -1753,31 +2829,47 @@ def _getParameterUnits_(self) :
 		self.lock()
 		try :
 			if self._parameterUnits is None :
-				conn = self.getConnection()
-				try :
-					stmt = conn.prepareStatement('''
-						select parameter_id,
-								 unit_system,
-								 unit_id
-						  from cwms_v_display_units
-						 where office_id = :1'''.strip())
-					stmt.setString(1, self.getOfficeId())
-					rs = stmt.executeQuery()
-					self._parameterUnits = {'EN' : {}, 'SI' : {}}
-					while rs.next() :
-						param      = rs.getString(1)
-						unitSystem = rs.getString(2)
-						unit       = rs.getString(3)
-						self._parameterUnits[unitSystem[:2].upper()][param] = unit
-					rs.close()
-					stmt.close()
-				finally :
-					conn.close()
+				self._parameterUnits = DataCache.getUnitsRegistry().getTable(self._getUnitsScope_(), self._loadParameterUnits_)
 			return self._parameterUnits
 		finally :
 			self.unlock()
 
-	def unitsForParameter(self, parameter) :
+	def _getUnitsScope_(self) :
+		'''
+		Returns the scope of this database office's parameter units in the shared units registry
+		'''
+		return "DB %s %s" % (self._connectionInfo, self.getOfficeId())
+
+	def _loadParameterUnits_(self) :
+		'''
+		Returns the display units of all parameters for the default office
+		'''
+		parameterUnits = {'EN' : {}, 'SI' : {}}
+		conn = self.getConnection()
+		try :
+			stmt = conn.prepareStatement('''
+				select parameter_id,
+						 unit_system,
+						 unit_id
+				  from cwms_v_display_units
+				 where office_id = :1'''.strip())
+			stmt.setString(1, self.getOfficeId())
+			rs = stmt.executeQuery()
+			while rs.next() :
+				param      = rs.getString(1)
+				unitSystem = rs.getString(2)
+				unit       = rs.getString(3)
+				parameterUnits[unitSystem[:2].upper()][param] = unit
+			rs.close()
+			stmt.close()
+		finally :
+			conn.close()
+		return parameterUnits
+
+	def _lookupParameterUnits_(self, parameter) :
+		'''
+		Returns the units for a parameter or its base parameter from the units table, or None
+		'''
 		units = None
 		try :
 			units =  self._getParameterUnits_()[self._unitSystem[:2].upper()][parameter]
@@ -1787,29 +2879,101 @@ def unitsForParameter(self, parameter) :
 					units = self._getParameterUnits_()[self._unitSystem[:2].upper()][parameter.split('-')[0]]
 				except :
 					pass
-		if not units :
-			conn = self.getConnection()
+		return units
+
+	def _queryDefaultUnits_(self, parameters) :
+		'''
+		Queries the default units of parameters not in the units table, up to 100 parameters per
+		statement, adds them to the shared units registry, and returns them in a dictionary. If a
+		statement fails, its parameters are queried one at a time and those that fail are left out
+		'''
+		unitSystem = self._unitSystem[:2].upper()
+		registry = DataCache.getUnitsRegistry()
+		scope = self._getUnitsScope_()
+		found = {}
+		conn = self.getConnection()
+		try :
+			for i in range(0, len(parameters), 100) :
+				batch = parameters[i:i+100]
+				try :
+					self._queryDefaultUnitsBatch_(conn, batch, unitSystem, found)
+				except :
+					if len(batch) == 1 :
+						raise
+					for parameter in batch :
+						try :
+							self._queryDefaultUnitsBatch_(conn, [parameter], unitSystem, found)
+						except :
+							pass
+		finally :
+			conn.close()
+		for parameter, units in found.items() :
+			registry.put(scope, unitSystem, parameter, units)
+		return found
+
+	def _queryDefaultUnitsBatch_(self, conn, parameters, unitSystem, found) :
+		'''
+		Queries the default units of a list of parameters in one union-all statement and adds them
+		to the found dictionary
+		'''
+		selects = []
+		for j in range(len(parameters)) :
+			selects.append("select %d, cwms_util.get_default_units(:%d, :%d) from dual" % (j, 2 * j + 1, 2 * j + 2))
+		stmt = conn.prepareStatement("\nunion all\n".join(selects))
+		try :
+			for j in range(len(parameters)) :
+				stmt.setString(2 * j + 1, parameters[j])
+				stmt.setString(2 * j + 2, unitSystem)
+			rs = stmt.executeQuery()
 			try :
-				stmt = conn.prepareStatement(
-					"select cwms_util.get_default_units('%s','%s') from dual" % \
-					(parameter, self._unitSystem[:2].upper()))
-				rs = stmt.executeQuery()
-				if rs :
-					rs.next()
-					units = rs.getString(1)
-					self._parameterUnits[self._unitSystem[:2].upper()][parameter] = units
-					rs.close()
-				stmt.close()
+				while rs.next() :
+					units = rs.getString(2)
+					if units :
+						found[parameters[rs.getInt(1)]] = units
 			finally :
-				conn.close()
+				rs.close()
+		finally :
+			stmt.close()
+
+	def unitsForParameter(self, parameter) :
+		units = self._lookupParameterUnits_(parameter)
+		if not units :
+			units = self._queryDefaultUnits_([parameter]).get(parameter)
 		if not units : raise Exception("Could not determine database units for parameter: %s" % parameter)
 		return units
 
+	def preloadParameterUnits(self, names=None) :
+		'''
+		Loads the parameter units table into the process-wide registry ahead of the first
+		retrieval. names may list the parameters or time series ids a report will use; those not in
+		the table are looked up together, up to 100 per statement. Returns the names without units.
+		'''
+		self._getParameterUnits_()
+		parameters = []
+		for name in names or [] :
+			parameter = DataCache.parameterOf(name)
+			if parameter not in parameters and not self._lookupParameterUnits_(parameter) :
+				parameters.append(parameter)
+		found = {}
+		if parameters :
+			#---------------------------------------------------------#
+			# under Jython, java exceptions are not Python Exceptions #
+			#---------------------------------------------------------#
+			try :
+				found = self._queryDefaultUnits_(parameters)
+			except :
+				print("Warning: Could not query default units: %s" % sys.exc_info()[1])
+		missing = [name for name in names or [] if DataCache.parameterOf(name) in parameters and DataCache.parameterOf(name) not in found]
+		if missing :
+			print("Warning: No %s units for: %s" % (self._unitSystem, ", ".join(missing)))
+		return missing
+
 	def _getTimeSeriesExtents_(self, tsId) :
 		'''
 		Returns the time series extents for a time series id
 		'''
-		self.lock()
+		officeId = self.getOfficeId()
+		locked = self._readLock_()
 		#-------------------------------------------------------------------#
 		# getting min and max in same statement is fast enough, but using a #
 		# sub-select for the ts code forces a full table scan!              #
@@ -1825,7 +2989,7 @@ def _getTimeSeriesExtents_(self, tsId) :
 					 where db_office_id = :1
 					   and upper(cwms_ts_id) = upper(:2)
 					'''.strip())
-				stmt.setString(1, self.getOfficeId())
+				stmt.setString(1, officeId)
 				stmt.setString(2, tsId)
 				rs = stmt.executeQuery()
 				try :
@@ -1859,14 +3023,15 @@ def _getTimeSeriesExtents_(self, tsId) :
 			#------------------------#
 			# parse the dates as UTC #
 			#------------------------#
-			self._sdfDATE.setTimeZone(self._utcTimeZone)
+			sdfDATE = self._threadState_().sdfDATE
+			sdfDATE.setTimeZone(self._utcTimeZone)
 			return \
-				self._sdfDATE.parse("%s %s" % (startDATE.dateValue(), startDATE.timeValue())).getTime(), \
-				self._sdfDATE.parse("%s %s" % (endDATE.dateValue(), endDATE.timeValue())).getTime()
+				sdfDATE.parse("%s %s" % (startDATE.dateValue(), startDATE.timeValue())).getTime(), \
+				sdfDATE.parse("%s %s" % (endDATE.dateValue(), endDATE.timeValue())).getTime()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
 
-	def _getTimeSeries_(
+	def _resolveTimeSeriesRequest_(
 		self,
 		tsId,
 		startTimeStr = None,
@@ -1882,7 +3047,7 @@ def _getTimeSeries_(
 		maxVersion = None,
 		officeId = None) :
 		'''
-		Read a time-series from the database
+		Resolve time series retrieval arguments against the object defaults
 		'''
 		self.lock()
 		try :
@@ -1935,7 +3100,87 @@ def _getTimeSeries_(
 				officeId = self.getOfficeId()
 			startTimeStr = startTimeStr.replace(":", "").replace(",", "")
 			endTimeStr = endTimeStr.replace(":", "").replace(",", "")
+			return {
+				"tsId"               : tsId,
+				"units"              : units,
+				"timeZone"           : timeZone,
+				"trim"               : trim,
+				"startTimeInclusive" : startTimeInclusive,
+				"endTimeInclusive"   : endTimeInclusive,
+				"getPrevious"        : getPrevious,
+				"getNext"            : getNext,
+				"versionTimeStr"     : versionTimeStr,
+				"maxVersion"         : maxVersion,
+				"officeId"           : officeId,
+				"startTime"          : RMAIO.parseDate(startTimeStr, self._utcTimeZone),
+				"endTime"            : RMAIO.parseDate(endTimeStr, self._utcTimeZone),
+			}
+		finally :
+			self.unlock()
 
+	def _getTimeSeries_(
+		self,
+		tsId,
+		startTimeStr = None,
+		endTimeStr = None,
+		units = None,
+		timeZone = None,
+		trim = None,
+		startTimeInclusive = None,
+		endTimeInclusive = None,
+		getPrevious = None,
+		getNext = None,
+		versionTimeStr = None,
+		maxVersion = None,
+		officeId = None) :
+		'''
+		Read a time-series from the database
+		'''
+		return self._retrieveTimeSeries_(self._resolveTimeSeriesRequest_(
+			tsId,
+			startTimeStr,
+			endTimeStr,
+			units,
+			timeZone,
+			trim,
+			startTimeInclusive,
+			endTimeInclusive,
+			getPrevious,
+			getNext,
+			versionTimeStr,
+			maxVersion,
+			officeId))
+
+	def _versionTimeString_(self, versionTimeStr) :
+		'''
+		Returns a version date string in the 'yyyy-mm-dd hh24miss' format for the database, or ''
+		'''
+		if not versionTimeStr :
+			return ''
+		if isNonVersioned(versionTimeStr) :
+			return '1111-11-11 000000'
+		state = self._threadState_()
+		state.hts.set(versionTimeStr)
+		state.sdfDATE.setTimeZone(self._utcTimeZone)
+		return state.sdfDATE.format(state.hts.getTimeInMillis()).replace(":", "").replace(",", "")
+
+	def _retrieveTimeSeries_(self, request) :
+		'''
+		Read a time-series from the database for a resolved request
+		'''
+		tsId               = request["tsId"]
+		units              = request["units"]
+		timeZone           = request["timeZone"]
+		trim               = request["trim"]
+		startTimeInclusive = request["startTimeInclusive"]
+		endTimeInclusive   = request["endTimeInclusive"]
+		getPrevious        = request["getPrevious"]
+		getNext            = request["getNext"]
+		versionTimeStr     = request["versionTimeStr"]
+		maxVersion         = request["maxVersion"]
+		officeId           = request["officeId"]
+		locked = self._readLock_()
+		try :
 			conn = self.getConnection()
 			try :
 				#------------------#
@@ -1962,56 +3207,43 @@ def _getTimeSeries_(
 				#-------------------------#
 				# set the call parameters #
 				#-------------------------#
-				startTime = self._sdf.format(Date(RMAIO.parseDate(startTimeStr, self._utcTimeZone)))
-				endTime = self._sdf.format(Date(RMAIO.parseDate(endTimeStr, self._utcTimeZone)))
-				if not versionTimeStr :
-					versionTime = ''
-				else :
-					if isNonVersioned(versionTimeStr) :
-						versionTime = '1111-11-11 000000'
-					else :
-						self._hts.set(versionTimeStr)
-						self._sdfDATE.setTimeZone(self._utcTimeZone)
-						versionTime = self._sdfDATE.format(self._hts.getTimeInMillis()).replace(":", "").replace(",", "")
-				state = ('F','T')
+				state = self._threadState_()
+				startTime = state.sdf.format(Date(request["startTime"]))
+				endTime = state.sdf.format(Date(request["endTime"]))
+				versionTime = self._versionTimeString_(versionTimeStr)
+				flag = ('F','T')
 				stmt.registerOutParameter(1, OracleTypes.CURSOR)
 				stmt.setString(2, tsId)
 				stmt.setString(3, units)
 				stmt.setString(4, startTime)
 				stmt.setString(5, endTime)
 				stmt.setString(6, timeZone.getID())
-				stmt.setString(7, state[trim])
-				stmt.setString(8, state[startTimeInclusive])
-				stmt.setString(9, state[endTimeInclusive])
-				stmt.setString(10, state[getPrevious])
-				stmt.setString(11, state[getNext])
+				stmt.setString(7, flag[trim])
+				stmt.setString(8, flag[startTimeInclusive])
+				stmt.setString(9, flag[endTimeInclusive])
+				stmt.setString(10, flag[getPrevious])
+				stmt.setString(11, flag[getNext])
 				stmt.setString(12, versionTime)
-				stmt.setString(13, state[maxVersion])
+				stmt.setString(13, flag[maxVersion])
 				stmt.setString(14, officeId)
 				#----------------------------------------#
 				# execute the call and retrieve the data #
 				#----------------------------------------#
-				times, values, qualities = [], [], []
-				self._sdfDATE.setTimeZone(timeZone)
 				stmt.execute()
 				rs = stmt.getCursor(1)
 				try :
-					while rs.next() :
-						d = rs.getDATE(1)
-						if d is None: break
-						value = rs.getDouble(2)
-						if rs.wasNull() : value = Const.UNDEFINED_DOUBLE
-						quality = rs.getInt(3)
-						times.append(self._sdfDATE.parse("%s %s" % (d.dateValue(), d.timeValue())).getTime())
-						values.append(value)
-						qualities.append(quality)
+					times, values, qualities = readColumns(
+						rs,
+						("time", "double", "int"),
+						self._fetchSize,
+						Calendar.getInstance(timeZone))
 				finally:
 					rs.close()
 				stmt.close()
-				self._sdf.setTimeZone(timeZone)
-				startTime = self._sdf.parse(startTime).getTime()
-				endTime = self._sdf.parse(endTime).getTime()
-				self._sdf.setTimeZone(self._utcTimeZone)
+				state.sdf.setTimeZone(timeZone)
+				startTime = state.sdf.parse(startTime).getTime()
+				endTime = state.sdf.parse(endTime).getTime()
+				state.sdf.setTimeZone(self._utcTimeZone)
 				#--------------------------------------------#
 				# get the vertical datum info for elevations #
 				#--------------------------------------------#
@@ -2034,148 +3266,1028 @@ def _getTimeSeries_(
 			finally :
 				conn.close()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
+
+	def _putTimeSeries_(
+		self,
+		tsId,
+		times,
+		values,
+		qualities,
+		units,
+		storeRule,
+		overrideProtection,
+		versionTimeStr,
+		officeId) :
+		'''
+		Write a time-series to the database
+		'''
+		self.lock()
+		try :
+			conn = self.getConnection()
+			try :
+				self._storeTimeSeries_(
+					conn,
+					tsId,
+					times,
+					values,
+					qualities,
+					units,
+					storeRule,
+					overrideProtection,
+					self._storeVersionTime_(versionTimeStr),
+					officeId)
+				conn.commit()
+			finally :
+				conn.close()
+		finally :
+			self.unlock()
+
+	def _storeVersionTime_(self, versionTimeStr) :
+		'''
+		Returns a version date string in the 'yyyy-mm-dd hh24miss' format for storing, or '' for
+		non-versioned data
+		'''
+		if versionTimeStr is None : versionTimeStr = self._versionDate
+		if isNonVersioned(versionTimeStr) :
+			return ''
+		state = self._threadState_()
+		state.hts.set(versionTimeStr)
+		state.sdfDATE.setTimeZone(self._utcTimeZone)
+		return state.sdfDATE.format(state.hts.getTimeInMillis()).replace(":", "").replace(",", "")
+
+	def _storeTimeSeries_(
+		self,
+		conn,
+		tsId,
+		times,
+		values,
+		qualities,
+		units,
+		storeRule,
+		overrideProtection,
+		versionTime,
+		officeId) :
+		'''
+		Write a time-series on a connection without committing
+		'''
+		#------------------------------------------------#
+		# bind typed collections if the driver allows it #
+		#------------------------------------------------#
+		arrays = None
+		if self._arrayStore is not False :
+			arrays = self._createStoreArrays_(conn, times, values, qualities)
+		if arrays is not None :
+			self._storeTimeSeriesArrays_(conn, tsId, units, arrays, storeRule, overrideProtection, versionTime, officeId)
+			return
+		#---------------------------------------#
+		# otherwise prepare the call with CLOBs #
+		#---------------------------------------#
+		stmt = conn.prepareCall('''
+			declare
+				l_cwms_ts_id     varchar2(256) := :1;
+				l_units          varchar2(32)  := :2;
+				l_times_clob     clob          := :3;
+				l_values_clob    clob          := :4;
+				l_qualities_clob clob          := :5;
+				l_store_rule     varchar2(32)  := :6;
+				l_override_prot  varchar2(1)   := :7;
+				l_version_date   varchar2(32)  := :8;
+				l_office_id      varchar2(16)  := :9;
+				l_time_zone      varchar2(28)  := :10;
+				l_times          cwms_t_str_tab;
+				l_values         cwms_t_str_tab;
+				l_qualities      cwms_t_str_tab;
+				l_tsv_array      cwms_t_tsv_array;
+			begin
+				if l_times_clob is null and l_values_clob is null then
+					return;
+				end if;
+				if l_times_clob is null then
+					cwms_err.raise('ERROR', 'No times specified');
+				end if;
+				if l_values_clob is null then
+					cwms_err.raise('ERROR', 'No values specified');
+				end if;
+				l_times     := cwms_util.split_text(l_times_clob,     '|');
+				l_values    := cwms_util.split_text(l_values_clob,    '|');
+				l_qualities := cwms_util.split_text(l_qualities_clob, '|');
+				if l_values.count != l_times.count then
+					cwms_err.raise('ERROR', 'Different number of times and values');
+				end if;
+				if l_qualities.count != l_times.count then
+					cwms_err.raise('ERROR', 'Different number of times and qualities');
+				end if;
+
+				l_tsv_array := cwms_t_tsv_array();
+				l_tsv_array.extend(l_times.count);
+				for i in 1..l_tsv_array.count loop
+					l_tsv_array(i) := cwms_t_tsv(
+						from_tz(cwms_util.to_timestamp(to_number(l_times(i))), 'UTC'),
+						to_binary_double(l_values(i)),
+						case
+						when l_qualities is null then 0
+						else nvl(to_number(l_qualities(i)), 0)
+						end);
+				end loop;
+
+				cwms_ts.store_ts(
+					l_cwms_ts_id,
+					l_units,
+					l_tsv_array,
+					l_store_rule,
+					l_override_prot,
+					cwms_util.change_timezone(to_date(l_version_date, 'yyyy-mm-dd hh24miss'), l_time_zone, 'UTC'),
+					l_office_id);
+			end;'''.strip())
+		#-------------------------#
+		# set the call parameters #
+		#-------------------------#
+		_times = conn.createClob()
+		_times.setString(1, "|".join(map(str, times)))
+		_values = conn.createClob()
+		_values.setString(1, "|".join(map(str, values)).replace(str(Const.UNDEFINED_DOUBLE), ""))
+		_qualities = conn.createClob()
+		_qualities.setString(1, "|".join(map(str, qualities)))
+		stmt.setString(1, tsId)
+		stmt.setString(2, units)
+		stmt.setClob(3, _times)
+		stmt.setClob(4, _values)
+		stmt.setClob(5, _qualities)
+		stmt.setString(6, storeRule)
+		stmt.setString(7, ('F','T')[overrideProtection])
+		stmt.setString(8, versionTime)
+		stmt.setString(9, officeId)
+		stmt.setString(10, self._timeZone.getID())
+		#----------------#
+		# store the data #
+		#----------------#
+		stmt.execute()
+		for clob in _times, _values, _qualities :
+			try    : clob.free()
+			except : pass
+		stmt.close()
+
+	def _createStoreArrays_(self, conn, times, values, qualities) :
+		'''
+		Return the times, values and qualities as Oracle collections of CWMS_T_NUMBER_TAB and
+		CWMS_T_DOUBLE_TAB, or None if the driver or schema cannot bind them
+		'''
+		return self._createOracleArrays_(conn, (
+			("CWMS_T_NUMBER_TAB", times,     "l"),
+			("CWMS_T_DOUBLE_TAB", values,    "d"),
+			("CWMS_T_NUMBER_TAB", qualities, "i")))
+
+	def _createOracleArrays_(self, conn, specs) :
+		'''
+		Return a tuple of Oracle collections from (typeName, values, javaArray typeCode) specs,
+		or None if the driver or schema cannot bind them
+		'''
+		try :
+			from oracle.jdbc import OracleConnection
+			oracleConn = conn.unwrap(OracleConnection)
+			arrays = tuple([oracleConn.createOracleArray(typeName, javaArray(values, typeCode)) for typeName, values, typeCode in specs])
+		except :
+			#-------------------------------------------------------------#
+			# keep using the CLOB store if array binding has never worked #
+			#-------------------------------------------------------------#
+			if self._arrayStore is None :
+				print("Array binding is not available (%s); storing time series through CLOBs" % sys.exc_info()[1])
+				self._arrayStore = False
+			return None
+		self._arrayStore = True
+		return arrays
+
+	def _storeTimeSeriesArrays_(self, conn, tsId, units, arrays, storeRule, overrideProtection, versionTime, officeId) :
+		'''
+		Write a time-series to the database from Oracle collections of UTC millisecond times,
+		values and qualities, with no text conversion on either side
+		'''
+		stmt = conn.prepareCall('''
+			declare
+				l_cwms_ts_id    varchar2(256)     := :1;
+				l_units         varchar2(32)      := :2;
+				l_times         cwms_t_number_tab := :3;
+				l_values        cwms_t_double_tab := :4;
+				l_qualities     cwms_t_number_tab := :5;
+				l_undefined     binary_double     := :6;
+				l_store_rule    varchar2(32)      := :7;
+				l_override_prot varchar2(1)       := :8;
+				l_version_date  varchar2(32)      := :9;
+				l_office_id     varchar2(16)      := :10;
+				l_time_zone     varchar2(28)      := :11;
+				l_tsv_array     cwms_t_tsv_array;
+			begin
+				if l_times is null or l_times.count = 0 then
+					return;
+				end if;
+				if l_values.count != l_times.count then
+					cwms_err.raise('ERROR', 'Different number of times and values');
+				end if;
+				if l_qualities.count != l_times.count then
+					cwms_err.raise('ERROR', 'Different number of times and qualities');
+				end if;
+
+				l_tsv_array := cwms_t_tsv_array();
+				l_tsv_array.extend(l_times.count);
+				for i in 1..l_tsv_array.count loop
+					l_tsv_array(i) := cwms_t_tsv(
+						from_tz(cwms_util.to_timestamp(l_times(i)), 'UTC'),
+						case when l_values(i) = l_undefined then null else l_values(i) end,
+						nvl(l_qualities(i), 0));
+				end loop;
+
+				cwms_ts.store_ts(
+					l_cwms_ts_id,
+					l_units,
+					l_tsv_array,
+					l_store_rule,
+					l_override_prot,
+					cwms_util.change_timezone(to_date(l_version_date, 'yyyy-mm-dd hh24miss'), l_time_zone, 'UTC'),
+					l_office_id);
+			end;'''.strip())
+		try :
+			stmt.setString(1, tsId)
+			stmt.setString(2, units)
+			stmt.setArray(3, arrays[0])
+			stmt.setArray(4, arrays[1])
+			stmt.setArray(5, arrays[2])
+			stmt.setDouble(6, Const.UNDEFINED_DOUBLE)
+			stmt.setString(7, storeRule)
+			stmt.setString(8, ('F','T')[overrideProtection])
+			stmt.setString(9, versionTime)
+			stmt.setString(10, officeId)
+			stmt.setString(11, self._timeZone.getID())
+			stmt.execute()
+		finally :
+			stmt.close()
+			for array in arrays :
+				try    : array.free()
+				except : pass
+
+	def _storeTimeSeriesBatch_(self, conn, batch) :
+		'''
+		Write a batch of _prepareTimeSeriesPut_ results that share their store rule, override
+		protection, version date and office on a connection without committing. Returns a list of
+		None for each series stored or the error message for each series that was not
+		'''
+		storeRule, overrideProtection, versionDate, officeId = batch[0][5:9]
+		versionTime = self._storeVersionTime_(versionDate)
+		arrays = None
+		if self._arrayStore is not False :
+			times, values, qualities = [], [], []
+			for put in batch :
+				times.extend(put[1])
+				values.extend(put[2])
+				qualities.extend(put[3])
+			arrays = self._createOracleArrays_(conn, (
+				("CWMS_T_STR_TAB",    [put[0] for put in batch],      "s"),
+				("CWMS_T_STR_TAB",    [put[4] for put in batch],      "s"),
+				("CWMS_T_NUMBER_TAB", [len(put[1]) for put in batch], "i"),
+				("CWMS_T_NUMBER_TAB", times,                          "l"),
+				("CWMS_T_DOUBLE_TAB", values,                         "d"),
+				("CWMS_T_NUMBER_TAB", qualities,                      "i")))
+		if arrays is None :
+			#----------------------------------------------------#
+			# one call per series, each undone alone if it fails #
+			#----------------------------------------------------#
+			errors = []
+			for put in batch :
+				savepoint = conn.setSavepoint()
+				try :
+					self._storeTimeSeries_(conn, put[0], put[1], put[2], put[3], put[4], storeRule, overrideProtection, versionTime, officeId)
+					errors.append(None)
+				except :
+					errors.append(str(sys.exc_info()[1]))
+					conn.rollback(savepoint)
+			return errors
+		#----------------------------------------------------------#
+		# one call for the batch; each series is stored in its own #
+		# nested block so a failure only undoes that series        #
+		#----------------------------------------------------------#
+		stmt = conn.prepareCall('''
+			declare
+				l_ts_ids        cwms_t_str_tab    := :1;
+				l_units         cwms_t_str_tab    := :2;
+				l_counts        cwms_t_number_tab := :3;
+				l_times         cwms_t_number_tab := :4;
+				l_values        cwms_t_double_tab := :5;
+				l_qualities     cwms_t_number_tab := :6;
+				l_undefined     binary_double     := :7;
+				l_store_rule    varchar2(32)      := :8;
+				l_override_prot varchar2(1)       := :9;
+				l_version_date  varchar2(32)      := :10;
+				l_office_id     varchar2(16)      := :11;
+				l_time_zone     varchar2(28)      := :12;
+				l_errors        cwms_t_str_tab    := cwms_t_str_tab();
+				l_tsv_array     cwms_t_tsv_array;
+				l_first         pls_integer       := 1;
+				l_k             pls_integer;
+			begin
+				l_errors.extend(l_ts_ids.count);
+				for i in 1..l_ts_ids.count loop
+					if l_counts(i) > 0 then
+						l_tsv_array := cwms_t_tsv_array();
+						l_tsv_array.extend(l_counts(i));
+						for j in 1..l_counts(i) loop
+							l_k := l_first + j - 1;
+							l_tsv_array(j) := cwms_t_tsv(
+								from_tz(cwms_util.to_timestamp(l_times(l_k)), 'UTC'),
+								case when l_values(l_k) = l_undefined then null else l_values(l_k) end,
+								nvl(l_qualities(l_k), 0));
+						end loop;
+						begin
+							savepoint store_series;
+							cwms_ts.store_ts(
+								l_ts_ids(i),
+								l_units(i),
+								l_tsv_array,
+								l_store_rule,
+								l_override_prot,
+								cwms_util.change_timezone(to_date(l_version_date, 'yyyy-mm-dd hh24miss'), l_time_zone, 'UTC'),
+								l_office_id);
+						exception
+							when others then
+								l_errors(i) := substr(sqlerrm, 1, 1000);
+								begin
+									rollback to store_series;
+								exception
+									when others then null;
+								end;
+						end;
+					end if;
+					l_first := l_first + l_counts(i);
+				end loop;
+				:13 := l_errors;
+			end;'''.strip())
+		try :
+			for i in range(6) :
+				stmt.setArray(i + 1, arrays[i])
+			stmt.setDouble(7, Const.UNDEFINED_DOUBLE)
+			stmt.setString(8, storeRule)
+			stmt.setString(9, ('F','T')[overrideProtection])
+			stmt.setString(10, versionTime)
+			stmt.setString(11, officeId)
+			stmt.setString(12, self._timeZone.getID())
+			stmt.registerOutParameter(13, OracleTypes.ARRAY, "CWMS_T_STR_TAB")
+			stmt.execute()
+			errors = list(stmt.getArray(13).getArray())
+		finally :
+			stmt.close()
+			for array in arrays :
+				try    : array.free()
+				except : pass
+		return [error and str(error) or None for error in errors]
+
+	def _utcWindow_(self, request) :
+		'''
+		Return the start and end of a resolved request in UTC milliseconds
+		'''
+		#-------------------------------------------------------------#
+		# the request window is in the request time zone; make it UTC #
+		#-------------------------------------------------------------#
+		sdf = self._threadState_().sdf
+		startTime = sdf.format(Date(request["startTime"]))
+		endTime = sdf.format(Date(request["endTime"]))
+		sdf.setTimeZone(request["timeZone"])
+		try :
+			return sdf.parse(startTime).getTime(), sdf.parse(endTime).getTime()
+		finally :
+			sdf.setTimeZone(self._utcTimeZone)
+
+	def _expectWindows_(self, windows) :
+		'''
+		Announce a list of (tsId, startTimeStr, endTimeStr, units) windows that are about to be
+		read, so that overlapping reads of the same series are retrieved together
+		'''
+		windowCache = self._windowCache
+		if windowCache is None :
+			return
+		for tsId, startTimeStr, endTimeStr, units in windows :
+			try :
+				request = self._resolveTimeSeriesRequest_(tsId, startTimeStr, endTimeStr, units)
+			except :
+				#---------------------------------------#
+				# the read itself will report the error #
+				#---------------------------------------#
+				continue
+			if self._isDiskCacheable_(request) :
+				startTime, endTime = self._utcWindow_(request)
+				windowCache.expect(DataCache.diskSeriesKey(request), startTime, endTime)
+
+	def _isDiskCacheable_(self, request) :
+		'''
+		Return whether a resolved request can be served through the window and disk caches. Reads
+		that include the previous or next value are not
+		'''
+		return not request["getPrevious"] and not request["getNext"]
+
+	def _intervalRequest_(self, request, start, end) :
+		'''
+		Return the request for the untrimmed values of a resolved request over the closed UTC
+		interval [start, end], as retrieved for the window and disk caches
+		'''
+		intervalRequest = dict(request)
+		intervalRequest.update({
+			"timeZone"           : self._utcTimeZone,
+			"startTime"          : start,
+			"endTime"            : end,
+			"trim"               : False,
+			"startTimeInclusive" : True,
+			"endTimeInclusive"   : True,
+			"getPrevious"        : False,
+			"getNext"            : False})
+		return intervalRequest
+
+	def _retrieveCachedTimeSeries_(self, request, fetched=None) :
+		'''
+		Read a time-series for a resolved request through the window and disk caches, retrieving
+		only the periods that are not already cached. fetched may hold the points of periods that
+		were already retrieved, keyed by (start, end) UTC interval
+		'''
+		windowCache = self._windowCache
+		diskCache = self._diskCache
+		timeZone = request["timeZone"]
+		startTime, endTime = self._utcWindow_(request)
+
+		def fetch(start, end) :
+			if fetched is not None and (start, end) in fetched :
+				return fetched[(start, end)]
+			times, values, qualities, units, s, e, tz, vertDatumInfo = self._retrieveTimeSeries_(self._intervalRequest_(request, start, end))
+			return times, values, qualities, vertDatumInfo
+
+		seriesKey = DataCache.diskSeriesKey(request)
+		if diskCache is not None :
+			fetchFromDb = fetch
+			fetch = lambda start, end : diskCache.getPoints(seriesKey, start, end, fetchFromDb)
+		if windowCache is not None :
+			points = windowCache.getPoints(seriesKey, startTime, endTime, fetch)
+		else :
+			points = fetch(startTime, endTime)
+		if points is None : return None
+		times, values, qualities, vertDatumInfo = points
+		times, values, qualities = DataCache.selectPoints(
+			times,
+			values,
+			qualities,
+			startTime,
+			endTime,
+			request["startTimeInclusive"],
+			request["endTimeInclusive"],
+			request["trim"],
+			isUndefined)
+		return times, values, qualities, request["units"], startTime, endTime, timeZone, vertDatumInfo
+
+	def getTimeSeriesContainer(
+		self,
+		tsId,
+		startTimeStr = None,
+		endTimeStr = None,
+		units = None,
+		timeZone = None,
+		trim = None,
+		startInclusive = None,
+		endInclusive = None,
+		getPrevious = None,
+		getNext = None,
+		versionDate = None,
+		maxVersion = None,
+		officeId = None) :
+		'''
+		Read a time-series from the database and return it in a TimeSeriesContainer object.
+		'''
+		request = self._resolveTimeSeriesRequest_(
+			tsId,
+			startTimeStr,
+			endTimeStr,
+			units,
+			timeZone,
+			trim,
+			startInclusive,
+			endInclusive,
+			getPrevious,
+			getNext,
+			versionDate,
+			maxVersion,
+			officeId)
+		accessLog = self._accessLog
+		if accessLog is not None : accessLog.record(request, self._endTimeStr)
+		#-----------------------#
+		# look in the tsc cache #
+		#-----------------------#
+		cache = self._tsCache
+		if cache is not None :
+			key = DataCache.timeSeriesKey(request)
+			tsc = cache.get(key)
+			if tsc is not None : return tsc
+		#--------------------------------------------------------#
+		# get data from the window or disk cache or the database #
+		#--------------------------------------------------------#
+		if (self._windowCache is not None or self._diskCache is not None) and self._isDiskCacheable_(request) :
+			retrieved = self._retrieveCachedTimeSeries_(request)
+			if retrieved is None : return None
+			times, values, qualities, units, startTime, endTime, timeZone, vertDatumInfo = retrieved
+		else :
+			times, values, qualities, units, startTime, endTime, timeZone, vertDatumInfo = self._retrieveTimeSeries_(request)
+		tsc = makeTimeSeriesContainer(tsId, times, values, qualities, units, timeZone, startTime, endTime, vertDatumInfo)
+		if cache is not None :
+			cache.put(key, tsc)
+		return tsc
+
+	def _retrieveTimeSeriesContainer_(self, request) :
+		'''
+		Read a time-series from the database for a resolved request, bypassing the caches
+		'''
+		times, values, qualities, units, startTime, endTime, timeZone, vertDatumInfo = self._retrieveTimeSeries_(request)
+		return makeTimeSeriesContainer(request["tsId"], times, values, qualities, units, timeZone, startTime, endTime, vertDatumInfo)
+
+	def getTimeSeriesContainers(
+		self,
+		tsIds,
+		startTimeStr = None,
+		endTimeStr = None,
+		units = None,
+		timeZone = None,
+		trim = None,
+		startInclusive = None,
+		endInclusive = None,
+		getPrevious = None,
+		getNext = None,
+		versionDate = None,
+		maxVersion = None,
+		officeId = None,
+		batchSize = None) :
+		'''
+		Read many time-series from the database, retrieving up to batchSize series per query
+		(the object's batch size by default). When the window or disk cache is enabled, only the
+		periods of each series that are not cached are queried.
+		Returns a dictionary of TimeSeriesContainer objects keyed by time series id; ids that
+		could not be retrieved map to None.
+
+		The units parameter may be None (default units for each parameter), a single unit string
+		applied to every id, or a dictionary of units keyed by time series id.
+		'''
+		if isinstance(tsIds, basestring) :
+			tsIds = [tsIds]
+		if batchSize is None :
+			batchSize = self.getBatchSize()
+		batchSize = int(batchSize)
+		if batchSize < 1 :
+			raise ValueError("Batch size must be a positive integer")
+		#-----------------------------------------#
+		# remove duplicate ids, keeping the order #
+		#-----------------------------------------#
+		uniqueIds = []
+		for tsId in tsIds :
+			if tsId not in uniqueIds :
+				uniqueIds.append(tsId)
+		results = dict([(tsId, None) for tsId in uniqueIds])
+		cache = self._tsCache
+		windowCache = self._windowCache
+		diskCache = self._diskCache
+		accessLog = self._accessLog
+		sdf = self._threadState_().sdf
+		requests = []
+		cachedRequests = []
+		for tsId in uniqueIds :
+			if isinstance(units, dict) :
+				tsUnits = units.get(tsId)
+			else :
+				tsUnits = units
+			try :
+				request = self._resolveTimeSeriesRequest_(
+					tsId,
+					startTimeStr,
+					endTimeStr,
+					tsUnits,
+					timeZone,
+					trim,
+					startInclusive,
+					endInclusive,
+					getPrevious,
+					getNext,
+					versionDate,
+					maxVersion,
+					officeId)
+			except :
+				print("Error retrieving %s: %s" % (tsId, sys.exc_info()[1]))
+				continue
+			if accessLog is not None :
+				accessLog.record(request, self._endTimeStr)
+			if cache is not None :
+				tsc = cache.get(DataCache.timeSeriesKey(request))
+				if tsc is not None :
+					results[tsId] = tsc
+					continue
+			startTime, endTime = self._utcWindow_(request)
+			if (windowCache is not None or diskCache is not None) and self._isDiskCacheable_(request) :
+				try :
+					gaps = DataCache.uncachedIntervals(windowCache, diskCache, DataCache.diskSeriesKey(request), startTime, endTime)
+				except :
+					print("Error retrieving %s: %s" % (tsId, sys.exc_info()[1]))
+					continue
+				cachedRequests.append((tsId, request, gaps))
+				continue
+			#---------------------------------------------------------#
+			# query in UTC so the times come back as UTC milliseconds #
+			#---------------------------------------------------------#
+			utcRequest = dict(request)
+			utcRequest["timeZone"] = self._utcTimeZone
+			requests.append((request, startTime, endTime, (utcRequest, sdf.format(Date(startTime)), sdf.format(Date(endTime)))))
+		#------------------------------------#
+		# retrieve the series batch by batch #
+		#------------------------------------#
+		for i in range(0, len(requests), batchSize) :
+			batch = requests[i:i+batchSize]
+			try :
+				rows = self._queryTimeSeriesWindows_([window for request, startTime, endTime, window in batch])
+			except :
+				#-----------------------------------------------------#
+				# a series that does not exist fails the whole query, #
+				# so read the series of the batch one by one          #
+				#-----------------------------------------------------#
+				rows = []
+				for request, startTime, endTime, window in batch :
+					try :
+						rows.append(self._queryTimeSeriesWindows_([window])[0])
+					except :
+						print("Error retrieving %s: %s" % (request["tsId"], sys.exc_info()[1]))
+						rows.append(None)
+			elevations = []
+			for request, startTime, endTime, window in batch :
+				loc, param = request["tsId"].split(".")[:2]
+				if param.upper().startswith("ELEV") :
+					elevations.append((request["tsId"], (loc, request["units"], request["officeId"])))
+			infos, failed = self._queryVerticalDatumInfo_([item for tsId, item in elevations])
+			vertDatumInfos = dict(zip([tsId for tsId, item in elevations], infos))
+			#--------------------------------------------------------#
+			# leave out elevations whose datum could not be read     #
+			# rather than returning them without their datum info    #
+			#--------------------------------------------------------#
+			failedIds = set([elevations[j][0] for j in failed])
+			for (request, startTime, endTime, window), points in zip(batch, rows) :
+				if points is None or request["tsId"] in failedIds :
+					continue
+				tsId = request["tsId"]
+				times, values, qualities = points
+				tsc = makeTimeSeriesContainer(
+					tsId,
+					times,
+					[Const.UNDEFINED_DOUBLE if value is None else value for value in values],
+					qualities,
+					request["units"],
+					request["timeZone"],
+					startTime,
+					endTime,
+					vertDatumInfos.get(tsId))
+				if cache is not None :
+					cache.put(DataCache.timeSeriesKey(request), tsc)
+				results[tsId] = tsc
+		#-------------------------------------------------------#
+		# query the uncached periods of all cacheable series in #
+		# batches, then read each series through the caches     #
+		#-------------------------------------------------------#
+		fetched = self._queryUncachedIntervals_(cachedRequests, batchSize)
+		for (tsId, request, gaps), points in zip(cachedRequests, fetched) :
+			try :
+				retrieved = self._retrieveCachedTimeSeries_(request, points)
+			except :
+				print("Error retrieving %s: %s" % (tsId, sys.exc_info()[1]))
+				continue
+			if retrieved is None :
+				continue
+			times, values, qualities, tsUnits, startTime, endTime, tsTimeZone, vertDatumInfo = retrieved
+			tsc = makeTimeSeriesContainer(tsId, times, values, qualities, tsUnits, tsTimeZone, startTime, endTime, vertDatumInfo)
+			if cache is not None :
+				cache.put(DataCache.timeSeriesKey(request), tsc)
+			results[tsId] = tsc
+		return results
+
+	def _queryUncachedIntervals_(self, cachedRequests, batchSize) :
+		'''
+		Query the uncached intervals of a list of (tsId, request, intervals) in batches of batchSize
+		intervals. Returns a dictionary for each item of (times, values, qualities, vertDatumInfo)
+		keyed by (start, end) UTC interval, with None for the intervals that could not be retrieved
+		'''
+		fetched = [{} for item in cachedRequests]
+		sdf = self._threadState_().sdf
+		windows = []
+		for index, (tsId, request, gaps) in enumerate(cachedRequests) :
+			for gapStart, gapEnd in gaps :
+				windows.append((index, (gapStart, gapEnd), (
+					self._intervalRequest_(request, gapStart, gapEnd),
+					sdf.format(Date(gapStart)),
+					sdf.format(Date(gapEnd)))))
+		for i in range(0, len(windows), batchSize) :
+			batch = windows[i:i+batchSize]
+			try :
+				rows = self._queryTimeSeriesWindows_([window for index, gap, window in batch])
+			except :
+				rows = []
+				for index, gap, window in batch :
+					try :
+						rows.append(self._queryTimeSeriesWindows_([window])[0])
+					except :
+						print("Error retrieving %s: %s" % (window[0]["tsId"], sys.exc_info()[1]))
+						rows.append(None)
+			for (index, gap, window), points in zip(batch, rows) :
+				if points is None :
+					fetched[index][gap] = None
+					continue
+				times, values, qualities = points
+				fetched[index][gap] = (times, [Const.UNDEFINED_DOUBLE if value is None else value for value in values], qualities, None)
+		#------------------------------------------------------#
+		# elevations whose datum cannot be read are not cached #
+		#------------------------------------------------------#
+		elevations = [index for index, (tsId, request, gaps) in enumerate(cachedRequests) \
+			if gaps and request["tsId"].split(".")[1].upper().startswith("ELEV")]
+		infos, failed = self._queryVerticalDatumInfo_([(
+			cachedRequests[index][1]["tsId"].split(".")[0],
+			cachedRequests[index][1]["units"],
+			cachedRequests[index][1]["officeId"]) for index in elevations])
+		for j, index in enumerate(elevations) :
+			for gap, points in list(fetched[index].items()) :
+				if points is not None :
+					fetched[index][gap] = None if j in failed else points[:3] + (infos[j],)
+		return fetched
+
+	def _queryVerticalDatumInfo_(self, items) :
+		'''
+		Returns the vertical datum information for each (location, units, officeId) item, querying
+		up to 100 items per statement, and the set of indices of the items whose information could
+		not be retrieved. If a statement fails, its items are queried one at a time
+		'''
+		infos = [None] * len(items)
+		failed = set()
+		if not items :
+			return infos, failed
+		locked = self._readLock_()
+		try :
+			conn = self.getConnection()
+			try :
+				for i in range(0, len(items), 100) :
+					batch = items[i:i+100]
+					try :
+						self._queryVerticalDatumInfoBatch_(conn, batch, i, infos)
+					except :
+						for j in range(len(batch)) :
+							try :
+								self._queryVerticalDatumInfoBatch_(conn, batch[j:j+1], i + j, infos)
+							except :
+								print("Error retrieving vertical datum information for %s: %s" % (batch[j][0], sys.exc_info()[1]))
+								failed.add(i + j)
+			finally :
+				conn.close()
+		finally :
+			self._readUnlock_(locked)
+		return infos, failed
 
-	def _putTimeSeries_(
+	def _queryVerticalDatumInfoBatch_(self, conn, batch, offset, infos) :
+		'''
+		Queries the vertical datum information of a list of (location, units, officeId) items in
+		one union-all statement and stores it in infos starting at offset
+		'''
+		selects = ["select %d, cwms_loc.get_vertical_datum_info_f(:%d, :%d, :%d) from dual" % (
+			j, 3 * j + 1, 3 * j + 2, 3 * j + 3) for j in range(len(batch))]
+		stmt = conn.prepareStatement("\nunion all\n".join(selects))
+		try :
+			for j in range(len(batch)) :
+				for k, value in enumerate(batch[j]) :
+					stmt.setString(3 * j + k + 1, value)
+			rs = stmt.executeQuery()
+			try :
+				while rs.next() :
+					infos[offset + rs.getInt(1)] = rs.getString(2)
+			finally :
+				rs.close()
+		finally :
+			stmt.close()
+
+	def iterTimeSeries(
 		self,
 		tsId,
-		times,
-		values,
-		qualities,
-		units,
-		storeRule,
-		overrideProtection,
-		versionTimeStr,
-		officeId) :
+		startTimeStr = None,
+		endTimeStr = None,
+		chunkDays = DEFAULT_CHUNK_DAYS,
+		units = None,
+		timeZone = None,
+		startInclusive = None,
+		endInclusive = None,
+		versionDate = None,
+		maxVersion = None,
+		officeId = None,
+		prefetch = DEFAULT_PREFETCH_CHUNKS) :
 		'''
-		Write a time-series to the database
+		Read a long time window of a time-series in chunks of chunkDays days, returning a generator
+		of one TimeSeriesContainer per chunk in time order. Chunks are retrieved in the background,
+		up to prefetch at a time, and are neither trimmed nor cached
 		'''
-		self.lock()
+		request = self._resolveTimeSeriesRequest_(
+			tsId,
+			startTimeStr,
+			endTimeStr,
+			units,
+			timeZone,
+			False,
+			startInclusive,
+			endInclusive,
+			False,
+			False,
+			versionDate,
+			maxVersion,
+			officeId)
+		return iterTimeSeriesChunks(self, request, chunkDays, prefetch, self._retrieveTimeSeriesContainer_)
+
+	def getValuesAt(
+		self,
+		tsIds,
+		instants,
+		policy = "exact",
+		units = None,
+		timeZone = None,
+		versionDate = None,
+		maxVersion = None,
+		officeId = None,
+		withTimes = False) :
+		'''
+		Read only the values of many time series at a few instants, without building
+		TimeSeriesContainer objects. Returns a dictionary keyed by time series id of lists with one
+		entry per instant: the value (None if missing), or (time, value, quality) if withTimes is
+		True, where the time is in milliseconds with the wall clock time of the time zone treated
+		as UTC. The policy "exact", "previous" or "next" selects the sample at, at or before, or
+		at or after each instant. Time series that cannot be queried map to None
+		'''
+		if isinstance(tsIds, basestring) :
+			tsIds = [tsIds]
+		if isinstance(instants, basestring) :
+			instants = [instants]
+		if policy not in DataCache.SAMPLE_POLICIES :
+			raise ValueError("Policy must be one of %s" % ", ".join(DataCache.SAMPLE_POLICIES))
+		uniqueIds = []
+		for tsId in tsIds :
+			if tsId not in uniqueIds :
+				uniqueIds.append(tsId)
+		#-------------------------------------------------#
+		# one row source for each time series and instant #
+		#-------------------------------------------------#
+		sdf = self._threadState_().sdf
+		samples = []
+		sampleIds = []
+		results = dict([(tsId, []) for tsId in uniqueIds])
+		for tsId in uniqueIds :
+			tsUnits = units.get(tsId) if isinstance(units, dict) else units
+			tsSamples = []
+			try :
+				for instant in instants :
+					request = self._resolveTimeSeriesRequest_(
+						tsId,
+						instant,
+						instant,
+						tsUnits,
+						timeZone,
+						False,
+						True,
+						True,
+						policy == "previous",
+						policy == "next",
+						versionDate,
+						maxVersion,
+						officeId)
+					instantStr = sdf.format(Date(request["startTime"]))
+					tsSamples.append((request, instantStr, instantStr))
+			except :
+				print("Error retrieving values of %s: %s" % (tsId, sys.exc_info()[1]))
+				results[tsId] = None
+				continue
+			samples.extend(tsSamples)
+			sampleIds.extend([tsId] * len(tsSamples))
+		try :
+			rows = self._queryTimeSeriesWindows_(samples)
+		except :
+			#------------------------------------------------------#
+			# one bad id fails the whole query, so query each time #
+			# series separately and leave out the ones that fail   #
+			#------------------------------------------------------#
+			print("Error retrieving values, querying each time series separately: %s" % sys.exc_info()[1])
+			rows = []
+			for i in range(0, len(samples), len(instants)) :
+				try :
+					rows.extend(self._queryTimeSeriesWindows_(samples[i:i+len(instants)]))
+				except :
+					tsId = sampleIds[i]
+					print("Error retrieving values of %s: %s" % (tsId, sys.exc_info()[1]))
+					results[tsId] = None
+					rows.extend([None] * len(instants))
+		for tsId, (request, instantStr, instantStr), row in zip(sampleIds, samples, rows) :
+			if row is None :
+				continue
+			times, values, qualities = row
+			i = DataCache.selectSampleAt(times, request["startTime"], policy)
+			if i is None :
+				results[tsId].append(None)
+			elif withTimes :
+				results[tsId].append((times[i], values[i], qualities[i]))
+			else :
+				results[tsId].append(values[i])
+		return results
+
+	def _queryTimeSeriesWindows_(self, windows) :
+		'''
+		Returns (times, values, qualities) for each (request, startTimeStr, endTimeStr) window,
+		querying up to 100 windows per statement. The window times are 'yyyy/MM/dd HHmm' strings in
+		the request time zone. Times are UTC milliseconds of the wall clock times in the request
+		time zone and missing values are None
+		'''
+		rows = [([], [], []) for window in windows]
+		flag = ('F','T')
+		state = self._threadState_()
+		locked = self._readLock_()
 		try :
 			conn = self.getConnection()
 			try :
-				#------------------#
-				# prepare the call #
-				#------------------#
-				stmt = conn.prepareCall('''
-					declare
-						l_cwms_ts_id     varchar2(256) := :1;
-						l_units          varchar2(32)  := :2;
-						l_times_clob     clob          := :3;
-						l_values_clob    clob          := :4;
-						l_qualities_clob clob          := :5;
-						l_store_rule     varchar2(32)  := :6;
-						l_override_prot  varchar2(1)   := :7;
-						l_version_date   varchar2(32)  := :8;
-						l_office_id      varchar2(16)  := :9;
-						l_time_zone      varchar2(28)  := :10;
-						l_times          cwms_t_str_tab;
-						l_values         cwms_t_str_tab;
-						l_qualities      cwms_t_str_tab;
-						l_tsv_array      cwms_t_tsv_array;
-					begin
-						if l_times_clob is null and l_values_clob is null then
-							return;
-						end if;
-						if l_times_clob is null then
-							cwms_err.raise('ERROR', 'No times specified');
-						end if;
-						if l_values_clob is null then
-							cwms_err.raise('ERROR', 'No values specified');
-						end if;
-						l_times     := cwms_util.split_text(l_times_clob,     '|');
-						l_values    := cwms_util.split_text(l_values_clob,    '|');
-						l_qualities := cwms_util.split_text(l_qualities_clob, '|');
-						if l_values.count != l_times.count then
-							cwms_err.raise('ERROR', 'Different number of times and values');
-						end if;
-						if l_qualities.count != l_times.count then
-							cwms_err.raise('ERROR', 'Different number of times and qualities');
-						end if;
-
-						l_tsv_array := cwms_t_tsv_array();
-						l_tsv_array.extend(l_times.count);
-						for i in 1..l_tsv_array.count loop
-							l_tsv_array(i) := cwms_t_tsv(
-								from_tz(cwms_util.to_timestamp(to_number(l_times(i))), 'UTC'),
-								to_binary_double(l_values(i)),
-								case
-								when l_qualities is null then 0
-								else nvl(to_number(l_qualities(i)), 0)
-								end);
-						end loop;
-
-						cwms_ts.store_ts(
-							l_cwms_ts_id,
-							l_units,
-							l_tsv_array,
-							l_store_rule,
-							l_override_prot,
-							cwms_util.change_timezone(to_date(l_version_date, 'yyyy-mm-dd hh24miss'), l_time_zone, 'UTC'),
-							l_office_id);
-					end;'''.strip())
-				#-------------------------#
-				# set the call parameters #
-				#-------------------------#
-				if versionTimeStr is None : versionTimeStr = self._versionDate
-				if isNonVersioned(versionTimeStr) :
-					versionTime = ''
-				else :
-					self._hts.set(versionTimeStr)
-					self._sdfDATE.setTimeZone(self._utcTimeZone)
-					versionTime = self._sdfDATE.format(self._hts.getTimeInMillis()).replace(":", "").replace(",", "")
-				_times = conn.createClob()
-				_times.setString(1, "|".join(map(str, times)))
-				_values = conn.createClob()
-				_values.setString(1, "|".join(map(str, values)).replace(str(Const.UNDEFINED_DOUBLE), ""))
-				_qualities = conn.createClob()
-				_qualities.setString(1, "|".join(map(str, qualities)))
-				stmt.setString(1, tsId)
-				stmt.setString(2, units)
-				stmt.setClob(3, _times)
-				stmt.setClob(4, _values)
-				stmt.setClob(5, _qualities)
-				stmt.setString(6, storeRule)
-				stmt.setString(7, ('F','T')[overrideProtection])
-				stmt.setString(8, versionTime)
-				stmt.setString(9, officeId)
-				stmt.setString(10, self._timeZone.getID())
-				#----------------#
-				# store the data #
-				#----------------#
-				stmt.execute()
-				conn.commit()
-				for clob in _times, _values, _qualities :
-					try    : clob.free()
-					except : pass
-				stmt.close()
+				for i in range(0, len(windows), 100) :
+					batch = windows[i:i+100]
+					selects = []
+					for j in range(len(batch)) :
+						selects.append('''
+							select %d, t.date_time, t.value, t.quality_code
+							  from table(cwms_ts.retrieve_ts_out_tab(
+							           p_cwms_ts_id      => :%d,
+							           p_units           => :%d,
+							           p_start_time      => to_date(:%d, 'yyyy/mm/dd hh24mi'),
+							           p_end_time        => to_date(:%d, 'yyyy/mm/dd hh24mi'),
+							           p_time_zone       => :%d,
+							           p_trim            => :%d,
+							           p_start_inclusive => :%d,
+							           p_end_inclusive   => :%d,
+							           p_previous        => :%d,
+							           p_next            => :%d,
+							           p_version_date    => to_date(:%d, 'yyyy-mm-dd hh24miss'),
+							           p_max_version     => :%d,
+							           p_office_id       => :%d)) t'''.strip() % tuple([j] + [13 * j + k for k in range(1, 14)]))
+					stmt = conn.prepareStatement("\nunion all\n".join(selects) + "\norder by 1, 2")
+					for j in range(len(batch)) :
+						request, startTimeStr, endTimeStr = batch[j]
+						for k, value in enumerate((
+								request["tsId"],
+								request["units"],
+								startTimeStr,
+								endTimeStr,
+								request["timeZone"].getID(),
+								flag[request["trim"]],
+								flag[request["startTimeInclusive"]],
+								flag[request["endTimeInclusive"]],
+								flag[request["getPrevious"]],
+								flag[request["getNext"]],
+								self._versionTimeString_(request["versionTimeStr"]),
+								flag[request["maxVersion"]],
+								request["officeId"])) :
+							stmt.setString(13 * j + k + 1, value)
+					rs = stmt.executeQuery()
+					try :
+						#---------------------------------------------------------#
+						# read the date_time as a timestamp to keep the seconds,  #
+						# as the single series reads do                           #
+						#---------------------------------------------------------#
+						while rs.next() :
+							timestamp = rs.getTimestamp(2, state.utcCal)
+							if timestamp is None : continue
+							times, values, qualities = rows[i + rs.getInt(1)]
+							value = rs.getDouble(3)
+							if rs.wasNull() : value = None
+							times.append(timestamp.getTime())
+							values.append(value)
+							qualities.append(rs.getInt(4))
+					finally :
+						rs.close()
+					stmt.close()
 			finally :
 				conn.close()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
+		return rows
 
-	def getTimeSeriesContainer(
+	def getTimeSeriesVersions(
 		self,
 		tsId,
 		startTimeStr = None,
 		endTimeStr = None,
+		versionDates = None,
 		units = None,
 		timeZone = None,
 		trim = None,
 		startInclusive = None,
 		endInclusive = None,
-		getPrevious = None,
-		getNext = None,
-		versionDate = None,
-		maxVersion = None,
 		officeId = None) :
 		'''
-		Read a time-series from the database and return it in a TimeSeriesContainer object.
+		Read several versions of a versioned time-series over the same time window in one query.
+		Returns an ordered dictionary of TimeSeriesContainer objects keyed by version date in the
+		order of versionDates. If versionDates is None, all versions with values in the window are
+		read, oldest first, keyed by 'ddMMMyyyy HHmm' version date strings
 		'''
-		#----------------------------#
-		# get data from the database #
-		#----------------------------#
-		times, values, qualities, units, startTime, endTime, timeZone, vertDatumInfo = self._getTimeSeries_(
+		if isinstance(versionDates, basestring) :
+			versionDates = [versionDates]
+		request = self._resolveTimeSeriesRequest_(
 			tsId,
 			startTimeStr,
 			endTimeStr,
@@ -2184,69 +4296,75 @@ def getTimeSeriesContainer(
 			trim,
 			startInclusive,
 			endInclusive,
-			getPrevious,
-			getNext,
-			versionDate,
-			maxVersion,
+			False,
+			False,
+			None,
+			False,
 			officeId)
-		#----------------#
-		# parse the unit #
-		#----------------#
-		for part1 in map(string.strip, units.split('|')) :
-			parts2 = list(map(string.strip, part1.split('=', 1)))
-			if len(parts2) == 2 and parts2[0].upper() == 'U' :
-				units = parts2[1]
-				break
-		#-----------------------------------------------------------------#
-		# convert java millis into HecTime minutes in specified time zone #
-		#-----------------------------------------------------------------#
-		cal = Calendar.getInstance()
-		cal.setTimeZone(timeZone)
-		cal.clear()
-		time = HecTime()
-		i = 0
-		while i < len(times) :
-			cal.setTimeInMillis(times[i])
-			time.set(cal)
-			times[i] = time.value()
-			i += 1
-		cal.setTimeInMillis(startTime)
-		time.set(cal)
-		startTime = time.value()
-		cal.setTimeInMillis(endTime)
-		time.set(cal)
-		endTime = time.value()
-		#-----------------------------------------------#
-		# build and return a TimeSeriesContainer object #
-		#-----------------------------------------------#
-		tsc = TimeSeriesContainer()
-		loc, param, paramType, intvl, dur, ver = tsId.split('.')
-		tsc.watershed = ''
-		tsc.fullName  = tsId
-		try    : tsc.location,  tsc.subLocation  = loc.split('-', 1)
-		except : tsc.location,  tsc.subLocation  = loc, ''
-		try    : tsc.parameter, tsc.subParameter = param.split('-', 1)
-		except : tsc.parameter, tsc.subParameter = param, ''
-		try    : tsc.version,   tsc.subVersion   = ver.split('-', 1)
-		except : tsc.version,   tsc.subVersion   = ver, ''
-		tsc.startTime         = startTime
-		tsc.endTime           = endTime
-		tsc.times             = times
-		tsc.values            = values
-		tsc.quality           = qualities
-		tsc.numberValues      = len(times)
-		tsc.interval          = Interval(intvl).getMinutes()
-		tsc.type              = DSSTimeSeries.getDSSType(
-		                        	Parameter(param),
-		                        	ParameterType(paramType))
-		tsc.units             = units
-		tsc.timeZoneID        = timeZone.getID()
-		tsc.timeZoneRawOffset = timeZone.getRawOffset()
-		if vertDatumInfo :
-			tsc = TimeSeriesContainerVertDatum(
-				tsc,
-				VerticalDatumContainer(vertDatumInfo))
-		return tsc
+		#----------------------------------------#
+		# query in UTC so the times are true UTC #
+		#----------------------------------------#
+		startTime, endTime = self._utcWindow_(request)
+		sdf = self._threadState_().sdf
+		startTimeStr = sdf.format(Date(startTime))
+		endTimeStr = sdf.format(Date(endTime))
+		if versionDates is None :
+			versionDates = self._queryVersionDates_(request, startTimeStr, endTimeStr)
+		windows = []
+		for versionDate in versionDates :
+			versionRequest = dict(request)
+			versionRequest.update({
+				"timeZone"       : self._utcTimeZone,
+				"versionTimeStr" : versionDate,
+				"maxVersion"     : False})
+			windows.append((versionRequest, startTimeStr, endTimeStr))
+		results = collections.OrderedDict()
+		for versionDate, (times, values, qualities) in zip(versionDates, self._queryTimeSeriesWindows_(windows)) :
+			values = [Const.UNDEFINED_DOUBLE if value is None else value for value in values]
+			results[versionDate] = makeTimeSeriesContainer(
+				tsId,
+				times,
+				values,
+				qualities,
+				request["units"],
+				request["timeZone"],
+				startTime,
+				endTime)
+		return results
+
+	def _queryVersionDates_(self, request, startTimeStr, endTimeStr) :
+		'''
+		Returns the 'ddMMMyyyy HHmm' version dates, oldest first, of a time series that have values
+		in a UTC window of 'yyyy/MM/dd HHmm' strings
+		'''
+		versionDates = []
+		locked = self._readLock_()
+		try :
+			conn = self.getConnection()
+			try :
+				stmt = conn.prepareStatement(' '.join('''
+					select to_char(version_date, 'ddMonyyyy hh24mi', 'nls_date_language=american')
+					  from (select distinct version_date
+					          from cwms_v_tsv_dqu
+					         where office_id = :1
+					           and upper(cwms_ts_id) = upper(:2)
+					           and date_time between to_date(:3, 'yyyy/mm/dd hh24mi') and to_date(:4, 'yyyy/mm/dd hh24mi'))
+					 order by version_date
+					'''.strip().split()))
+				for i, value in enumerate((request["officeId"], request["tsId"], startTimeStr, endTimeStr)) :
+					stmt.setString(i + 1, value)
+				rs = stmt.executeQuery()
+				try :
+					while rs.next() :
+						versionDates.append(rs.getString(1))
+				finally :
+					rs.close()
+				stmt.close()
+			finally :
+				conn.close()
+		finally :
+			self._readUnlock_(locked)
+		return versionDates
 
 	def putTimeSeriesContainer(
 		self,
@@ -2269,9 +4387,172 @@ def putTimeSeriesContainer(
 				raise Exception("Cannot write to database %s" % conn.getMetaData().getURL())
 			finally :
 				conn.close()
-		if not isinstance(object, TimeSeriesContainer) :
-			raise ValueError("Expected TimeSeriesContainer, got %s." % object.__class__.__name__)
-		tsc = object
+		put = self._prepareTimeSeriesPut_(
+			object,
+			units,
+			timeZone,
+			storeRule,
+			overrideProtection,
+			versionDate,
+			officeId)
+		if self._storeChangedOnly :
+			put = self._changedTimeSeriesPuts_([put])[0]
+			if put is None : return
+		tsId, times, values, qualities, units, storeRule, overrideProtection, versionDate, officeId = put
+		#--------------------------------#
+		# store the data to the database #
+		#--------------------------------#
+		self._putTimeSeries_(
+			tsId,
+			times,
+			values,
+			qualities,
+			units,
+			storeRule,
+			overrideProtection,
+			versionDate,
+			officeId)
+		self._invalidateCache_(tsId, officeId)
+		self._updateCatalog_("ts", tsId)
+
+	def putTimeSeriesContainers(
+		self,
+		tscs,
+		units = None,
+		timeZone = None,
+		storeRule = None,
+		overrideProtection = None,
+		versionDate = None,
+		officeId = None,
+		batchSize = DEFAULT_STORE_BATCH_SIZE) :
+		'''
+		Write many TimeSeriesContainer objects, storing up to batchSize series per database call
+		and committing once per call. Returns an ordered dictionary keyed by time series id of
+		None for each series stored, or the error message for each series that was not.
+
+		The units parameter may be None (the units of each container), a single unit string
+		applied to every container, or a dictionary of units keyed by time series id.
+		'''
+		if not self.canWrite() :
+			conn = self.getConnection()
+			try :
+				raise Exception("Cannot write to database %s" % conn.getMetaData().getURL())
+			finally :
+				conn.close()
+		batchSize = int(batchSize)
+		if batchSize < 1 :
+			raise ValueError("Batch size must be a positive integer")
+		results = collections.OrderedDict()
+		puts = []
+		for tsc in tscs :
+			tsId = getattr(tsc, "fullName", None) or str(tsc)
+			if isinstance(units, dict) :
+				tscUnits = units.get(tsId)
+			else :
+				tscUnits = units
+			results[tsId] = None
+			try :
+				puts.append(self._prepareTimeSeriesPut_(tsc, tscUnits, timeZone, storeRule, overrideProtection, versionDate, officeId))
+			except :
+				results[tsId] = str(sys.exc_info()[1])
+		if self._storeChangedOnly :
+			#---------------------------------------------------#
+			# series with nothing to change are already current #
+			#---------------------------------------------------#
+			puts = [put for put in self._changedTimeSeriesPuts_(puts) if put is not None]
+		#--------------------------------------------#
+		# store and commit the series batch by batch #
+		#--------------------------------------------#
+		self.lock()
+		try :
+			conn = self.getConnection()
+			try :
+				for i in range(0, len(puts), batchSize) :
+					batch = puts[i:i+batchSize]
+					try :
+						errors = self._storeTimeSeriesBatch_(conn, batch)
+						conn.commit()
+					except :
+						error = str(sys.exc_info()[1])
+						errors = [error] * len(batch)
+						try    : conn.rollback()
+						except : pass
+					for put, error in zip(batch, errors) :
+						results[put[0]] = error
+			finally :
+				conn.close()
+		finally :
+			self.unlock()
+		for put in puts :
+			tsId, officeId = put[0], put[8]
+			if results[tsId] is None :
+				self._invalidateCache_(tsId, officeId)
+				self._updateCatalog_("ts", tsId)
+			else :
+				print("Error storing %s: %s" % (tsId, results[tsId]))
+		return results
+
+	def _changedTimeSeriesPuts_(self, puts) :
+		'''
+		Reduce _prepareTimeSeriesPut_ results to the values that storing them would change, reading
+		the stored values of all of the series in one query. Returns the reduced put, or None if
+		storing would change nothing, for each put. A put whose stored values cannot be read is
+		returned as is
+		'''
+		sdf = self._threadState_().sdf
+		windows = []
+		for put in puts :
+			tsId, times, values, qualities, units, storeRule, overrideProtection, versionDate, officeId = put
+			if not len(times) : continue
+			if isNonVersioned(versionDate) : versionDate = nonVersionedDate()
+			request = {
+				"tsId"               : tsId,
+				"units"              : units,
+				"timeZone"           : self._utcTimeZone,
+				"trim"               : False,
+				"startTimeInclusive" : True,
+				"endTimeInclusive"   : True,
+				"getPrevious"        : False,
+				"getNext"            : False,
+				"versionTimeStr"     : versionDate,
+				"maxVersion"         : False,
+				"officeId"           : officeId}
+			windows.append((put, (request, sdf.format(Date(min(times))), sdf.format(Date(max(times))))))
+		try :
+			stored = self._queryTimeSeriesWindows_([window for put, window in windows])
+		except :
+			#--------------------------------------------------------#
+			# a series that does not exist yet fails the whole query #
+			#--------------------------------------------------------#
+			stored = []
+			for put, window in windows :
+				try    : stored.append(self._queryTimeSeriesWindows_([window])[0])
+				except : stored.append(None)
+		reduced = {}
+		for (put, window), existing in zip(windows, stored) :
+			if existing is None : continue
+			tsId, times, values, qualities, units, storeRule, overrideProtection, versionDate, officeId = put
+			times, values, qualities = DataCache.changedPoints(
+				list(times),
+				[None if isUndefined(value) else value for value in values],
+				list(qualities),
+				existing,
+				storeRule,
+				overrideProtection)
+			if times :
+				values = [Const.UNDEFINED_DOUBLE if value is None else value for value in values]
+				reduced[id(put)] = (tsId, times, values, qualities, units, storeRule, overrideProtection, versionDate, officeId)
+			else :
+				reduced[id(put)] = None
+		return [reduced.get(id(put), put) for put in puts]
+
+	def _prepareTimeSeriesPut_(self, tsc, units, timeZone, storeRule, overrideProtection, versionDate, officeId) :
+		'''
+		Validate a TimeSeriesContainer for storing and resolve the store arguments against the
+		object defaults. Returns the arguments of _putTimeSeries_ with the times in UTC millis
+		'''
+		if not isinstance(tsc, TimeSeriesContainer) :
+			raise ValueError("Expected TimeSeriesContainer, got %s." % tsc.__class__.__name__)
 		if units :
 			if tsc.units and units.upper() != tsc.units.upper() :
 				print("Warning: Data specifies units as %s, storing as %s" % (tsc.units, units))
@@ -2311,7 +4592,7 @@ def putTimeSeriesContainer(
 		if versionDate is None :
 			versionDate = self._versionDate
 		elif versionDate:
-			versionDate = self._sdfDATE.format(Date(RMAIO.parseDate(versionDate, self._timeZone)))
+			versionDate = self._threadState_().sdfDATE.format(Date(RMAIO.parseDate(versionDate, self._timeZone)))
 		if not officeId : officeId = self._officeId
 		times  = [0] * tsc.numberValues
 		values = tsc.values
@@ -2330,19 +4611,7 @@ def putTimeSeriesContainer(
 			cal.set(t.year(), t.month()-1, t.day(), t.hour(), t.minute(), t.second())
 			times[i] = cal.getTimeInMillis()
 			i += 1
-		#--------------------------------#
-		# store the data to the database #
-		#--------------------------------#
-		self._putTimeSeries_(
-			tsc.fullName,
-			times,
-			values,
-			qualities,
-			tsc.units,
-			storeRule,
-			bool(overrideProtection),
-			versionDate,
-			officeId)
+		return tsc.fullName, times, values, qualities, tsc.units, storeRule, bool(overrideProtection), versionDate, officeId
 
 	def getTimeSeriesExtents(self, tsId, startTime, endTime) :
 		'''
@@ -2381,33 +4650,37 @@ def deleteTimeSeries(self, tsId) :
 				stmt.close()
 			finally :
 				conn.close()
+			self._invalidateCache_(tsId)
 		finally :
 			self.unlock()
+		self._updateCatalog_("ts", tsId, False)
 
 	def refreshTsCatalog(self) :
 		'''
-		No-op retained for backward compatibility. Not needed in current schema
+		Discard the time series catalog snapshot so the next catalog call reloads it
 		'''
-		pass
+		self._updateCatalog_("ts")
 
 	def _readRating_(self, loadMethodStr, ratingId, startTimeStr=None, endTimeStr=None) :
 		'''
 		Retrieves a rating from the database as a RatingSet object
 		'''
-		self.lock()
+		officeId = self.getOfficeId()
+		locked = self._readLock_()
 		try :
 			if (startTimeStr == None) != (endTimeStr == None) :
 				raise ValueException("Start time and end time must both be specified, or neither.")
 			if startTimeStr :
-				self._utcCal.setTimeInMillis(RMAIO.parseDate(startTimeStr, self._utcTimeZone))
-				startTime = self._utcCal.getTimeInMillis()
-				self._utcCal.setTimeInMillis(RMAIO.parseDate(endTimeStr, self._utcTimeZone))
-				endTime = self._utcCal.getTimeInMillis()
+				utcCal = self._threadState_().utcCal
+				utcCal.setTimeInMillis(RMAIO.parseDate(startTimeStr, self._utcTimeZone))
+				startTime = utcCal.getTimeInMillis()
+				utcCal.setTimeInMillis(RMAIO.parseDate(endTimeStr, self._utcTimeZone))
+				endTime = utcCal.getTimeInMillis()
 			else :
 				startTime = None
 				endTime = None
 
-			if loadMethodStr is None : loadMethodStr = self._ratingLoadMethod
+			if loadMethodStr is None : loadMethodStr = self.getRatingLoadMethod()
 			if   loadMethodStr.upper() == "EAGER"     : loadMethod = RatingSet.DatabaseLoadMethod.EAGER
 			elif loadMethodStr.upper() == "LAZY"      : loadMethod = RatingSet.DatabaseLoadMethod.LAZY
 			elif loadMethodStr.upper() == "REFERENCE" : loadMethod = RatingSet.DatabaseLoadMethod.REFERENCE
@@ -2422,7 +4695,7 @@ def _readRating_(self, loadMethodStr, ratingId, startTimeStr=None, endTimeStr=No
 					ratingSet = RatingSet.fromDatabase(
 						loadMethod,
 						conn,
-						self.getOfficeId(),
+						officeId,
 						ratingId,
 						startTime,
 						endTime)
@@ -2433,7 +4706,7 @@ def _readRating_(self, loadMethodStr, ratingId, startTimeStr=None, endTimeStr=No
 					ratingSet = RatingSet(
 						loadMethod,
 						conn,
-						self.getOfficeId(),
+						officeId,
 						ratingId,
 						startTime,
 						endTime)
@@ -2441,7 +4714,7 @@ def _readRating_(self, loadMethodStr, ratingId, startTimeStr=None, endTimeStr=No
 			finally :
 				conn.close()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
 
 	def readRating(self, *args) :
 		'''
@@ -2507,6 +4780,7 @@ def storeRating(self, object, failIfExists=None) :
 			RatingJdbcCompatUtil.getInstance().storeToDatabase(rating, conn, overwrite_existing, include_template)
 		finally :
 			conn.close()
+		self._updateCatalog_("rating")
 
 	
 
@@ -2539,6 +4813,7 @@ def deleteRatings(self, ratingIds) :
 					conn.close()
 			finally :
 				self.unlock()
+				self._updateCatalog_("rating")
 
 	def getCatalogedPathnames_1(self, pattern) :
 		'''
@@ -2546,28 +4821,25 @@ def getCatalogedPathnames_1(self, pattern) :
 
 		NOTE: pattern must use glob chars (*, ?) and not SQL chars (% ,_)
 		'''
-		pathnameList = []
 		if not isinstance(pattern, basestring) :
 			raise TypeError('Pattern for getCatalogedPathnames must be a string')
-		self.lock()
+		return self._getCatalogIndex_("ts").match(pattern) + self._getCatalogIndex_("rating").match(pattern)
+
+	def _queryCatalog_(self, sql, pattern, officeId) :
+		'''
+		Returns the identifiers from a catalog query for the specified pattern and office
+		'''
+		pathnameList = []
+		locked = self._readLock_()
 		try :
 			conn = self.getConnection()
 			try :
-				stmt = conn.prepareStatement(self._catalogTsSql)
-				stmt.setString(1, self.getOfficeId())
-				stmt.setString(2, pattern)
-				rs = stmt.executeQuery()
-				try :
-					while rs.next() : pathnameList.append(rs.getString(1))
-				finally :
-					rs.close()
-				stmt.close()
-				stmt = conn.prepareStatement(self._catalogRatingSql)
-				stmt.setString(1, self.getOfficeId())
+				stmt = conn.prepareStatement(sql)
+				stmt.setString(1, officeId)
 				stmt.setString(2, pattern)
 				rs = stmt.executeQuery()
 				try :
-					while rs.next() : pathnameList.append(rs.getString(1))
+					pathnameList = readColumns(rs, ("string",), self._fetchSize)[0]
 				finally :
 					rs.close()
 				stmt.close()
@@ -2575,14 +4847,110 @@ def getCatalogedPathnames_1(self, pattern) :
 			finally :
 				conn.close()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
+
+	def _getCatalogIndex_(self, kind) :
+		'''
+		Return the time series ("ts") or rating ("rating") catalog snapshot, loading it if it has
+		not been loaded or has expired
+		'''
+		self._catalogLock.acquire()
+		try :
+			index = self._catalogs.get(kind)
+			if index is None or index.isExpired() :
+				sql = (self._catalogRatingSql, self._catalogTsSql)[kind == "ts"]
+				ids = self._queryCatalog_(sql, '*', self.getOfficeId())
+				index = DataCache.CatalogIndex(ids, self.getCatalogTtl())
+				self._catalogs[kind] = index
+			return index
+		finally :
+			self._catalogLock.release()
+
+	def _getLoadedCatalogIndex_(self, kind) :
+		'''
+		Return the catalog snapshot of a kind if it is loaded and current, without loading it
+		'''
+		self._catalogLock.acquire()
+		try :
+			index = self._catalogs.get(kind)
+			if index is None or index.isExpired() :
+				return None
+			return index
+		finally :
+			self._catalogLock.release()
+
+	def _updateCatalog_(self, kind, id=None, added=True) :
+		'''
+		Keep a loaded catalog snapshot current after a store or delete. If no id is given the
+		snapshot is discarded
+		'''
+		if id is not None and added :
+			self._missingCache.remove((self.getOfficeId(), id.upper()))
+		self._catalogLock.acquire()
+		try :
+			index = self._catalogs.get(kind)
+			if index is None :
+				return
+			if id is None :
+				del self._catalogs[kind]
+			elif added :
+				index.add(id)
+			else :
+				index.remove(id)
+		finally :
+			self._catalogLock.release()
+
+	def setCatalogTtl(self, seconds) :
+		'''
+		Set the number of seconds a catalog snapshot is used before it is reloaded (None for the whole session)
+		'''
+		self.lock()
+		try     : self._catalogTtl = seconds
+		finally : self.unlock()
+
+	def getCatalogTtl(self) :
+		'''
+		Get the number of seconds a catalog snapshot is used before it is reloaded
+		'''
+		self.lock()
+		try     : return self._catalogTtl
+		finally : self.unlock()
+
+	def refreshCatalog(self) :
+		'''
+		Discard the catalog snapshots so the next catalog call reloads them
+		'''
+		self._catalogLock.acquire()
+		try     : self._catalogs.clear()
+		finally : self._catalogLock.release()
+
+	def exists(self, id) :
+		'''
+		Return whether a time series or rating identifier is in the catalog
+		'''
+		if isRatingId(id) :
+			return self._getCatalogIndex_("rating").exists(id)
+		return self._getCatalogIndex_("ts").exists(id)
+
+	def getCatalogedTimeSeriesIds(self, pattern='*') :
+		'''
+		Returns the time series identifiers in the catalog that match the specified glob pattern
+		'''
+		return self._getCatalogIndex_("ts").match(pattern)
+
+	def getCatalogedRatingIds(self, pattern='*') :
+		'''
+		Returns the rating identifiers in the catalog that match the specified glob pattern
+		'''
+		return self._getCatalogIndex_("rating").match(pattern)
 
 	def getCatalogedPathnames_2(self, forceNew) :
 		'''
 		Returns the current catalog
 
-		NOTE: forceNew is now obsolete
+		NOTE: forceNew reloads the catalog snapshot
 		'''
+		if forceNew : self.refreshCatalog()
 		return self.getCatalogedPathnames_1('*')
 
 	def getCatalogedPathnames_3(self, pattern, forceNew) :
@@ -2591,8 +4959,9 @@ def getCatalogedPathnames_3(self, pattern, forceNew) :
 
 		NOTE: pattern must use glob chars (*, ?) and not SQL chars (% ,_)
 
-		NOTE: forceNew is now obsolete
+		NOTE: forceNew reloads the catalog snapshot
 		'''
+		if forceNew : self.refreshCatalog()
 		return self.getCatalogedPathnames_1(pattern)
 
 	def getCatalogedPathnames(self, *args) :
@@ -2661,8 +5030,13 @@ def get_2(self, id, getEntireTimeWindow=False, units=None) :
 
 	def get(self, *args, **kwargs) :
 		'''
-		Overloader for get_? methods
+		Overloader for get_? methods. With missing='none', behaves as getIfExists()
 		'''
+		missing = kwargs.pop('missing', 'raise')
+		if missing == 'none' :
+			return self.getIfExists(*args, **kwargs)
+		if missing != 'raise' :
+			raise ValueError("missing must be 'raise' or 'none'")
 		count = len(args) + len(kwargs)
 		meth = None
 		if   count == 1 : meth = self.get_1
@@ -2678,6 +5052,40 @@ def get(self, *args, **kwargs) :
 
 		return meth(*args, **kwargs)
 
+	def getIfExists(self, *args, **kwargs) :
+		'''
+		Same as get(), but returns None instead of raising if the object does not exist.
+		Identifiers found not to exist are remembered for a short time, and identifiers absent
+		from a loaded catalog snapshot are not requested at all
+		'''
+		id = args[0] if args else kwargs.get('id')
+		key = (self.getOfficeId(), id.upper())
+		if self._missingCache.get(key) :
+			return None
+		index = self._getLoadedCatalogIndex_(("rating", "ts")[isTsId(id)])
+		if index is not None and not index.exists(id) :
+			self._missingCache.put(key, True)
+			return None
+		try :
+			result = self.get(*args, **kwargs)
+		except :
+			#---------------------------------------------------------#
+			# under Jython, java exceptions are not Python Exceptions #
+			#---------------------------------------------------------#
+			e = sys.exc_info()[1]
+			if not isNotFoundError(e) :
+				raise
+			result = None
+		if result is None :
+			self._missingCache.put(key, True)
+		return result
+
+	def clearMissingCache(self) :
+		'''
+		Forget the identifiers found not to exist by getIfExists()
+		'''
+		self._missingCache.clear()
+
 	def put(self, object, *args) :
 		if not self.canWrite() :
 			conn = self.getConnection()
@@ -2803,6 +5211,11 @@ def close(self):
 		'''
 		Release any resources and make this object unusable.
 		'''
+		#-------------------------------------------------------------#
+		# stop the replay before locking, its reads may need the lock #
+		#-------------------------------------------------------------#
+		accessLog = self._accessLog
+		if accessLog is not None : accessLog.stopReplay()
 		self.lock()
 		try:
 			if self._connectionMethod == CREDENTIALS_SPECIFIED_1 \
@@ -2815,6 +5228,7 @@ def close(self):
 				if login_state == ServerLoginState.LOGGED_IN:
 					ServerSuiteUtil.logoff()
 
+			if self._accessLog is not None : self._accessLog.save()
 			self._initValues_()
 		finally:
 			self.unlock()
@@ -0,0 +1,1136 @@
+'''
+This module provides the in-process caches used by DBAPI and RADARAPI to avoid
+repeated round trips for data that has already been retrieved in a session.
+It uses only the Python standard library so that it behaves the same under
+Jython 2.7 and CPython (JPype).
+
+Version History
+
+   22.1  18Oct2026   Original version with LruCache and TimeSeriesCache
+                     Added DiskTimeSeriesCache
+                     Added CatalogIndex
+                     Added UnitsRegistry
+                     Added LocationCache and LocationLevelCache
+                     Added WindowCache
+                     Added changedPoints
+
+'''
+
+import threading, time, collections, os, struct, zlib, json, hashlib, logging, re, bisect
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES        = 32 * 1024 * 1024
+DEFAULT_TTL              = 300
+DEFAULT_MISSING_ENTRIES  = 10000
+DEFAULT_MISSING_TTL      = 120
+
+class LruCache :
+	'''
+	A thread-safe least-recently-used cache with a time-to-live and a size budget.
+
+	Entries older than ttl seconds are never returned. When the total size of the
+	entries, as reported by the sizeOf function, exceeds maxBytes the least recently
+	used entries are evicted. If a copy function is given, values are copied going
+	into and coming out of the cache so that callers cannot modify cached values.
+	'''
+	def __init__(self, maxBytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL, sizeOf=None, copy=None) :
+		self._lock        = threading.RLock()
+		self._entries     = collections.OrderedDict()
+		self._maxBytes    = maxBytes
+		self._ttl         = ttl
+		self._sizeOf      = sizeOf or (lambda value : 1)
+		self._copy        = copy or (lambda value : value)
+		self._bytes       = 0
+		self._hits        = 0
+		self._misses      = 0
+		self._evictions   = 0
+		self._expirations = 0
+
+	def _remove_(self, key) :
+		value, size, expires = self._entries.pop(key)
+		self._bytes -= size
+
+	def get(self, key, default=None) :
+		'''
+		Return the cached value for key, or default if it is not cached or has expired
+		'''
+		self._lock.acquire()
+		try :
+			entry = self._entries.get(key)
+			if entry is None :
+				self._misses += 1
+				return default
+			value, size, expires = entry
+			if expires is not None and expires <= time.time() :
+				self._remove_(key)
+				self._expirations += 1
+				self._misses += 1
+				return default
+			del self._entries[key]
+			self._entries[key] = entry
+			self._hits += 1
+		finally :
+			self._lock.release()
+		return self._copy(value)
+
+	def contains(self, key) :
+		'''
+		Return whether an unexpired value is cached for key, without affecting the statistics
+		'''
+		self._lock.acquire()
+		try :
+			entry = self._entries.get(key)
+			return entry is not None and (entry[2] is None or entry[2] > time.time())
+		finally :
+			self._lock.release()
+
+	def put(self, key, value, ttl=None) :
+		'''
+		Cache a value for key. A ttl may be specified to override the cache default
+		'''
+		value = self._copy(value)
+		size = self._sizeOf(value)
+		if ttl is None :
+			ttl = self._ttl
+		expires = None if ttl is None else time.time() + ttl
+		self._lock.acquire()
+		try :
+			if key in self._entries :
+				self._remove_(key)
+			if self._maxBytes is not None and size > self._maxBytes :
+				return
+			self._entries[key] = (value, size, expires)
+			self._bytes += size
+			while self._maxBytes is not None and self._bytes > self._maxBytes :
+				self._remove_(next(iter(self._entries)))
+				self._evictions += 1
+		finally :
+			self._lock.release()
+
+	def remove(self, key) :
+		'''
+		Remove any cached value for key
+		'''
+		self._lock.acquire()
+		try :
+			if key in self._entries :
+				self._remove_(key)
+		finally :
+			self._lock.release()
+
+	def removeIf(self, predicate) :
+		'''
+		Remove all entries whose key satisfies predicate(key). Returns the number removed
+		'''
+		self._lock.acquire()
+		try :
+			keys = [key for key in self._entries if predicate(key)]
+			for key in keys :
+				self._remove_(key)
+			return len(keys)
+		finally :
+			self._lock.release()
+
+	def clear(self) :
+		'''
+		Remove all entries and reset the statistics
+		'''
+		self._lock.acquire()
+		try :
+			self._entries.clear()
+			self._bytes = self._hits = self._misses = self._evictions = self._expirations = 0
+		finally :
+			self._lock.release()
+
+	def getStatistics(self) :
+		'''
+		Return a dictionary of the cache counters and sizes
+		'''
+		self._lock.acquire()
+		try :
+			return {
+				"hits"        : self._hits,
+				"misses"      : self._misses,
+				"evictions"   : self._evictions,
+				"expirations" : self._expirations,
+				"entries"     : len(self._entries),
+				"bytes"       : self._bytes,
+				"maxBytes"    : self._maxBytes,
+				"ttl"         : self._ttl,
+			}
+		finally :
+			self._lock.release()
+
+##############################################################################
+
+def _timeSeriesContainerSize_(tsc) :
+	'''
+	Estimate the memory used by a TimeSeriesContainer: a long time, a double value and an int quality per value
+	'''
+	return 512 + 20 * max(0, tsc.numberValues)
+
+def _cloneTimeSeriesContainer_(tsc) :
+	return tsc.clone()
+
+def timeSeriesKey(request) :
+	'''
+	Return the cache key for a resolved time series request
+	'''
+	return (
+		request["officeId"],
+		request["tsId"].upper(),
+		request["startTime"],
+		request["endTime"],
+		request["units"],
+		request["timeZone"].getID(),
+		request["trim"],
+		request["startTimeInclusive"],
+		request["endTimeInclusive"],
+		request["getPrevious"],
+		request["getNext"],
+		request["versionTimeStr"],
+		request["maxVersion"])
+
+def timeSeriesKeyMatches(key, officeId, tsId) :
+	'''
+	Return whether a time series cache key is for the specified office and time series
+	'''
+	return key[0] == officeId and key[1] == tsId.upper()
+
+class TimeSeriesCache(LruCache) :
+	'''
+	An LruCache of TimeSeriesContainer objects keyed by timeSeriesKey(). Containers are
+	cloned going into and coming out of the cache.
+	'''
+	def __init__(self, maxBytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL) :
+		LruCache.__init__(self, maxBytes, ttl, _timeSeriesContainerSize_, _cloneTimeSeriesContainer_)
+
+	def invalidate(self, officeId, tsId) :
+		'''
+		Remove all cached windows of a time series
+		'''
+		return self.removeIf(lambda key : timeSeriesKeyMatches(key, officeId, tsId))
+
+##############################################################################
+
+DEFAULT_DISK_CACHE_DIR  = "/data/tscache"
+DEFAULT_VOLATILE_PERIOD = 6 * 3600
+DEFAULT_DISK_MAX_AGE    = 7 * 86400
+_DISK_MAGIC             = b"TSC1"
+
+def mergeIntervals(intervals) :
+	'''
+	Merge a list of closed [start, end] intervals into a sorted list of disjoint intervals
+	'''
+	merged = []
+	for start, end in sorted(intervals) :
+		if merged and start <= merged[-1][1] :
+			merged[-1][1] = max(merged[-1][1], end)
+		else :
+			merged.append([start, end])
+	return merged
+
+def missingIntervals(start, end, intervals) :
+	'''
+	Return the parts of the closed interval [start, end] not covered by a sorted list of disjoint intervals
+	'''
+	if start == end :
+		for s, e in intervals :
+			if s <= start <= e : return []
+		return [(start, end)]
+	gaps = []
+	cursor = start
+	for s, e in intervals :
+		if e < cursor : continue
+		if s > end : break
+		if s > cursor : gaps.append((cursor, s))
+		cursor = max(cursor, e)
+		if cursor >= end : break
+	if cursor < end :
+		gaps.append((cursor, end))
+	return gaps
+
+def selectPoints(times, values, qualities, start, end, startInclusive=True, endInclusive=True, trim=False, isMissing=None) :
+	'''
+	Return the (times, values, qualities) within a time window, honoring the inclusion flags
+	and optionally trimming missing values from the beginning and end
+	'''
+	lo, hi = 0, len(times)
+	while lo < hi and (times[lo] < start or (times[lo] == start and not startInclusive)) : lo += 1
+	while hi > lo and (times[hi-1] > end or (times[hi-1] == end and not endInclusive)) : hi -= 1
+	if trim and isMissing :
+		while lo < hi and isMissing(values[lo]) : lo += 1
+		while hi > lo and isMissing(values[hi-1]) : hi -= 1
+	return list(times[lo:hi]), list(values[lo:hi]), list(qualities[lo:hi])
+
+def _replacePoints_(record, start, end, times, values, qualities) :
+	'''
+	Replace the points of a series record in the closed interval [start, end] with fetched points
+	'''
+	points = [p for p in zip(record["times"], record["values"], record["qualities"]) if p[0] < start or p[0] > end]
+	points.extend(zip(times, values, qualities))
+	points.sort(key=lambda p : p[0])
+	record["times"]     = [p[0] for p in points]
+	record["values"]    = [p[1] for p in points]
+	record["qualities"] = [p[2] for p in points]
+
+SAMPLE_POLICIES = ("exact", "previous", "next")
+
+def selectSampleAt(times, instant, policy="exact") :
+	'''
+	Return the index in sorted times of the sample for an instant, or None. The policy is
+	"exact" (the sample at the instant), "previous" (the last sample at or before it) or
+	"next" (the first sample at or after it)
+	'''
+	if policy == "exact" :
+		i = bisect.bisect_left(times, instant)
+		return i if i < len(times) and times[i] == instant else None
+	if policy == "previous" :
+		i = bisect.bisect_right(times, instant)
+		return i - 1 if i > 0 else None
+	if policy == "next" :
+		i = bisect.bisect_left(times, instant)
+		return i if i < len(times) else None
+	raise ValueError("Policy must be one of %s" % ", ".join(SAMPLE_POLICIES))
+
+PROTECTED_QUALITY = 0x80000000
+VALUE_TOLERANCE   = 1e-12
+
+def _sameValue_(value, existing) :
+	if value is None or existing is None :
+		return value is None and existing is None
+	return abs(value - existing) <= VALUE_TOLERANCE * max(abs(value), abs(existing))
+
+def changedPoints(times, values, qualities, existing, storeRule, overrideProtection) :
+	'''
+	Return the (times, values, qualities) of outgoing points that storing with a store rule would
+	change, given the points already stored in their time window. existing is (times, values,
+	qualities) of the stored points, and missing values are None in both. Points that are
+	unchanged, or that the store rule or value protection would leave as they are, are dropped.
+	"Delete Insert" replaces the whole window, so its points are either all returned or, if the
+	window would be unchanged, none are
+	'''
+	rule = str(storeRule).upper()
+	stored = dict([(t, (v, q)) for t, v, q in zip(*existing)])
+	unchanged = lambda t, v, q : t in stored and _sameValue_(v, stored[t][0]) and (q & 0xFFFFFFFF) == (stored[t][1] & 0xFFFFFFFF)
+	if rule == "DELETE INSERT" :
+		outgoing = set(times)
+		for t, v, q in zip(times, values, qualities) :
+			if not unchanged(t, v, q) :
+				return list(times), list(values), list(qualities)
+		if times :
+			start, end = min(times), max(times)
+			for t, (v, q) in stored.items() :
+				if v is not None and start <= t <= end and t not in outgoing :
+					return list(times), list(values), list(qualities)
+		return [], [], []
+	changed = ([], [], [])
+	for t, v, q in zip(times, values, qualities) :
+		if unchanged(t, v, q) :
+			continue
+		#-------------------------------------------------------------#
+		# a missing stored value may be an unstored regular interval, #
+		# so only stored values that are not missing are kept as is   #
+		#-------------------------------------------------------------#
+		kept = t in stored and stored[t][0] is not None
+		if kept :
+			if rule in ("DO NOT REPLACE", "REPLACE MISSING VALUES ONLY") :
+				continue
+			if rule == "REPLACE WITH NON MISSING" and v is None :
+				continue
+			if not overrideProtection and stored[t][1] & PROTECTED_QUALITY :
+				continue
+		changed[0].append(t)
+		changed[1].append(v)
+		changed[2].append(q)
+	return changed
+
+
+class DiskTimeSeriesCache :
+	'''
+	A persistent cache of time series values, one file per series, that survives between runs.
+
+	Each file holds the values retrieved so far, in UTC milliseconds, and an index of the time
+	intervals they cover. A request only fetches the parts of its window that are not covered.
+	Values newer than volatilePeriod seconds before the time they were fetched are stored but
+	not marked as covered, so the recent tail of a series is always fetched again. Files older
+	than maxAge seconds are discarded and rebuilt.
+
+	Times are stored as zlib-compressed deltas of 64-bit integers, values as packed doubles and
+	qualities as packed 32-bit integers.
+	'''
+	def __init__(self, directory=DEFAULT_DISK_CACHE_DIR, volatilePeriod=DEFAULT_VOLATILE_PERIOD, maxAge=DEFAULT_DISK_MAX_AGE) :
+		if not os.path.isdir(directory) :
+			os.makedirs(directory)
+		self._directory      = directory
+		self._volatilePeriod = volatilePeriod
+		self._maxAge         = maxAge
+		self._lock           = threading.Lock()
+		self._fileLocks      = {}
+		self._hits           = 0
+		self._fetches        = 0
+
+	def getDirectory(self) :
+		'''
+		Return the cache directory
+		'''
+		return self._directory
+
+	def _fileName_(self, seriesKey) :
+		name = "|".join([str(item) for item in seriesKey])
+		return os.path.join(self._directory, hashlib.sha1(name.encode("utf-8")).hexdigest() + ".tsc")
+
+	def _fileLock_(self, fileName) :
+		self._lock.acquire()
+		try :
+			lock = self._fileLocks.get(fileName)
+			if lock is None :
+				lock = self._fileLocks[fileName] = threading.Lock()
+			return lock
+		finally :
+			self._lock.release()
+
+	def _read_(self, fileName, seriesKey) :
+		'''
+		Read a cache file, returning None if it is missing, unreadable, stale or for a different series
+		'''
+		if not os.path.exists(fileName) :
+			return None
+		try :
+			f = open(fileName, "rb")
+			try     : data = f.read()
+			finally : f.close()
+			if data[:4] != _DISK_MAGIC :
+				return None
+			headerLen = struct.unpack(">I", data[4:8])[0]
+			header = json.loads(data[8:8+headerLen].decode("utf-8"))
+			if header["key"] != [str(item) for item in seriesKey] :
+				return None
+			if self._maxAge is not None and header["created"] + self._maxAge < time.time() :
+				return None
+			count = header["count"]
+			body = zlib.decompress(data[8+headerLen:])
+			deltas = struct.unpack(">%dq" % count, body[:8*count])
+			values = list(struct.unpack(">%dd" % count, body[8*count:16*count]))
+			qualities = list(struct.unpack(">%di" % count, body[16*count:20*count]))
+			times, t = [], 0
+			for delta in deltas :
+				t += delta
+				times.append(t)
+			header["times"], header["values"], header["qualities"] = times, values, qualities
+			return header
+		except Exception as e :
+			logger.warning("Ignoring unreadable time series cache file %s: %s" % (fileName, e))
+			return None
+
+	def _write_(self, fileName, record) :
+		'''
+		Write a cache file atomically
+		'''
+		times, count = record["times"], len(record["times"])
+		deltas, previous = [], 0
+		for t in times :
+			deltas.append(t - previous)
+			previous = t
+		body = zlib.compress(
+			struct.pack(">%dq" % count, *deltas) +
+			struct.pack(">%dd" % count, *record["values"]) +
+			struct.pack(">%di" % count, *record["qualities"]))
+		header = json.dumps({
+			"key"           : record["key"],
+			"created"       : record["created"],
+			"intervals"     : record["intervals"],
+			"count"         : count,
+			"vertDatumInfo" : record["vertDatumInfo"]}).encode("utf-8")
+		tmpName = "%s.%s.tmp" % (fileName, threading.current_thread().name)
+		f = open(tmpName, "wb")
+		try     : f.write(_DISK_MAGIC + struct.pack(">I", len(header)) + header + body)
+		finally : f.close()
+		if os.path.exists(fileName) and os.name == "nt" :
+			os.remove(fileName)
+		os.rename(tmpName, fileName)
+
+	def getPoints(self, seriesKey, start, end, fetch) :
+		'''
+		Return (times, values, qualities, vertDatumInfo) for the closed UTC interval [start, end].
+		Parts of the interval that are not cached are retrieved by calling fetch(start, end), which
+		must return (times, values, qualities, vertDatumInfo) for that interval, or None if the series
+		does not exist, in which case None is returned and nothing is cached
+		'''
+		fileName = self._fileName_(seriesKey)
+		lock = self._fileLock_(fileName)
+		lock.acquire()
+		try :
+			record = self._read_(fileName, seriesKey)
+			if record is None :
+				record = {
+					"key"           : [str(item) for item in seriesKey],
+					"created"       : time.time(),
+					"intervals"     : [],
+					"vertDatumInfo" : None,
+					"times"         : [],
+					"values"        : [],
+					"qualities"     : []}
+			gaps = missingIntervals(start, end, record["intervals"])
+			if not gaps :
+				self._hits += 1
+			for gapStart, gapEnd in gaps :
+				self._fetches += 1
+				fetchedAt = time.time()
+				fetched = fetch(gapStart, gapEnd)
+				if fetched is None :
+					return None
+				times, values, qualities, vertDatumInfo = fetched
+				if vertDatumInfo : record["vertDatumInfo"] = vertDatumInfo
+				_replacePoints_(record, gapStart, gapEnd, times, values, qualities)
+				stableEnd = min(gapEnd, int((fetchedAt - self._volatilePeriod) * 1000))
+				if stableEnd >= gapStart :
+					record["intervals"] = mergeIntervals(record["intervals"] + [[gapStart, stableEnd]])
+			if gaps :
+				try :
+					self._write_(fileName, record)
+				except Exception as e :
+					logger.warning("Could not write time series cache file %s: %s" % (fileName, e))
+			times, values, qualities = selectPoints(record["times"], record["values"], record["qualities"], start, end)
+			return times, values, qualities, record["vertDatumInfo"]
+		finally :
+			lock.release()
+
+	def getMissingIntervals(self, seriesKey, start, end) :
+		'''
+		Return the parts of the closed UTC interval [start, end] that getPoints() would fetch
+		'''
+		fileName = self._fileName_(seriesKey)
+		lock = self._fileLock_(fileName)
+		lock.acquire()
+		try :
+			record = self._read_(fileName, seriesKey)
+		finally :
+			lock.release()
+		if record is None :
+			return [(start, end)]
+		return missingIntervals(start, end, record["intervals"])
+
+	def invalidate(self, seriesKeyPrefix) :
+		'''
+		Remove the cache files of all series whose key starts with the specified items
+		'''
+		prefix = [str(item) for item in seriesKeyPrefix]
+		for name in os.listdir(self._directory) :
+			if not name.endswith(".tsc") : continue
+			fileName = os.path.join(self._directory, name)
+			lock = self._fileLock_(fileName)
+			lock.acquire()
+			try :
+				f = open(fileName, "rb")
+				try     : data = f.read(8)
+				finally : f.close()
+				if data[:4] != _DISK_MAGIC :
+					continue
+				f = open(fileName, "rb")
+				try     : data = f.read(8 + struct.unpack(">I", data[4:8])[0])
+				finally : f.close()
+				key = json.loads(data[8:].decode("utf-8"))["key"]
+				if key[:len(prefix)] == prefix :
+					os.remove(fileName)
+			except Exception :
+				pass
+			finally :
+				lock.release()
+
+	def clear(self) :
+		'''
+		Remove all cache files
+		'''
+		for name in os.listdir(self._directory) :
+			if name.endswith(".tsc") :
+				try    : os.remove(os.path.join(self._directory, name))
+				except : pass
+
+	def getStatistics(self) :
+		'''
+		Return a dictionary of the number of fully cached requests and of fetches for uncached periods
+		'''
+		return {"hits" : self._hits, "fetches" : self._fetches, "directory" : self._directory}
+
+def diskSeriesKey(request) :
+	'''
+	Return the disk cache series key for a resolved time series request
+	'''
+	return (
+		request["officeId"],
+		request["tsId"].upper(),
+		request["units"],
+		request["versionTimeStr"],
+		request["maxVersion"])
+
+def uncachedIntervals(windowCache, diskCache, seriesKey, start, end) :
+	'''
+	Return the parts of the closed UTC interval [start, end] of a series that a read through the
+	window cache and disk cache (either of which may be None) would fetch from the database, so
+	that they can be retrieved for many series at once before the read
+	'''
+	if windowCache is not None :
+		gaps = windowCache.getMissingIntervals(seriesKey, start, end)
+	else :
+		gaps = [(start, end)]
+	if diskCache is None :
+		return gaps
+	intervals = []
+	for gapStart, gapEnd in gaps :
+		intervals.extend(diskCache.getMissingIntervals(seriesKey, gapStart, gapEnd))
+	return intervals
+
+##############################################################################
+
+def _windowRecordSize_(record) :
+	return 512 + 20 * len(record["times"])
+
+class WindowCache :
+	'''
+	An in-memory cache of time series values that coalesces reads of the same series over
+	different time windows during a session.
+
+	Each series, keyed as for the disk cache, keeps the values retrieved so far and the closed
+	UTC intervals they cover, so a read only fetches the parts of its window that are not
+	covered. Windows announced with expect() are added to the first fetch of their series, so
+	a batch of overlapping reads retrieves their union once. Series expire ttl seconds after
+	they were first fetched, and the least recently used series are evicted when the estimated
+	size exceeds maxBytes. Reads of the same series are serialized so that concurrent reads
+	share one fetch.
+	'''
+	def __init__(self, maxBytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL) :
+		self._records   = LruCache(maxBytes, ttl, _windowRecordSize_)
+		self._ttl       = ttl
+		self._lock      = threading.Lock()
+		self._keyLocks  = {}
+		self._expected  = {}
+		self._hits      = 0
+		self._fetches   = 0
+		self._coalesced = 0
+
+	def _keyLock_(self, seriesKey) :
+		self._lock.acquire()
+		try :
+			lock = self._keyLocks.get(seriesKey)
+			if lock is None :
+				lock = self._keyLocks[seriesKey] = threading.Lock()
+			return lock
+		finally :
+			self._lock.release()
+
+	def expect(self, seriesKey, start, end) :
+		'''
+		Announce that the closed UTC interval [start, end] of a series is about to be read
+		'''
+		self._lock.acquire()
+		try     : self._expected.setdefault(seriesKey, []).append([start, end])
+		finally : self._lock.release()
+
+	def getPoints(self, seriesKey, start, end, fetch) :
+		'''
+		Return (times, values, qualities, vertDatumInfo) for the closed UTC interval [start, end].
+		Parts of the interval, and of any expected windows of the series, that are not cached are
+		retrieved by calling fetch(start, end) as for DiskTimeSeriesCache.getPoints(). Returns None
+		if the series does not exist
+		'''
+		lock = self._keyLock_(seriesKey)
+		lock.acquire()
+		try :
+			record = self._records.get(seriesKey)
+			if record is None :
+				record = {
+					"created"       : time.time(),
+					"intervals"     : [],
+					"vertDatumInfo" : None,
+					"times"         : [],
+					"values"        : [],
+					"qualities"     : []}
+			if not missingIntervals(start, end, record["intervals"]) :
+				self._hits += 1
+			else :
+				self._lock.acquire()
+				try     : expected = self._expected.pop(seriesKey, [])
+				finally : self._lock.release()
+				self._coalesced += len(expected)
+				gaps = []
+				for wantedStart, wantedEnd in mergeIntervals([[start, end]] + expected) :
+					gaps.extend(missingIntervals(wantedStart, wantedEnd, record["intervals"]))
+				for gapStart, gapEnd in gaps :
+					self._fetches += 1
+					fetched = fetch(gapStart, gapEnd)
+					if fetched is None :
+						return None
+					times, values, qualities, vertDatumInfo = fetched
+					if vertDatumInfo : record["vertDatumInfo"] = vertDatumInfo
+					_replacePoints_(record, gapStart, gapEnd, times, values, qualities)
+					record["intervals"] = mergeIntervals(record["intervals"] + [[gapStart, gapEnd]])
+				ttl = None if self._ttl is None else max(0, record["created"] + self._ttl - time.time())
+				self._records.put(seriesKey, record, ttl)
+			times, values, qualities = selectPoints(record["times"], record["values"], record["qualities"], start, end)
+			return times, values, qualities, record["vertDatumInfo"]
+		finally :
+			lock.release()
+
+	def getMissingIntervals(self, seriesKey, start, end) :
+		'''
+		Return the parts of the closed UTC interval [start, end], and of any expected windows of
+		the series, that getPoints() would fetch
+		'''
+		lock = self._keyLock_(seriesKey)
+		lock.acquire()
+		try :
+			record = self._records.get(seriesKey)
+			intervals = record["intervals"] if record is not None else []
+			if not missingIntervals(start, end, intervals) :
+				return []
+			self._lock.acquire()
+			try     : expected = list(self._expected.get(seriesKey, []))
+			finally : self._lock.release()
+			gaps = []
+			for wantedStart, wantedEnd in mergeIntervals([[start, end]] + expected) :
+				gaps.extend(missingIntervals(wantedStart, wantedEnd, intervals))
+			return gaps
+		finally :
+			lock.release()
+
+	def invalidate(self, seriesKeyPrefix) :
+		'''
+		Discard the cached values and expected windows of all series whose key starts with the
+		specified items
+		'''
+		prefix = tuple(seriesKeyPrefix)
+		matches = lambda key : key[:len(prefix)] == prefix
+		self._lock.acquire()
+		try :
+			for key in [key for key in self._expected if matches(key)] :
+				del self._expected[key]
+		finally :
+			self._lock.release()
+		return self._records.removeIf(matches)
+
+	def clear(self) :
+		'''
+		Discard all cached values and expected windows and reset the statistics
+		'''
+		self._lock.acquire()
+		try :
+			self._expected.clear()
+			self._hits = self._fetches = self._coalesced = 0
+		finally :
+			self._lock.release()
+		self._records.clear()
+
+	def getStatistics(self) :
+		'''
+		Return a dictionary of the number of fully cached reads, of fetches for uncached periods,
+		of expected windows added to fetches, and of the cached series and their size
+		'''
+		statistics = self._records.getStatistics()
+		return {
+			"hits"      : self._hits,
+			"fetches"   : self._fetches,
+			"coalesced" : self._coalesced,
+			"entries"   : statistics["entries"],
+			"bytes"     : statistics["bytes"],
+			"maxBytes"  : statistics["maxBytes"],
+			"ttl"       : self._ttl}
+
+##############################################################################
+
+DEFAULT_CATALOG_TTL = 3600
+
+def globToRegex(pattern) :
+	'''
+	Compile a case-insensitive regular expression for a glob pattern using * and ?
+	'''
+	parts = []
+	for c in pattern :
+		if   c == "*" : parts.append(".*")
+		elif c == "?" : parts.append(".")
+		else          : parts.append(re.escape(c))
+	return re.compile("^%s$" % "".join(parts), re.IGNORECASE | re.DOTALL)
+
+class CatalogIndex :
+	'''
+	A snapshot of catalog identifiers with a case-insensitive set for existence checks and an
+	index on the first dot-separated segment (the location) for glob lookups
+	'''
+	def __init__(self, ids, ttl=DEFAULT_CATALOG_TTL) :
+		self._lock     = threading.Lock()
+		self._ids      = {}
+		self._segments = {}
+		self._loadedAt = time.time()
+		self._ttl      = ttl
+		for id in ids :
+			self._add_(id)
+		self._keys = sorted(self._segments)
+
+	def _add_(self, id) :
+		key = id.upper()
+		if key in self._ids : return False
+		self._ids[key] = id
+		self._segments.setdefault(key.split(".", 1)[0], []).append(id)
+		return True
+
+	def isExpired(self) :
+		'''
+		Return whether the snapshot is older than its time-to-live
+		'''
+		return self._ttl is not None and self._loadedAt + self._ttl <= time.time()
+
+	def __len__(self) :
+		return len(self._ids)
+
+	def exists(self, id) :
+		'''
+		Return whether an identifier is in the catalog, ignoring case
+		'''
+		return id.upper() in self._ids
+
+	def match(self, pattern) :
+		'''
+		Return the identifiers that match a glob pattern (*, ?), ignoring case
+		'''
+		upperPattern = pattern.upper()
+		if "*" not in upperPattern and "?" not in upperPattern :
+			id = self._ids.get(upperPattern)
+			return [] if id is None else [id]
+		prefix = re.split(r"[*?]", upperPattern, 1)[0]
+		regex = globToRegex(pattern)
+		self._lock.acquire()
+		try :
+			if "." in prefix :
+				buckets = [self._segments.get(prefix.split(".", 1)[0], [])]
+			else :
+				buckets = []
+				i = bisect.bisect_left(self._keys, prefix)
+				while i < len(self._keys) and self._keys[i].startswith(prefix) :
+					buckets.append(self._segments[self._keys[i]])
+					i += 1
+			return [id for bucket in buckets for id in bucket if regex.match(id)]
+		finally :
+			self._lock.release()
+
+	def add(self, id) :
+		'''
+		Add an identifier, e.g. after storing a new time series
+		'''
+		self._lock.acquire()
+		try :
+			if self._add_(id) :
+				segment = id.upper().split(".", 1)[0]
+				if len(self._segments[segment]) == 1 :
+					bisect.insort(self._keys, segment)
+		finally :
+			self._lock.release()
+
+	def remove(self, id) :
+		'''
+		Remove an identifier, e.g. after deleting a time series
+		'''
+		self._lock.acquire()
+		try :
+			existing = self._ids.pop(id.upper(), None)
+			if existing is not None :
+				self._segments[id.upper().split(".", 1)[0]].remove(existing)
+		finally :
+			self._lock.release()
+
+##############################################################################
+
+DEFAULT_UNITS_DIR = "/data/units"
+DEFAULT_UNITS_TTL = 86400
+
+class UnitsRegistry :
+	'''
+	A process-wide table of default units by unit system and parameter, shared by every DBAPI
+	and RADARAPI object. Each source of units (a database office or a CDA server) is a scope
+	that is loaded in bulk once and then served from memory.
+
+	Loaded tables are also written to a JSON file per scope in directory, so later runs start
+	from the file instead of the server until it is ttl seconds old. If the directory cannot be
+	written the registry works from memory only.
+
+	The load function is called without holding the registry lock, so a loader may take other
+	locks freely; if two threads load the same scope at once the first result is kept.
+	'''
+	def __init__(self, directory=DEFAULT_UNITS_DIR, ttl=DEFAULT_UNITS_TTL) :
+		self._lock      = threading.Lock()
+		self._directory = directory
+		self._ttl       = ttl
+		self._tables    = {}
+		self._loads     = 0
+		self._fileLoads = 0
+
+	def getDirectory(self) :
+		'''
+		Return the persistence directory, or None if the registry is memory only
+		'''
+		return self._directory
+
+	def setDirectory(self, directory) :
+		'''
+		Set the persistence directory; None keeps the registry in memory only
+		'''
+		self._directory = directory
+
+	def setTtl(self, ttl) :
+		'''
+		Set the number of seconds a loaded table is used before it is loaded again
+		'''
+		self._ttl = ttl
+
+	def _fileName_(self, scope) :
+		if not self._directory :
+			return None
+		return os.path.join(self._directory, hashlib.sha1(scope.encode("utf-8")).hexdigest() + ".units")
+
+	def _readFile_(self, scope) :
+		'''
+		Read a persisted table, returning (created, units) or None if it is missing, unreadable or expired
+		'''
+		fileName = self._fileName_(scope)
+		if not fileName or not os.path.exists(fileName) :
+			return None
+		try :
+			f = open(fileName, "rb")
+			try     : record = json.loads(f.read().decode("utf-8"))
+			finally : f.close()
+			if record["scope"] != scope :
+				return None
+			if self._ttl is not None and record["created"] + self._ttl <= time.time() :
+				return None
+			return record["created"], record["units"]
+		except Exception as e :
+			logger.warning("Ignoring unreadable units file %s: %s" % (fileName, e))
+			return None
+
+	def _writeFile_(self, scope, created, units) :
+		'''
+		Write a table atomically, ignoring failures
+		'''
+		fileName = self._fileName_(scope)
+		if not fileName :
+			return
+		try :
+			if not os.path.isdir(self._directory) :
+				os.makedirs(self._directory)
+			data = json.dumps({"scope" : scope, "created" : created, "units" : units}, sort_keys=True)
+			tmpName = "%s.%s.tmp" % (fileName, threading.current_thread().name)
+			f = open(tmpName, "wb")
+			try     : f.write(data.encode("utf-8"))
+			finally : f.close()
+			if os.path.exists(fileName) and os.name == "nt" :
+				os.remove(fileName)
+			os.rename(tmpName, fileName)
+		except Exception as e :
+			logger.debug("Could not persist units for %s: %s" % (scope, e))
+
+	def getTable(self, scope, load) :
+		'''
+		Return the units table for a scope as {unitSystem : {parameter : units}}, loading it from
+		the persisted file or by calling load() if necessary. The table is shared and must not be
+		modified by the caller; use put() to add entries.
+		'''
+		self._lock.acquire()
+		try :
+			entry = self._tables.get(scope)
+			if entry is not None and (self._ttl is None or entry[0] + self._ttl > time.time()) :
+				return entry[1]
+		finally :
+			self._lock.release()
+		record = self._readFile_(scope)
+		fromFile = record is not None
+		if not fromFile :
+			units = load()
+			if units is None :
+				return None
+			record = (time.time(), units)
+		self._lock.acquire()
+		try :
+			entry = self._tables.get(scope)
+			if entry is not None and entry[0] >= record[0] :
+				return entry[1]
+			self._tables[scope] = record
+			if fromFile : self._fileLoads += 1
+			else        : self._loads += 1
+		finally :
+			self._lock.release()
+		if not fromFile :
+			self._writeFile_(scope, record[0], record[1])
+		return record[1]
+
+	def lookup(self, scope, unitSystem, parameter) :
+		'''
+		Return the units for a parameter from an already loaded table, or None
+		'''
+		self._lock.acquire()
+		try :
+			entry = self._tables.get(scope)
+			if entry is None :
+				return None
+			return entry[1].get(unitSystem, {}).get(parameter)
+		finally :
+			self._lock.release()
+
+	def put(self, scope, unitSystem, parameter, units) :
+		'''
+		Add the units for a single parameter to a loaded table and persist the table
+		'''
+		self._lock.acquire()
+		try :
+			entry = self._tables.get(scope)
+			if entry is None :
+				entry = self._tables[scope] = (time.time(), {})
+			entry[1].setdefault(unitSystem, {})[parameter] = units
+			created, table = entry[0], dict([(k, dict(v)) for k, v in entry[1].items()])
+		finally :
+			self._lock.release()
+		self._writeFile_(scope, created, table)
+
+	def invalidate(self, scope=None) :
+		'''
+		Drop the table for a scope, or all tables, from memory and disk
+		'''
+		self._lock.acquire()
+		try :
+			scopes = list(self._tables.keys()) if scope is None else [scope]
+			for s in scopes :
+				self._tables.pop(s, None)
+		finally :
+			self._lock.release()
+		for s in scopes :
+			fileName = self._fileName_(s)
+			if fileName and os.path.exists(fileName) :
+				try    : os.remove(fileName)
+				except : pass
+
+	def getStatistics(self) :
+		'''
+		Return a dictionary of the number of tables held and how they were loaded
+		'''
+		self._lock.acquire()
+		try :
+			return {
+				"scopes"    : len(self._tables),
+				"loads"     : self._loads,
+				"fileLoads" : self._fileLoads,
+				"directory" : self._directory,
+				"ttl"       : self._ttl}
+		finally :
+			self._lock.release()
+
+_unitsRegistry     = None
+_unitsRegistryLock = threading.Lock()
+
+def getUnitsRegistry() :
+	'''
+	Return the process-wide UnitsRegistry, creating it on first use
+	'''
+	global _unitsRegistry
+	_unitsRegistryLock.acquire()
+	try :
+		if _unitsRegistry is None :
+			_unitsRegistry = UnitsRegistry()
+		return _unitsRegistry
+	finally :
+		_unitsRegistryLock.release()
+
+def parameterOf(name) :
+	'''
+	Return the parameter of a time series identifier, or the name itself if it is not one
+	'''
+	parts = name.split(".")
+	if len(parts) > 1 :
+		return parts[1]
+	return name
+
+##############################################################################
+
+DEFAULT_LOCATION_TTL     = 86400
+DEFAULT_LOCATION_ENTRIES = 10000
+DEFAULT_LEVEL_TTL        = 6 * 3600
+DEFAULT_LEVEL_ENTRIES    = 10000
+
+_NOT_CACHED = object()
+
+def _copyRecord_(record) :
+	return None if record is None else dict(record)
+
+class RecordCache(LruCache) :
+	'''
+	An LruCache of per-identifier records keyed by office, upper-case identifier and a
+	qualifier (such as a unit system), filled in bulk. Identifiers the server reported not to
+	exist are cached as None so they are not requested again; identifiers whose retrieval
+	failed are not cached. The size budget is a number of entries.
+	'''
+	def __init__(self, maxEntries, ttl, copy=None) :
+		LruCache.__init__(self, maxEntries, ttl, copy=copy)
+
+	def getRecords(self, officeId, qualifier, ids, fetch) :
+		'''
+		Return a dictionary of records keyed by the requested ids, with None for unknown ids.
+		Ids that are not cached are passed together to fetch(ids), which must return a
+		dictionary of records keyed by upper-case id and a collection of the upper-case ids that
+		could not be retrieved. Ids in neither are known not to exist.
+		'''
+		results, missing = {}, []
+		for id in ids :
+			record = self.get((officeId, id.upper(), qualifier), _NOT_CACHED)
+			if record is _NOT_CACHED :
+				if id not in missing :
+					missing.append(id)
+			else :
+				results[id] = record
+		if missing :
+			fetched, failed = fetch(missing)
+			for id in missing :
+				record = fetched.get(id.upper())
+				if record is not None or id.upper() not in failed :
+					self.put((officeId, id.upper(), qualifier), record)
+				results[id] = self._copy(record)
+		return results
+
+class LocationCache(RecordCache) :
+	'''
+	A RecordCache of location records (dictionaries of location attributes) keyed by office,
+	location id and unit system, with a long time-to-live.
+	'''
+	def __init__(self, maxEntries=DEFAULT_LOCATION_ENTRIES, ttl=DEFAULT_LOCATION_TTL) :
+		RecordCache.__init__(self, maxEntries, ttl, _copyRecord_)
+
+	def getLocations(self, officeId, unitSystem, ids, fetch) :
+		'''
+		Return a dictionary of location records keyed by the requested ids (see getRecords)
+		'''
+		return self.getRecords(officeId, unitSystem, ids, fetch)
+
+class LocationLevelCache(RecordCache) :
+	'''
+	A RecordCache of location level values keyed by office, level id, units and effective
+	date (yyyy/MM/dd). All requests for a level on the same date share one value.
+	'''
+	def __init__(self, maxEntries=DEFAULT_LEVEL_ENTRIES, ttl=DEFAULT_LEVEL_TTL) :
+		RecordCache.__init__(self, maxEntries, ttl)
+
+	def getLevels(self, officeId, levelUnits, effectiveDate, fetch) :
+		'''
+		Return a dictionary of level values keyed by the level ids of levelUnits, a list of
+		(levelId, units) pairs, with None for unknown levels. Levels that are not cached are
+		passed together to fetch(levelUnits), which must return a dictionary of values keyed by
+		upper-case level id and a collection of the upper-case level ids that could not be
+		retrieved, as for getRecords.
+		'''
+		results = {}
+		byUnits = {}
+		for levelId, units in levelUnits :
+			byUnits.setdefault(units, []).append(levelId)
+		for units, levelIds in byUnits.items() :
+			results.update(self.getRecords(
+				officeId,
+				(units, effectiveDate),
+				levelIds,
+				lambda ids : fetch([(id, units) for id in ids])))
+		return results
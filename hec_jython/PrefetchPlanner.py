@@ -0,0 +1,484 @@
+'''
+This module plans the time series reads of a report up front so that they can
+be retrieved in parallel batches before the report is laid out. The reads are
+declared as id templates expanded for a list of locations over a time window,
+and the retrieved data are left in the session caches of the DbAccess or
+RadarAccess object, so the report's own get() calls are answered from memory.
+
+   planner = PrefetchPlanner.PrefetchPlanner()
+   planner.add('%s.Elev.Inst.1Hour.0.Best-MRBWM', ['FTPK', 'GARR'], startTime, endTime)
+   planner.prefetch(db)
+   tsc = db.get('FTPK.Elev.Inst.1Hour.0.Best-MRBWM', startTime, endTime)
+
+Recurring reports can instead let the DbAccess or RadarAccess object write an
+access log of the reads of each run, which the next run of the same script
+replays in the background as soon as its time window is known:
+
+   db = DBAPI.open(accessLog=True)
+   db.setTimeWindow(startTime, endTime)
+
+A prefetch() on an object whose access log is being replayed waits for the
+replayed reads of the same series, window and units instead of repeating them.
+
+Version History
+
+   22.1  18Oct2026   Original version
+   22.1  18Oct2026   Added AccessLog
+
+'''
+
+import threading, time, calendar, json, os, sys, re, logging
+import WorkerPool
+
+logger = logging.getLogger(__name__)
+
+try :
+	basestring
+except NameError :
+	basestring = str
+
+DEFAULT_MAX_WORKERS     = 8
+DEFAULT_ACCESS_LOG_DIR  = "/data/accesslog"
+DEFAULT_MAX_LOG_ENTRIES = 2000
+DEFAULT_BATCH_SIZE      = 100
+
+def _idBatches_(reads, batchSize) :
+	'''
+	Split a list of (tsId, units) reads into batches of up to batchSize reads in which each id
+	appears only once, so that an id read in several units gets one batch per unit
+	'''
+	groups = []
+	for tsId, units in reads :
+		for group in groups :
+			if tsId not in group[1] :
+				break
+		else :
+			group = ([], set())
+			groups.append(group)
+		group[0].append((tsId, units))
+		group[1].add(tsId)
+	batches = []
+	for groupReads, ids in groups :
+		for i in range(0, len(groupReads), batchSize) :
+			batches.append(groupReads[i:i+batchSize])
+	return batches
+
+class PrefetchPlanner :
+	'''
+	A deduplicated list of (tsId, startTimeStr, endTimeStr, units) reads and the means to
+	retrieve them all at once.
+	'''
+	def __init__(self) :
+		self._reads = []
+		self._keys  = set()
+
+	def __len__(self) :
+		return len(self._reads)
+
+	def add(self, templates, locations=None, startTimeStr=None, endTimeStr=None, units=None) :
+		'''
+		Add the time series of one or more id templates, expanded with each location, over a time
+		window (the default window of the object if not specified). Templates without %s are used
+		as is and templates that are None are ignored. Returns the number of new reads
+		'''
+		if isinstance(templates, basestring) :
+			templates = [templates]
+		count = 0
+		for template in templates :
+			if not template :
+				continue
+			if "%s" in template and locations :
+				tsIds = [template % location for location in locations]
+			else :
+				tsIds = [template]
+			for tsId in tsIds :
+				key = (tsId.upper(), startTimeStr, endTimeStr, units)
+				if key in self._keys :
+					continue
+				self._keys.add(key)
+				self._reads.append((tsId, startTimeStr, endTimeStr, units))
+				count += 1
+		return count
+
+	def getReads(self) :
+		'''
+		Return the list of planned (tsId, startTimeStr, endTimeStr, units) reads
+		'''
+		return self._reads[:]
+
+	def clear(self) :
+		'''
+		Remove all planned reads
+		'''
+		self._reads = []
+		self._keys  = set()
+
+	def _batchRequests_(self, db, batchSize, accessLog=None) :
+		'''
+		Return fetchMany() requests that read the planned time series of each window with
+		getTimeSeriesContainers() in batches of batchSize ids, and a list of (future, tsId) of the
+		planned reads already made by the replay of accessLog, which are left out of the requests.
+		An id planned in several units is read in a separate batch for each unit
+		'''
+		replayed = []
+		windows = {}
+		order = []
+		for tsId, startTimeStr, endTimeStr, units in self._reads :
+			window = (startTimeStr, endTimeStr)
+			if window not in windows :
+				windows[window] = []
+				order.append(window)
+			#----------------------------------------------------------#
+			# resolve the units the way get() does, so that the cached #
+			# containers are found by the report's own calls           #
+			#----------------------------------------------------------#
+			if not units :
+				units = db.unitsForParameter(tsId.split(".")[1])
+			replay = accessLog.getReplayFuture(tsId, startTimeStr, endTimeStr, units) if accessLog is not None else None
+			if replay is not None :
+				if replay not in replayed :
+					replayed.append(replay)
+			elif (tsId, units) not in windows[window] :
+				windows[window].append((tsId, units))
+		requests = []
+		for startTimeStr, endTimeStr in order :
+			for batch in _idBatches_(windows[(startTimeStr, endTimeStr)], batchSize) :
+				requests.append((
+					"getTimeSeriesContainers",
+					[tsId for tsId, units in batch],
+					startTimeStr,
+					endTimeStr,
+					dict(batch),
+					{}))
+		return requests, replayed
+
+	def prefetch(self, db, maxWorkers=DEFAULT_MAX_WORKERS, batchSize=None) :
+		'''
+		Retrieve all planned reads through a DbAccess or RadarAccess object on up to maxWorkers
+		threads, enabling its in-memory cache if necessary, so that later get() calls for the same
+		ids and windows are answered from memory. Objects that can read many time series in one
+		call do so in batches of batchSize ids (the object's batch size by default); others read
+		each time series separately. Reads that the object's access log replay already makes are
+		not repeated; their replay is waited for instead. Time series that do not exist are skipped.
+
+		Returns a dictionary of the number of reads and of time series found, missing and failed,
+		and the elapsed seconds
+		'''
+		summary = {"reads" : len(self._reads), "found" : 0, "missing" : 0, "failed" : 0, "seconds" : 0.0}
+		if not self._reads :
+			return summary
+		t0 = time.time()
+		if db.getCacheStatistics() is None :
+			db.enableCache()
+		if hasattr(db, "getTimeSeriesContainers") and (batchSize is not None or hasattr(db, "getBatchSize")) :
+			if batchSize is None :
+				batchSize = db.getBatchSize()
+			requests, replayed = self._batchRequests_(db, int(batchSize), getattr(db, "_accessLog", None))
+			for request, result in zip(requests, db.fetchMany(requests, maxWorkers)) :
+				if isinstance(result, dict) :
+					found = len([tsc for tsc in result.values() if tsc is not None])
+					summary["found"] += found
+					summary["missing"] += len(result) - found
+				else :
+					summary["failed"] += len(request[1])
+			for future, tsId in replayed :
+				if future.exception() is not None :
+					summary["failed"] += 1
+				elif future.result().get(tsId) is None :
+					summary["missing"] += 1
+				else :
+					summary["found"] += 1
+		else :
+			requests = [("getIfExists", tsId, startTimeStr, endTimeStr, units) for tsId, startTimeStr, endTimeStr, units in self._reads]
+			for result in db.fetchMany(requests, maxWorkers) :
+				#---------------------------------------------------------#
+				# under Jython, java exceptions are not Python Exceptions #
+				#---------------------------------------------------------#
+				if result is None :
+					summary["missing"] += 1
+				elif hasattr(result, "numberValues") :
+					summary["found"] += 1
+				else :
+					summary["failed"] += 1
+		summary["seconds"] = time.time() - t0
+		return summary
+
+
+_MONTHS = dict([(name, i + 1) for i, name in enumerate(("JAN", "FEB", "MAR", "APR", "MAY", "JUN", "JUL", "AUG", "SEP", "OCT", "NOV", "DEC"))])
+
+def _parseTime_(timeStr) :
+	'''
+	Return the UTC milliseconds of a "ddMonyyyy hhmm" time string, or None if it is not one
+	'''
+	if not timeStr :
+		return None
+	m = re.match(r"\s*(\d{1,2})([A-Za-z]{3})(\d{4})[ ,]*(\d{2}):?(\d{2})\s*$", timeStr)
+	if m is None or m.group(2).upper() not in _MONTHS :
+		return None
+	day, month, year, hour, minute = m.groups()
+	seconds = calendar.timegm((int(year), _MONTHS[month.upper()], int(day), 0, 0, 0))
+	return (seconds + int(hour) * 3600 + int(minute) * 60) * 1000
+
+def _readKey_(tsId, startTimeStr, endTimeStr, units) :
+	'''
+	Return the key that matches reads of the same time series, window and units, or None if the
+	window times are not "ddMonyyyy hhmm" strings
+	'''
+	startTime, endTime = _parseTime_(startTimeStr), _parseTime_(endTimeStr)
+	if startTime is None or endTime is None :
+		return None
+	return (tsId.upper(), units, startTime, endTime)
+
+def _formatTime_(millis) :
+	return time.strftime("%d%b%Y %H%M", time.gmtime(millis / 1000))
+
+def defaultLogName() :
+	'''
+	Return the name of the running script without its extension, or "default"
+	'''
+	script = sys.argv and sys.argv[0] or ""
+	name = os.path.splitext(os.path.basename(script))[0]
+	return re.sub(r"[^\w.-]", "_", name) or "default"
+
+
+class AccessLog :
+	'''
+	The time series reads of one run of a script, kept so that the next run can retrieve the
+	same series in the background before the script asks for them.
+
+	Each read is recorded with its resolved window and the end of the object's default time
+	window at the time. On replay a read is shifted by the distance between the recorded and
+	current default window ends, or by whole days since the log was written if either is not
+	known, and is read with the recorded units, time zone and flags so that the script's own
+	read finds it in the caches. Versioned reads are not recorded.
+	'''
+	def __init__(self, name=None, directory=DEFAULT_ACCESS_LOG_DIR, maxEntries=DEFAULT_MAX_LOG_ENTRIES) :
+		self._lock       = threading.Lock()
+		self._local      = threading.local()
+		self._name       = name or defaultLogName()
+		self._directory  = directory
+		self._maxEntries = maxEntries
+		self._entries    = []
+		self._keys       = set()
+		self._dirty      = False
+		self._replayed   = False
+		self._pool       = None
+		self._futures    = {}
+
+	def getFileName(self) :
+		'''
+		Return the name of the log file
+		'''
+		return os.path.join(self._directory, self._name + ".json")
+
+	def __len__(self) :
+		return len(self._entries)
+
+	def record(self, request, windowEndStr=None) :
+		'''
+		Record the read of a resolved time series request made while the default time window
+		ended at windowEndStr. Reads made by the replay itself are not recorded
+		'''
+		if getattr(self._local, "replaying", False) or request.get("versionTimeStr") :
+			return
+		entry = {
+			"officeId"       : request["officeId"],
+			"tsId"           : request["tsId"],
+			"units"          : request["units"],
+			"timeZone"       : request["timeZone"].getID(),
+			"trim"           : request["trim"],
+			"startInclusive" : request["startTimeInclusive"],
+			"endInclusive"   : request["endTimeInclusive"],
+			"getPrevious"    : request["getPrevious"],
+			"getNext"        : request["getNext"],
+			"startTime"      : int(request["startTime"]),
+			"endTime"        : int(request["endTime"]),
+			"windowEnd"      : _parseTime_(windowEndStr)}
+		key = tuple(sorted(entry.items()))
+		self._lock.acquire()
+		try :
+			if key in self._keys or len(self._entries) >= self._maxEntries :
+				return
+			self._keys.add(key)
+			self._entries.append(entry)
+			self._dirty = True
+		finally :
+			self._lock.release()
+
+	def save(self) :
+		'''
+		Write the reads recorded in this run atomically, if there are any, ignoring failures
+		'''
+		self._lock.acquire()
+		try :
+			if not self._dirty :
+				return
+			entries = self._entries[:]
+			self._dirty = False
+		finally :
+			self._lock.release()
+		fileName = self.getFileName()
+		try :
+			if not os.path.isdir(self._directory) :
+				os.makedirs(self._directory)
+			data = json.dumps({"name" : self._name, "recorded" : time.time(), "entries" : entries}, sort_keys=True)
+			tmpName = "%s.%s.tmp" % (fileName, threading.current_thread().name)
+			f = open(tmpName, "wb")
+			try     : f.write(data.encode("utf-8"))
+			finally : f.close()
+			if os.path.exists(fileName) and os.name == "nt" :
+				os.remove(fileName)
+			os.rename(tmpName, fileName)
+		except Exception as e :
+			logger.debug("Could not write access log %s: %s" % (fileName, e))
+
+	def load(self) :
+		'''
+		Return the recorded time and entries of the previous run, or None if there is no
+		readable log
+		'''
+		fileName = self.getFileName()
+		if not os.path.exists(fileName) :
+			return None
+		try :
+			f = open(fileName, "rb")
+			try     : record = json.loads(f.read().decode("utf-8"))
+			finally : f.close()
+			return record["recorded"], record["entries"]
+		except Exception as e :
+			logger.warning("Ignoring unreadable access log %s: %s" % (fileName, e))
+			return None
+
+	def getPlannedReads(self, windowEndStr=None, now=None) :
+		'''
+		Return the reads of the previous run shifted to the current default time window, as a
+		list of (entry, startTimeStr, endTimeStr)
+		'''
+		loaded = self.load()
+		if loaded is None :
+			return []
+		recorded, entries = loaded
+		if now is None :
+			now = time.time()
+		windowEnd = _parseTime_(windowEndStr)
+		dayShift = int((now - recorded) // 86400) * 86400000
+		reads = []
+		for entry in entries :
+			if windowEnd is not None and entry.get("windowEnd") is not None :
+				shift = windowEnd - entry["windowEnd"]
+			else :
+				shift = dayShift
+			reads.append((entry, _formatTime_(entry["startTime"] + shift), _formatTime_(entry["endTime"] + shift)))
+		return reads
+
+	def _replayBatch_(self, db, flags, batch) :
+		'''
+		Read a batch of (tsId, units) reads sharing the same window and flags. The read runs with
+		concurrent reads enabled for this thread only, so it does not hold the object lock while
+		the script's own reads wait for it
+		'''
+		startTimeStr, endTimeStr, timeZone, trim, startInclusive, endInclusive, getPrevious, getNext, officeId = flags
+		concurrent = getattr(db._threadLocal, "concurrent", False)
+		self._local.replaying = True
+		db._threadLocal.concurrent = True
+		try :
+			return db.getTimeSeriesContainers(
+				[tsId for tsId, units in batch],
+				startTimeStr,
+				endTimeStr,
+				dict(batch),
+				timeZone,
+				trim,
+				startInclusive,
+				endInclusive,
+				getPrevious,
+				getNext,
+				officeId=officeId)
+		finally :
+			db._threadLocal.concurrent = concurrent
+			self._local.replaying = False
+
+	def replay(self, db, windowEndStr=None, maxWorkers=DEFAULT_MAX_WORKERS) :
+		'''
+		Start reading the previous run's series through a DbAccess or RadarAccess object in the
+		background, enabling its in-memory cache if necessary, and return the number of reads
+		started. Reads sharing a window and flags are retrieved together with
+		getTimeSeriesContainers() in batches of the object's batch size. Only the first call
+		replays the log; errors are left for the script's own reads to report. Objects that
+		cannot read many series in one call or cannot read concurrently are not replayed
+		'''
+		self._lock.acquire()
+		try :
+			if self._replayed :
+				return 0
+			self._replayed = True
+		finally :
+			self._lock.release()
+		if not hasattr(db, "getTimeSeriesContainers") or not hasattr(db, "_threadLocal") :
+			logger.info("Not replaying access log %s: concurrent batched reads are not supported" % self.getFileName())
+			return 0
+		reads = self.getPlannedReads(windowEndStr)
+		if not reads :
+			return 0
+		if db.getCacheStatistics() is None :
+			db.enableCache()
+		#-------------------------------------------------#
+		# group the reads that can share one batched call #
+		#-------------------------------------------------#
+		groups = {}
+		order = []
+		for entry, startTimeStr, endTimeStr in reads :
+			flags = (
+				startTimeStr,
+				endTimeStr,
+				entry["timeZone"],
+				entry["trim"],
+				entry["startInclusive"],
+				entry["endInclusive"],
+				entry["getPrevious"],
+				entry["getNext"],
+				entry["officeId"])
+			if flags not in groups :
+				groups[flags] = []
+				order.append(flags)
+			read = (entry["tsId"], entry["units"])
+			if read not in groups[flags] :
+				groups[flags].append(read)
+		batchSize = db.getBatchSize() if hasattr(db, "getBatchSize") else DEFAULT_BATCH_SIZE
+		pool = WorkerPool.WorkerPool(maxWorkers, "AccessLog")
+		self._lock.acquire()
+		try :
+			self._pool = pool
+			for flags in order :
+				for batch in _idBatches_(groups[flags], int(batchSize)) :
+					future = pool.submit(self._replayBatch_, db, flags, batch)
+					for tsId, units in batch :
+						self._futures[_readKey_(tsId, flags[0], flags[1], units)] = (future, tsId)
+		finally :
+			self._lock.release()
+		pool.shutdown(False)
+		logger.info("Replaying %d reads from access log %s" % (len(reads), self.getFileName()))
+		return len(reads)
+
+	def getReplayFuture(self, tsId, startTimeStr, endTimeStr, units) :
+		'''
+		Return the Future of the replayed batch that reads a time series over a window in the
+		given units, and the id it is keyed by in the batch result, or None if the replay does not
+		read it
+		'''
+		self._lock.acquire()
+		try     : return self._futures.get(_readKey_(tsId, startTimeStr, endTimeStr, units))
+		finally : self._lock.release()
+
+	def stopReplay(self) :
+		'''
+		Drop the replayed reads that have not started and wait for the others to finish
+		'''
+		self._lock.acquire()
+		try :
+			pool = self._pool
+			self._pool = None
+		finally :
+			self._lock.release()
+		if pool is not None :
+			pool.shutdown(True, True)
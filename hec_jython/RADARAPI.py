@@ -17,7 +17,7 @@
 import platform
 IS_CPYTHON = True if platform.python_implementation() == "CPython" else False
 
-import threading
+import threading, os, sys, atexit, collections
 import json, urllib, csv
 
 if IS_CPYTHON:
@@ -35,10 +35,11 @@
 from hec.lang               import Const
 from java.sql               import Timestamp
 from java.text              import SimpleDateFormat
-from java.util              import Calendar, Date, TimeZone, Collections
+from java.util              import ArrayList, Calendar, Date, TimeZone, Collections
 from rma.util               import RMAIO
 from wcds.dbi.oracle        import CwmsDaoServiceLookup
-from hec.db.cwms            import CwmsTimeSeriesDao, CwmsCatalogDao, CwmsRatingDao
+from hec.db.cwms            import CwmsTimeSeriesDao, CwmsCatalogDao, CwmsRatingDao, CwmsLocationDao, CwmsLevelDao
+from hec.data.level         import JDomLocationLevelImpl
 
 from mil.army.usace.hec.data.timeseries.math import TimeSeriesTemplate
 from mil.army.usace.hec.metadata.timeseries import TimeSeriesIdentifierFactory
@@ -47,6 +48,7 @@
 from java.time import ZoneId, LocalDateTime, Instant, DateTimeException, ZonedDateTime
 from java.time.format import DateTimeFormatter
 from mil.army.usace.hec.metadata import Units
+from mil.army.usace.hec.metadata.location import LocationTemplate
 from hec.data.tx import DataSetTx, DescriptionTx
 from hec.hecmath import TimeSeriesMath
 from hec.data.cwmsRating import RatingSet, RatingSetFactory
@@ -64,6 +66,10 @@
 from mil.army.usace.hec.cwms.http.client import ApiConnectionInfoBuilder, HttpRequestBuilderImpl
 
 import DBAPI
+import WorkerPool
+import DataCache
+import CallMetrics
+import PrefetchPlanner
 import logging
 
 logger = logging.getLogger(__name__)
@@ -235,43 +241,124 @@ def _createMetrics(parameters):
 	
 	return _getMetricsService().createMetrics(strings)
 	
+DEFAULT_METRICS_SUMMARY = os.path.join("/output", "RADARAPI_metrics.json")
+
+_callMetrics = CallMetrics.CallMetrics()
+_timers = {}
+_timersLock = threading.Lock()
+_instrumented = True
+_summaryAtExit = None
+
+def _getTimer(name):
+	'''
+	Return the metrics service timer for a function name, creating it on first use
+	'''
+	timer = _timers.get(name)
+	if timer is None:
+		_timersLock.acquire()
+		try:
+			timer = _timers.get(name)
+			if timer is None:
+				timer = _timers[name] = _createMetrics([name]).createTimer()
+		finally:
+			_timersLock.release()
+	return timer
 
 def _timed(func):
+	'''
+	Time each call with the cached metrics service timer for the function and record it in the
+	end-of-run summary
+	'''
+	name = func.__name__
 	@wraps(func)
 	def wrapper(*args, **kwargs):
-		timer = _createMetrics([func.__name__]).createTimer()
-		
-		ctx = timer.start()
+		if not _instrumented:
+			return func(*args, **kwargs)
+		ctx = _getTimer(name).start()
+		t0 = CallMetrics.clock()
 		try:
-			result = func(*args, **kwargs)
-			return result
+			return func(*args, **kwargs)
 		finally:
 			ctx.close()
+			_callMetrics.record(name, CallMetrics.clock() - t0)
+	return wrapper
+
+def _counted(func):
+	'''
+	Count the calls of a trivial accessor in the end-of-run summary without timing them
+	'''
+	name = func.__name__
+	@wraps(func)
+	def wrapper(*args, **kwargs):
+		if _instrumented:
+			_callMetrics.count(name)
+		return func(*args, **kwargs)
 	return wrapper
 
+def setInstrumentation(enabled):
+	'''
+	Turn call timing and counting on or off for all RADARAPI functions
+	'''
+	global _instrumented
+	_instrumented = bool(enabled)
+
+def getMetricsSummary():
+	'''
+	Return a dictionary keyed by function name of the call count and, for timed functions,
+	the total, max, p50, p95 and p99 duration in seconds
+	'''
+	return _callMetrics.getSummary()
+
+def resetMetrics():
+	'''
+	Discard the call statistics gathered so far
+	'''
+	_callMetrics.reset()
+
+def writeMetricsSummary(fileName=None, format=None):
+	'''
+	Write the call statistics to a file as JSON or Prometheus text (see CallMetrics.write) and
+	return the file name. The default file is /output/RADARAPI_metrics.json
+	'''
+	fileName = _callMetrics.write(fileName or DEFAULT_METRICS_SUMMARY, format)
+	logger.info("Wrote call metrics summary to %s" % fileName)
+	return fileName
+
+def writeMetricsSummaryAtExit(fileName=None, format=None):
+	'''
+	Write the call statistics summary when the process exits
+	'''
+	global _summaryAtExit
+	first = _summaryAtExit is None
+	_summaryAtExit = (fileName, format)
+	if first:
+		atexit.register(_writeSummaryAtExit)
+
+def _writeSummaryAtExit():
+	try:
+		writeMetricsSummary(*_summaryAtExit)
+	except Exception as e:
+		logger.warning("Could not write call metrics summary: %s" % e)
+
 ##############################################################################
-@_timed
 def isUndefined(value) :
 	'''
 	Determine if a value is undefined
 	'''
 	return DBAPI.isUndefined(value)
 
-@_timed
 def nonVersionedDate() :
 	'''
 	Return a date string for non-versioned dates
 	'''
 	return DBAPI.nonVersionedDate()
 	
-@_timed
 def isNonVersioned(dateStr) :
 	'''
 	Determine if date string is the non-versioned date string
 	'''
 	return DBAPI.isNonVersioned(dateStr)
 
-@_timed
 def isTsId(id) :
 	'''
 	Determine if an identifier looks like a CWMS Times Sries Identifier
@@ -279,7 +366,6 @@ def isTsId(id) :
 	'''
 	return DBAPI.isTsId(id)
 
-@_timed
 def isRatingId(id) :
 	'''
 	Determine if an identifier looks like a CWMS Rating Identifier
@@ -345,6 +431,14 @@ def getConnectionFactory(dbUrl, dbOfc, apiConnectionInfo=None) :
 	return factory
 
 @_timed
+def fetchMany(db, requests, maxWorkers=WorkerPool.DEFAULT_MAX_WORKERS) :
+	'''
+	Run a list of read requests against a RadarAccess object on a bounded thread pool.
+	Returns the list of results (or exceptions) and the list of elapsed seconds, in request order
+	'''
+	return DBAPI.fetchMany(db, requests, maxWorkers)
+
+@_counted
 def getTimeWindow(*args) :
 	tw = DBAPI.getTimeWindow(*args)
 	return tw
@@ -361,6 +455,74 @@ def removeConnectionFactoryInstance() :
 
 ##############################################################################
 
+
+class TimeSeriesRef(object) :
+	'''
+	A handle to a time series read declared with RadarAccess.ref(). Nothing is retrieved until
+	the values of this or any other pending handle of the same RadarAccess object are needed,
+	at which point all pending handles are retrieved together in batched calls.
+
+	Attributes not defined here are taken from the retrieved TimeSeriesContainer, so a handle
+	can be used in place of the container it refers to.
+	'''
+	def __init__(self, db, tsId, startTimeStr, endTimeStr, units) :
+		self._db           = db
+		self._tsId         = tsId
+		self._startTimeStr = startTimeStr
+		self._endTimeStr   = endTimeStr
+		self._units        = units
+		self._resolved     = False
+		self._tsc          = None
+		self._error        = None
+
+	def __repr__(self) :
+		return "TimeSeriesRef(%r, %r, %r)" % (self._tsId, self._startTimeStr, self._endTimeStr)
+
+	def getId(self) :
+		'''
+		Return the time series id
+		'''
+		return self._tsId
+
+	def getTimeWindow(self) :
+		'''
+		Return the start and end time strings of the read
+		'''
+		return self._startTimeStr, self._endTimeStr
+
+	def isResolved(self) :
+		'''
+		Return whether the read has been made
+		'''
+		return self._resolved
+
+	def get(self) :
+		'''
+		Return the TimeSeriesContainer, or None if the time series could not be retrieved,
+		retrieving all pending handles first if necessary
+		'''
+		if not self._resolved :
+			self._db._resolveRefs_(self)
+		if self._error is not None :
+			raise self._error
+		return self._tsc
+
+	def exists(self) :
+		'''
+		Return whether the time series was retrieved
+		'''
+		return self.get() is not None
+
+	def __getattr__(self, name) :
+		if name.startswith("_") :
+			raise AttributeError(name)
+		tsc = self.get()
+		if tsc is None :
+			raise AttributeError("Time series %s was not retrieved, so it has no attribute %s" % (self._tsId, name))
+		return getattr(tsc, name)
+
+##############################################################################
+
 class OracleTypes :
 	'''
 	Functional equivalent of oracle.jdbc.OracleTypes
@@ -429,6 +591,8 @@ def __init__(self, *args, **kwargs) :
 		self._clientLock.acquire()
 		try :
 			self._initValues_()
+			accessLog = None
+			bootstrap = None
 			#----------------------------------#
 			# process the positional arguments #
 			#----------------------------------#
@@ -463,6 +627,10 @@ def __init__(self, *args, **kwargs) :
 					if self._endTimeStr :
 						raise ValueError("End time already specified in positional parameters")
 					self._endTimeStr = kwargs[key]
+				elif key == "accessLog" :
+					accessLog = kwargs[key]
+				elif key == "bootstrap" :
+					bootstrap = kwargs[key]
 				else :
 					raise ValueError('Invalid keyword parameter "%s"' % key)
 			#---------------------------------#
@@ -491,6 +659,10 @@ def __init__(self, *args, **kwargs) :
 			self._isOpen = self._factory is not None
 			if not self._isOpen:
 				raise Exception("Could not connect to database")
+			if bootstrap:
+				self.startBootstrap(None if bootstrap is True else bootstrap)
+			if accessLog:
+				self.enableAccessLog(accessLog if isinstance(accessLog, basestring) else None)
 		finally :
 			self._clientLock.release()
 
@@ -519,42 +691,361 @@ def _initValues_(self):
 		self._getPrevious = False
 		self._getNext = False
 		self._overrideProtection = False
+		self._storeChangedOnly = False
 		self._maxVersion = True
 		self._parameterUnits = None
 		self._ratingLoadMethod = "LAZY"
-		self._utcCal = Calendar.getInstance()
-		self._utcCal.setTimeZone(self._utcTimeZone)
-		self._sdf = SimpleDateFormat('yyyy/MM/dd HHmm')
-		self._sdfDATE = SimpleDateFormat('yyyy-MM-dd HH:mm:ss')
-		self._hts = HecTime(HecTime.SECOND_INCREMENT)
-		self._sdf.setTimeZone(self._utcTimeZone)
+		self._batchSize = 50
+		self._concurrentReads = False
+		self._threadLocal = threading.local()
+		self._fetchLatencies = []
+		self._tsCache = None
+		self._diskCache = None
+		self._windowCache = None
+		self._catalogTtl = DataCache.DEFAULT_CATALOG_TTL
+		self._catalogs = {}
+		self._catalogLock = threading.Lock()
+		self._locationCache = DataCache.LocationCache()
+		self._levelCache = DataCache.LocationLevelCache()
+		self._missingCache = DataCache.LruCache(DataCache.DEFAULT_MISSING_ENTRIES, DataCache.DEFAULT_MISSING_TTL)
+		self._accessLog = None
+		self._accessLogReplay = False
+		self._pendingRefs = []
+		self._refLock = threading.Lock()
+		self._bootstrap = {}
+		self._bootstrapLocations = set()
 		
 		self.resetVersionDate()
 	
 	# Sets the DataAccessFactory to use.
-	@_timed
+	@_counted
 	def setConnectionFactory(self, factory):
 		self._factory = factory
 	
-	@_timed
+	@_counted
 	def setApiConnectionInfo(self, connectionInfo):
 		self._connectionInfo = connectionInfo
 
-	@_timed
 	def lock(self):
 		'''
 		Lock the client lock
 		'''
 		self._clientLock.acquire()
 
-	@_timed
 	def unlock(self):
 		'''
 		Unlock the client lock
 		'''
 		self._clientLock.release()
+
+	def _readLock_(self) :
+		'''
+		Lock the client lock for a read unless concurrent reads are enabled for the object or
+		the calling thread. Returns whether the lock was acquired, to be passed to _readUnlock_
+		'''
+		if self._concurrentReads or getattr(self._threadLocal, "concurrent", False) :
+			return False
+		#--------------------------------------------------------#
+		# bootstrap loads use their own data access keys and run #
+		# alongside the script's reads                           #
+		#--------------------------------------------------------#
+		if getattr(self._threadLocal, "bootstrap", None) :
+			return False
+		self.lock()
+		return True
+
+	def _readUnlock_(self, locked) :
+		'''
+		Unlock the client lock if it was acquired by _readLock_
+		'''
+		if locked :
+			self.unlock()
+
+	@_timed
+	def startBootstrap(self, locations=None) :
+		'''
+		Start loading the time series and rating catalogs, the parameter units and, if locations
+		is given, the records of those locations on background threads. Later calls that need one
+		of these wait only for that load to finish
+		'''
+		if isinstance(locations, basestring) :
+			locations = [locations]
+		tasks = [("catalog", self._loadCatalogs_, ()), ("units", self._getParameterUnits_, ())]
+		if locations :
+			tasks.append(("locations", self.getLocations, (list(locations),)))
+		self.lock()
+		try :
+			if self._bootstrap :
+				return
+			pool = WorkerPool.WorkerPool(len(tasks), "bootstrap")
+			for name, func, args in tasks :
+				self._bootstrap[name] = pool.submit(self._runBootstrap_, name, func, *args)
+			if locations :
+				self._bootstrapLocations = set([id.upper() for id in locations])
+			pool.shutdown(False)
+		finally :
+			self.unlock()
+
+	@_timed
+	def waitForBootstrap(self, timeout=None) :
+		'''
+		Wait for the background loads started by startBootstrap() and return a dictionary of the
+		exception raised by each load, or None if it succeeded
+		'''
+		results = {}
+		for name, future in list(self._bootstrap.items()) :
+			results[name] = future.exception(timeout)
+		return results
+
+	def _runBootstrap_(self, name, func, *args) :
+		self._threadLocal.bootstrap = name
+		try :
+			return func(*args)
+		finally :
+			self._threadLocal.bootstrap = None
+
+	def _awaitBootstrap_(self, name) :
+		'''
+		Wait for a background bootstrap load unless it was not started, has finished, or is
+		being run by the calling thread
+		'''
+		future = self._bootstrap.get(name)
+		if future is not None and not future.done() and getattr(self._threadLocal, "bootstrap", None) != name :
+			future.exception()
+
+	def _loadCatalogs_(self) :
+		self._getCatalogIndex_("ts")
+		self._getCatalogIndex_("rating")
+
+	def _threadState_(self) :
+		'''
+		Return the calendar and formatters for the calling thread, creating them on first use
+		'''
+		state = self._threadLocal
+		if not hasattr(state, "sdfDATE") :
+			state.utcCal = Calendar.getInstance()
+			state.utcCal.setTimeZone(self._utcTimeZone)
+			state.sdf = SimpleDateFormat('yyyy/MM/dd HHmm')
+			state.sdf.setTimeZone(self._utcTimeZone)
+			state.sdfDATE = SimpleDateFormat('yyyy-MM-dd HH:mm:ss')
+			state.hts = HecTime(HecTime.SECOND_INCREMENT)
+		return state
+
+	@_timed
+	def setConcurrentReads(self, state) :
+		'''
+		Set whether reads may run in parallel from several threads. When True, the client lock is
+		only held while the object defaults are read, not for the duration of the network call
+		'''
+		self.lock()
+		try     : self._concurrentReads = bool(state)
+		finally : self.unlock()
+
+	@_counted
+	def getConcurrentReads(self) :
+		'''
+		Get whether reads may run in parallel from several threads
+		'''
+		self.lock()
+		try     : return self._concurrentReads
+		finally : self.unlock()
 	
 	@_timed
+	def fetchMany(self, requests, maxWorkers=WorkerPool.DEFAULT_MAX_WORKERS) :
+		'''
+		Run a list of read requests in parallel and return the results (or exceptions) in request
+		order. Each request is an identifier string, which is passed to get(), or a tuple of a get...
+		or read... method name followed by its positional arguments and an optional keyword argument
+		dictionary, e.g. ("get", tsId, startTime, endTime) or ("getRating", ratingId).
+		'''
+		results, latencies = fetchMany(self, requests, maxWorkers)
+		self.lock()
+		try     : self._fetchLatencies = latencies
+		finally : self.unlock()
+		if latencies :
+			logger.debug("fetchMany: %d requests, %.3f s total, %.3f s longest" % (len(latencies), sum(latencies), max(latencies)))
+		return results
+
+	@_counted
+	def getFetchLatencies(self) :
+		'''
+		Get the elapsed seconds of each request of the last fetchMany call
+		'''
+		self.lock()
+		try     : return self._fetchLatencies[:]
+		finally : self.unlock()
+
+	@_timed
+	def enableCache(self, maxBytes=DataCache.DEFAULT_MAX_BYTES, ttl=DataCache.DEFAULT_TTL) :
+		'''
+		Cache retrieved TimeSeriesContainers in memory, up to maxBytes, for ttl seconds. Entries are
+		keyed by office, id, time window, units, time zone, trim and inclusion flags, version date
+		and max version flag.
+		'''
+		self.lock()
+		try     : self._tsCache = DataCache.TimeSeriesCache(maxBytes, ttl)
+		finally : self.unlock()
+
+	@_timed
+	def disableCache(self) :
+		'''
+		Stop caching retrieved TimeSeriesContainers and discard the cache
+		'''
+		self.lock()
+		try     : self._tsCache = None
+		finally : self.unlock()
+
+	@_timed
+	def clearCache(self) :
+		'''
+		Discard all cached TimeSeriesContainers
+		'''
+		cache = self._tsCache
+		if cache is not None : cache.clear()
+
+	@_counted
+	def getCacheStatistics(self) :
+		'''
+		Get a dictionary of the cache hit, miss, eviction and size counters, or None if caching is disabled
+		'''
+		cache = self._tsCache
+		if cache is None : return None
+		return cache.getStatistics()
+
+	@_timed
+	def enableDiskCache(
+			self,
+			directory = DataCache.DEFAULT_DISK_CACHE_DIR,
+			volatilePeriod = DataCache.DEFAULT_VOLATILE_PERIOD,
+			maxAge = DataCache.DEFAULT_DISK_MAX_AGE) :
+		'''
+		Keep retrieved time series values in a cache directory that persists between runs. Only the
+		parts of a window that are not cached are retrieved; values newer than volatilePeriod seconds
+		before they were fetched are always retrieved again, and files older than maxAge seconds are
+		rebuilt.
+		'''
+		self.lock()
+		try     : self._diskCache = DataCache.DiskTimeSeriesCache(directory, volatilePeriod, maxAge)
+		finally : self.unlock()
+
+	@_timed
+	def disableDiskCache(self) :
+		'''
+		Stop using the disk cache. The cache files are left in place
+		'''
+		self.lock()
+		try     : self._diskCache = None
+		finally : self.unlock()
+
+	@_timed
+	def clearDiskCache(self) :
+		'''
+		Remove all files from the disk cache
+		'''
+		diskCache = self._diskCache
+		if diskCache is not None : diskCache.clear()
+
+	@_counted
+	def getDiskCacheStatistics(self) :
+		'''
+		Get a dictionary of the disk cache counters, or None if the disk cache is disabled
+		'''
+		diskCache = self._diskCache
+		if diskCache is None : return None
+		return diskCache.getStatistics()
+
+	@_timed
+	def enableWindowCache(self, maxBytes=DataCache.DEFAULT_MAX_BYTES, ttl=DataCache.DEFAULT_TTL) :
+		'''
+		Coalesce reads of the same time series over different windows, keeping the values retrieved
+		in memory, up to maxBytes, for ttl seconds. Only the parts of a window that have not been
+		retrieved are requested, and each caller gets a slice with its own trim and inclusion flags.
+		This is disabled by default
+		'''
+		self.lock()
+		try     : self._windowCache = DataCache.WindowCache(maxBytes, ttl)
+		finally : self.unlock()
+
+	@_timed
+	def disableWindowCache(self) :
+		'''
+		Stop coalescing reads of the same time series and discard the cached values
+		'''
+		self.lock()
+		try     : self._windowCache = None
+		finally : self.unlock()
+
+	@_timed
+	def clearWindowCache(self) :
+		'''
+		Discard all values kept for coalescing reads
+		'''
+		windowCache = self._windowCache
+		if windowCache is not None : windowCache.clear()
+
+	@_counted
+	def getWindowCacheStatistics(self) :
+		'''
+		Get a dictionary of the window cache counters, or None if it is disabled
+		'''
+		windowCache = self._windowCache
+		if windowCache is None : return None
+		return windowCache.getStatistics()
+
+	@_timed
+	def enableAccessLog(self, name=None, directory=PrefetchPlanner.DEFAULT_ACCESS_LOG_DIR, replay=True) :
+		'''
+		Record the time series reads of this run in an access log named for the running script
+		(or name), written when the object is closed or the process exits. Unless replay is False,
+		the previous run's reads are started in the background once the default time window is
+		known, shifted by the change in the end of the default time window
+		'''
+		accessLog = PrefetchPlanner.AccessLog(name, directory)
+		self.lock()
+		try :
+			self._accessLog = accessLog
+			self._accessLogReplay = bool(replay)
+		finally :
+			self.unlock()
+		atexit.register(accessLog.save)
+		self._replayAccessLog_()
+
+	@_timed
+	def disableAccessLog(self) :
+		'''
+		Write the access log and stop recording reads
+		'''
+		self.lock()
+		try :
+			accessLog = self._accessLog
+			self._accessLog = None
+		finally :
+			self.unlock()
+		if accessLog is not None : accessLog.save()
+
+	def _replayAccessLog_(self) :
+		'''
+		Start replaying the previous run's access log if it is enabled and the default time window is set
+		'''
+		accessLog = self._accessLog
+		if accessLog is not None and self._accessLogReplay and self._endTimeStr :
+			accessLog.replay(self, self._endTimeStr)
+
+	def _invalidateCache_(self, tsId, officeId=None) :
+		'''
+		Discard all cached windows of a time series after it is modified
+		'''
+		cache = self._tsCache
+		diskCache = self._diskCache
+		windowCache = self._windowCache
+		if cache is not None or diskCache is not None or windowCache is not None :
+			if officeId : officeId = officeId.upper()
+			else : officeId = self.getOfficeId()
+			if cache is not None : cache.invalidate(officeId, tsId)
+			if diskCache is not None : diskCache.invalidate((officeId, tsId.upper()))
+			if windowCache is not None : windowCache.invalidate((officeId, tsId.upper()))
+
+	@_counted
 	def isOpen(self):
 		'''
 		Return whether we can use the dbapi object
@@ -572,7 +1063,7 @@ def getConnection(self) :
 		'''
 		raise Exception("RADARAPI does not support getConnection")
 	
-	@_timed
+	@_counted
 	def getFileName(self) :
 		'''
 		Get the default start time string
@@ -581,7 +1072,7 @@ def getFileName(self) :
 		try     : return self._url
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def setTrimMissing(self, state) :
 		'''
 		Set the default time series trim state
@@ -590,7 +1081,7 @@ def setTrimMissing(self, state) :
 		try     : self._trim = bool(state)
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getTrimMissing(self) :
 		'''
 		Get the default time series trim state
@@ -599,7 +1090,7 @@ def getTrimMissing(self) :
 		try     : return self._trim
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getStartTime(self) :
 		'''
 		Get the default start time string
@@ -608,7 +1099,7 @@ def getStartTime(self) :
 		try     : return self._startTimeStr
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getEndTime(self) :
 		'''
 		Get the default start time string
@@ -617,7 +1108,7 @@ def getEndTime(self) :
 		try     : return self._endTimeStr
 		finally : self.unlock()
 
-	@_timed
+	@_counted
 	def setTimeZone(self, tz) :
 		'''
 		Set the default time zone
@@ -637,7 +1128,7 @@ def setTimeZone(self, tz) :
 		finally :
 			self.unlock()
 	
-	@_timed
+	@_counted
 	def getTimeZone(self) :
 		'''
 		Get the default time zone
@@ -646,7 +1137,7 @@ def getTimeZone(self) :
 		try     : return self._timeZone
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getTimeZoneName(self) :
 		'''
 		Get the default time zone
@@ -655,7 +1146,7 @@ def getTimeZoneName(self) :
 		try     : return self._timeZone.getID()
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def setStartTimeInclusive(self, state) :
 		'''
 		Set the default start time inclusive state
@@ -664,7 +1155,7 @@ def setStartTimeInclusive(self, state) :
 		try     : self._startTimeInclusive = bool(state)
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getStartTimeInclusive(self) :
 		'''
 		Get the default start time inclusive state
@@ -673,7 +1164,7 @@ def getStartTimeInclusive(self) :
 		try     : return self._startTimeInclusive
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def setEndTimeInclusive(self, state) :
 		'''
 		Set the default end time inclusive state
@@ -682,7 +1173,7 @@ def setEndTimeInclusive(self, state) :
 		try     : self._endTimeInclusive = bool(state)
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getEndTimeInclusive(self) :
 		'''
 		Get the default end time inclusive state
@@ -691,7 +1182,7 @@ def getEndTimeInclusive(self) :
 		try     : return self._endTimeInclusive
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def setRetrievePrevious(self, state) :
 		'''
 		Set the default time series get previous state
@@ -700,7 +1191,7 @@ def setRetrievePrevious(self, state) :
 		try     : self._getPrevious = bool(state)
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getRetrievePrevious(self, state) :
 		'''
 		Get the default time series get previous state
@@ -709,7 +1200,7 @@ def getRetrievePrevious(self, state) :
 		try     : return self._getPrevious
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def setRetrieveNext(self, state) :
 		'''
 		Set the default time series get next state
@@ -718,7 +1209,7 @@ def setRetrieveNext(self, state) :
 		try     : self._getNext = bool(state)
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getRetrieveNext(self) :
 		'''
 		Get the default time series get next state
@@ -727,7 +1218,7 @@ def getRetrieveNext(self) :
 		try     : return self._getNext
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def setRatingLoadMethod(self, loadMethodStr) :
 		'''
 		Sets the default rating load method.  Ignored in RADARAPI
@@ -737,13 +1228,34 @@ def setRatingLoadMethod(self, loadMethodStr) :
 		else :
 			raise ValueError('Invalid rating load method: "%s"' % loadMethodStr)
 	
-	@_timed
+	@_counted
 	def getRatingLoadMethod(self) :
 		'''
 		Gets the default rating load method. Ignored in RADARAPI
 		'''
 		return self._ratingLoadMethod
 
+	@_counted
+	def setBatchSize(self, batchSize) :
+		'''
+		Set the default number of time series retrieved per call by getTimeSeriesContainers
+		'''
+		batchSize = int(batchSize)
+		if batchSize < 1 :
+			raise ValueError("Batch size must be a positive integer")
+		self.lock()
+		try     : self._batchSize = batchSize
+		finally : self.unlock()
+
+	@_counted
+	def getBatchSize(self) :
+		'''
+		Get the default number of time series retrieved per call by getTimeSeriesContainers
+		'''
+		self.lock()
+		try     : return self._batchSize
+		finally : self.unlock()
+
 	@_timed
 	def setOfficeId(self, officeId):
 		'''
@@ -755,7 +1267,7 @@ def setOfficeId(self, officeId):
 		finally:
 			self.unlock()
 
-	@_timed
+	@_counted
 	def getOfficeId(self):
 		'''
 		Get the default office ID
@@ -773,7 +1285,7 @@ def setDefaultVerticalDatum(self, DefaultVertDatum) :
 		'''
 		raise Exception("setDefaultVerticalDatum not implemented in RADARAPI")
 	
-	@_timed
+	@_counted
 	def getDefaultVerticalDatum(self) :
 		'''
 		Retrieve the default vertical datum for elevations
@@ -788,38 +1300,234 @@ def getLocationVerticalDatum(self, locationId, officeId=None) :
 		raise Exception("getLocationVerticalDatum not implemented in RADARAPI")
 	
 	@_timed
-	def setVerticalDatumOffset(self, locationId, verticalDatumId1, verticalDatumId2, value, unit) :
+	def getLocations(self, locationIds, officeId=None, unitSystem=None, maxWorkers=WorkerPool.DEFAULT_MAX_WORKERS) :
 		'''
-		Set the offset from vertical datum id 1 to vertical datum id 2 at a location
+		Retrieve the records of many locations at once, as a dictionary keyed by location id of
+		dictionaries of location attributes, or None for unknown locations. Records are cached for
+		a day; locations not already retrieved are requested in parallel on up to maxWorkers
+		threads, since the location DAO retrieves one location per call. The elevation is
+		returned as the DAO reports it, whatever the unit system.
 		'''
-		raise Exception("setVerticalDatumOffset not implemented in RADARAPI")
+		if isinstance(locationIds, basestring) :
+			locationIds = [locationIds]
+		bootstrapLocations = self._bootstrapLocations
+		if bootstrapLocations and [id for id in locationIds if id.upper() in bootstrapLocations] :
+			self._awaitBootstrap_("locations")
+		self.lock()
+		try :
+			if officeId is None : officeId = self._officeId
+			if unitSystem is None : unitSystem = self._unitSystem
+			locationCache = self._locationCache
+		finally :
+			self.unlock()
+		officeId = officeId.upper()
+		unitSystem = unitSystem[:2].upper()
+		return locationCache.getLocations(
+			officeId,
+			unitSystem,
+			locationIds,
+			lambda ids : self._retrieveLocations_(ids, officeId, maxWorkers))
 	
 	@_timed
-	def getVerticalDatumOffset1(self, locationId, verticalDatumId1, verticalDatumId2, unit, officeId=None) :
+	def getLocation(self, locationId, officeId=None, unitSystem=None) :
 		'''
-		Retrieve the offset from vertical datum id 1 to vertical datum id 2 at a location
+		Retrieve the record of one location (see getLocations), or None if it is unknown
 		'''
-		raise Exception("getVerticalDatumOffset1 not implemented in RADARAPI")
+		return self.getLocations([locationId], officeId, unitSystem)[locationId]
+	
+	@_counted
+	def clearLocationCache(self) :
+		'''
+		Discard the cached location records
+		'''
+		self._locationCache.clear()
 	
 	@_timed
-	def getVerticalDatumOffset2(self, locationId, unit=None, officeId=None) :
+	def _retrieveLocations_(self, locationIds, officeId, maxWorkers) :
 		'''
-		Retrieve the offset from the location's identified vertical datum to the default
-		vertical datum or datum specified in the unit spec (if any)
+		Return a dictionary of location records keyed by upper-case location id and a set of the
+		upper-case ids whose retrieval failed
 		'''
-		raise Exception("getVerticalDatumOffset2 not implemented in RADARAPI")
+		pool = WorkerPool.WorkerPool(min(int(maxWorkers), len(locationIds)), "getLocations")
+		try :
+			futures = [pool.submit(self._retrieveLocation_, id, officeId) for id in locationIds]
+			results = WorkerPool.waitAll(futures)
+		finally :
+			pool.shutdown(False)
+		records, failed = {}, set()
+		for id, result in zip(locationIds, results) :
+			if isinstance(result, dict) :
+				records[id.upper()] = result
+			elif result is not None and not DBAPI.isNotFoundError(result) :
+				logger.warning("Error retrieving location %s: %s" % (id, result))
+				failed.add(id.upper())
+		return records, failed
 	
 	@_timed
-	def getVerticalDatumOffset(self, *args, **kwargs) :
+	def _retrieveLocation_(self, locationId, officeId) :
 		'''
-		Forwarder to getVerticalDatumOffset1 or getVerticalDatumOffset2
+		Retrieve one location through the location DAO and return its record, or None
 		'''
-		argCount = len(args)
-		kwargCount = len(kwargs)
-		totArgCount = argCount + kwargCount
-		if totArgCount not in (2, 4) :
-			raise Exception('getVerticalDatumOffset expects 2 or 4 arguments, received %d' % totArgCount)
-		locationId       = None
+		dak = self._factory.getDataAccessKey("retrieveLocation")
+		try :
+			location_dao = CwmsDaoServiceLookup.getDao(CwmsLocationDao, self._factory.getDbConnection())
+			location = location_dao.retrieveLocation(dak, LocationTemplate(officeId, locationId))
+		finally :
+			dak.close()
+		if location is None :
+			return None
+		def attribute(getter) :
+			#---------------------------------------------------------#
+			# not every location implementation provides every getter #
+			#---------------------------------------------------------#
+			try    : return getattr(location, getter)()
+			except : return None
+		elevation = attribute("getElevation")
+		try    : elevation = float(elevation)
+		except : pass
+		return {
+			"locationId"      : locationId,
+			"officeId"        : officeId,
+			"publicName"      : attribute("getPublicName"),
+			"longName"        : attribute("getLongName"),
+			"description"     : attribute("getDescription"),
+			"elevation"       : elevation,
+			"elevationUnits"  : None,
+			"verticalDatum"   : attribute("getVerticalDatum"),
+			"latitude"        : attribute("getLatitude"),
+			"longitude"       : attribute("getLongitude"),
+			"horizontalDatum" : attribute("getHorizontalDatum"),
+			"timeZone"        : attribute("getTimeZoneName"),
+			"locationKind"    : attribute("getLocationKind"),
+			"nearestCity"     : attribute("getNearestCity"),
+			"active"          : attribute("isActive")}
+	
+	@_timed
+	def getLocationLevels(self, levelIds, atTime=None, units=None, officeId=None, timeZone=None, maxWorkers=WorkerPool.DEFAULT_MAX_WORKERS) :
+		'''
+		Retrieve the values of many location levels at a time (default now), as a dictionary
+		keyed by level id, or None for unknown levels. Values are cached by effective date, so
+		each level is requested at most once per day; levels not already retrieved are
+		requested in parallel on up to maxWorkers threads, since the level DAO retrieves one
+		level per call.
+		'''
+		if isinstance(levelIds, basestring) :
+			levelIds = [levelIds]
+		self.lock()
+		try :
+			if officeId is None : officeId = self._officeId
+			timeZone = (TimeZone.getTimeZone(timeZone), self._timeZone)[timeZone is None]
+			levelCache = self._levelCache
+		finally :
+			self.unlock()
+		officeId = officeId.upper()
+		if atTime :
+			atDate = Date(RMAIO.parseDate(atTime.replace(":", "").replace(",", ""), timeZone))
+		else :
+			atDate = Date()
+		sdf = SimpleDateFormat("yyyy/MM/dd")
+		sdf.setTimeZone(timeZone)
+		levelUnits = []
+		for levelId in levelIds :
+			if isinstance(units, dict) :
+				levelUnit = units.get(levelId)
+			else :
+				levelUnit = units
+			if not levelUnit :
+				levelUnit = self.unitsForParameter(levelId.split('.')[1])
+			levelUnits.append((levelId, levelUnit))
+		return levelCache.getLevels(
+			officeId,
+			levelUnits,
+			"%s %s" % (sdf.format(atDate), timeZone.getID()),
+			lambda pairs : self._retrieveLocationLevels_(pairs, atDate, officeId, maxWorkers))
+	
+	@_timed
+	def getLocationLevel(self, levelId, atTime=None, units=None, officeId=None, timeZone=None) :
+		'''
+		Retrieve the value of one location level (see getLocationLevels), or None if it is unknown
+		'''
+		return self.getLocationLevels([levelId], atTime, units, officeId, timeZone)[levelId]
+	
+	@_counted
+	def clearLocationLevelCache(self) :
+		'''
+		Discard the cached location level values
+		'''
+		self._levelCache.clear()
+	
+	@_timed
+	def _retrieveLocationLevels_(self, levelUnits, atDate, officeId, maxWorkers) :
+		'''
+		Return a dictionary of location level values keyed by upper-case level id and a set of
+		the upper-case level ids whose retrieval failed
+		'''
+		pool = WorkerPool.WorkerPool(min(int(maxWorkers), len(levelUnits)), "getLocationLevels")
+		try :
+			futures = [pool.submit(self._retrieveLocationLevel_, levelId, units, atDate, officeId) for levelId, units in levelUnits]
+			results = WorkerPool.waitAll(futures)
+		finally :
+			pool.shutdown(False)
+		values, failed = {}, set()
+		for (levelId, units), result in zip(levelUnits, results) :
+			if isinstance(result, float) :
+				values[levelId.upper()] = result
+			elif result is not None and not DBAPI.isNotFoundError(result) :
+				logger.warning("Error retrieving location level %s: %s" % (levelId, result))
+				failed.add(levelId.upper())
+		return values, failed
+	
+	@_timed
+	def _retrieveLocationLevel_(self, levelId, units, atDate, officeId) :
+		'''
+		Retrieve one location level value through the level DAO, or None
+		'''
+		dak = self._factory.getDataAccessKey("retrieveLocationLevel")
+		try :
+			level_dao = CwmsDaoServiceLookup.getDao(CwmsLevelDao, self._factory.getDbConnection())
+			level = level_dao.retrieveLocationLevel(dak, JDomLocationLevelImpl(officeId, levelId, atDate, units, None, None, None))
+		finally :
+			dak.close()
+		if level is None :
+			return None
+		try :
+			return float(level.getConstantValue())
+		except :
+			return float(level)
+	
+	@_timed
+	def setVerticalDatumOffset(self, locationId, verticalDatumId1, verticalDatumId2, value, unit) :
+		'''
+		Set the offset from vertical datum id 1 to vertical datum id 2 at a location
+		'''
+		raise Exception("setVerticalDatumOffset not implemented in RADARAPI")
+	
+	@_timed
+	def getVerticalDatumOffset1(self, locationId, verticalDatumId1, verticalDatumId2, unit, officeId=None) :
+		'''
+		Retrieve the offset from vertical datum id 1 to vertical datum id 2 at a location
+		'''
+		raise Exception("getVerticalDatumOffset1 not implemented in RADARAPI")
+	
+	@_timed
+	def getVerticalDatumOffset2(self, locationId, unit=None, officeId=None) :
+		'''
+		Retrieve the offset from the location's identified vertical datum to the default
+		vertical datum or datum specified in the unit spec (if any)
+		'''
+		raise Exception("getVerticalDatumOffset2 not implemented in RADARAPI")
+	
+	@_timed
+	def getVerticalDatumOffset(self, *args, **kwargs) :
+		'''
+		Forwarder to getVerticalDatumOffset1 or getVerticalDatumOffset2
+		'''
+		argCount = len(args)
+		kwargCount = len(kwargs)
+		totArgCount = argCount + kwargCount
+		if totArgCount not in (2, 4) :
+			raise Exception('getVerticalDatumOffset expects 2 or 4 arguments, received %d' % totArgCount)
+		locationId       = None
 		unit             = None
 		verticalDatumId1 = None
 		verticalDatumId2 = None
@@ -891,7 +1599,7 @@ def canWrite(self) :
 		finally:
 			self.unlock()
 	
-	@_timed
+	@_counted
 	def setRetrieveMaxVersionDate(self, state) :
 		'''
 		Set the default time series get max version state
@@ -900,7 +1608,7 @@ def setRetrieveMaxVersionDate(self, state) :
 		try     : self._maxVersion = bool(state)
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getRetrieveMaxVersionDate(self, state) :
 		'''
 		Get the default time series get max version state
@@ -917,9 +1625,10 @@ def setVersionDate(self, dateStr=None):
 		self.lock()
 		try:
 			if dateStr and not isNonVersioned(dateStr):
-				self._hts.set(dateStr)
-				self._sdfDATE.setTimeZone(self._utcTimeZone)
-				self._versionDate = self._sdfDATE.format(self._hts.getTimeInMillis())
+				state = self._threadState_()
+				state.hts.set(dateStr)
+				state.sdfDATE.setTimeZone(self._utcTimeZone)
+				self._versionDate = state.sdfDATE.format(state.hts.getTimeInMillis())
 			else:
 				self._versionDate = dateStr
 		finally:
@@ -939,7 +1648,7 @@ def unsetVersionDate(self):
 		'''
 		self.resetVersionDate()
 
-	@_timed
+	@_counted
 	def getVersionDate(self):
 		'''
 		Get the default time series version date
@@ -965,8 +1674,10 @@ def setTimeWindow(self, *args):
 			self._startTime.showTimeAsBeginningOfDay(True)
 			self._startTimeStr = self._startTime.dateAndTime(4)
 			self._endTimeStr = self._endTime.dateAndTime(4)
+			if self._isOpen:
+				self._replayAccessLog_()
 
-	@_timed
+	@_counted
 	def getTimeWindow(self):
 		'''
 		Get the default time window for future database accesses.
@@ -977,7 +1688,7 @@ def getTimeWindow(self):
 		finally:
 			self.unlock()
 	
-	@_timed
+	@_counted
 	def setOverrideProtection(self, state):
 		'''
 		Set the default override protection version state
@@ -988,7 +1699,7 @@ def setOverrideProtection(self, state):
 		finally:
 			self.unlock()
 	
-	@_timed
+	@_counted
 	def getOverrideProtection(self) :
 		'''
 		Get the default override protection version state
@@ -997,7 +1708,7 @@ def getOverrideProtection(self) :
 		try     : return self._overrideProtection
 		finally : self.unlock()
 
-	@_timed
+	@_counted
 	def setUnitSystem(self, system):
 		'''
 		Set the working units system to SI or English, used for reads only.
@@ -1013,7 +1724,7 @@ def setUnitSystem(self, system):
 		finally:
 			self.unlock()
 
-	@_timed
+	@_counted
 	def getUnitSystem(self):
 		'''
 		Get the working units system to SI or English, used for reads only.
@@ -1024,7 +1735,7 @@ def getUnitSystem(self):
 		finally:
 			self.unlock()
 	
-	@_timed
+	@_counted
 	def setStoreRule(self, storeRule) :
 		'''
 		Sets the default store rule, used for writes only.
@@ -1033,7 +1744,7 @@ def setStoreRule(self, storeRule) :
 		try     : self._storeRule = storeRule
 		finally : self.unlock()
 	
-	@_timed
+	@_counted
 	def getStoreRule(self) :
 		'''
 		Gets the default store rule, used for writes only.
@@ -1041,6 +1752,25 @@ def getStoreRule(self) :
 		self.lock()
 		try     : return self._storeRule
 		finally : self.unlock()
+	
+	@_counted
+	def setStoreChangedOnly(self, state) :
+		'''
+		Sets whether time series writes first read the stored values and send only the span of
+		values that the store rule would change.
+		'''
+		self.lock()
+		try     : self._storeChangedOnly = bool(state)
+		finally : self.unlock()
+	
+	@_counted
+	def getStoreChangedOnly(self) :
+		'''
+		Gets whether time series writes send only the span of values the store rule would change.
+		'''
+		self.lock()
+		try     : return self._storeChangedOnly
+		finally : self.unlock()
 
 	@_timed
 	def commit(self) :
@@ -1055,6 +1785,12 @@ def close(self):
 		'''
 		Release any resources and make this object unusable.
 		'''
+		#-------------------------------------------------------------#
+		# stop the replay before locking, its reads may need the lock #
+		#-------------------------------------------------------------#
+		accessLog = self._accessLog
+		if accessLog is not None:
+			accessLog.stopReplay()
 		self.lock()
 		try:
 			remove_connection = True
@@ -1065,6 +1801,8 @@ def close(self):
 				self._connectionInfo = None
 				self._factory = None
 		
+			if self._accessLog is not None:
+				self._accessLog.save()
 			self._initValues_()
 		finally:
 			self.unlock()
@@ -1138,6 +1876,7 @@ def deleteRatings(self, ratingIds) :
 					raise Exception("Failed to delete rating specification", e)
 		finally :
 			self.unlock()
+			self._updateCatalog_("rating")
 		
 	@_timed
 	def deleteTimeSeries(self, tsId) :
@@ -1161,13 +1900,15 @@ def deleteTimeSeries(self, tsId) :
 			ts_dao.deleteTimeSeriesIdentifier(dak,  time_series_identifier)
 		except DbIoException as e:
 			raise Exception("Failed to delete timeseries", e)
+		self._invalidateCache_(tsId, officeId)
+		self._updateCatalog_("ts", tsId, False)
 	
 	@_timed
 	def refreshTsCatalog(self) :
 		'''
-		No-op retained for backward compatibility. Not needed in current schema
+		Discard the time series catalog snapshot so the next catalog call reloads it
 		'''
-		pass
+		self._updateCatalog_("ts")
 
 	@_timed
 	def done(self) :
@@ -1186,186 +1927,1019 @@ def __del__(self) :
 			# This can be called after the JVM shuts down under JPype
 			pass
 
+	def _resolveTimeSeriesRequest_(
+			self,
+			tsId,
+			startTimeStr = None,
+			endTimeStr = None,
+			units = None,
+			timeZone = None,
+			trim = None,
+			startInclusive = None,
+			endInclusive = None,
+			getPrevious = None,
+			getNext = None,
+			versionDate = None,
+			maxVersion = None,
+			officeId = None) :
+		'''
+		Resolve time series retrieval arguments against the object defaults.
+		'''
+		self.lock()
+		try:
+			if (not startTimeStr) != (not endTimeStr):
+				raise ValueError("Start time and end time must be specified together")
+			if not startTimeStr:
+				startTimeStr = self._startTimeStr
+			if not endTimeStr:
+				endTimeStr = self._endTimeStr
+			if not startTimeStr or not endTimeStr:
+				raise ValueError("No default or explicit time window")
+			if not units:
+				unitSystem = self._unitSystem[:2].upper()
+				tsParts = tsId.split(".")
+				parameter = None
+				if tsParts and len(tsParts) > 1:
+					parameter = tsParts[1]
+
+				if parameter:
+					parameter_units = self._getParameterUnits_()
+					if parameter_units and unitSystem in parameter_units:
+						parameters_in_units = parameter_units[unitSystem]
+						if parameter in parameters_in_units:
+							units = parameters_in_units[parameter]
+						else:
+							logger.warning("Parameter %s not found in units %s." % (parameter, unitSystem))
+					else:
+						logger.warning("Parameter units not found for unit system %s." % unitSystem)
+			if timeZone is not None:
+				timeZone = TimeZone.getTimeZone(timeZone)
+			else:
+				timeZone = self._timeZone
+			if trim is not None:
+				trim = bool(trim)
+			else:
+				trim = self._trim
+			if startInclusive is not None:
+				startTimeInclusive = bool(startInclusive)
+			else:
+				startTimeInclusive = self._startTimeInclusive
+			if endInclusive is not None:
+				endTimeInclusive = bool(endInclusive)
+			else:
+				endTimeInclusive = self._endTimeInclusive
+			if getPrevious is not None:
+				getPrevious = bool(getPrevious)
+			else:
+				getPrevious = self._getPrevious
+			if getNext is not None:
+				getNext = bool(getNext)
+			else:
+				getNext = self._getNext
+			if versionDate is None:
+				versionTimeStr = self._versionDate
+			else:
+				versionTimeStr = versionDate
+			if maxVersion is not None:
+				maxVersion = bool(maxVersion)
+			else:
+				maxVersion = self._maxVersion
+			if officeId is not None:
+				officeId = officeId.upper()
+			else:
+				officeId = self.getOfficeId()
+			startTimeStr = startTimeStr.replace(":", "").replace(",", "")
+			endTimeStr = endTimeStr.replace(":", "").replace(",", "")
+
+			return {
+				"tsId"               : tsId,
+				"units"              : units,
+				"timeZone"           : timeZone,
+				"trim"               : trim,
+				"startTimeInclusive" : startTimeInclusive,
+				"endTimeInclusive"   : endTimeInclusive,
+				"getPrevious"        : getPrevious,
+				"getNext"            : getNext,
+				"versionTimeStr"     : versionTimeStr,
+				"maxVersion"         : maxVersion,
+				"officeId"           : officeId,
+				"startTime"          : Date(RMAIO.parseDate(startTimeStr, self._utcTimeZone)).getTime(),
+				"endTime"            : Date(RMAIO.parseDate(endTimeStr, self._utcTimeZone)).getTime(),
+			}
+		finally:
+			self.unlock()
+
+	def _buildTimeSeriesTemplate_(self, request) :
+		'''
+		Build the TimeSeriesTemplate for a resolved time series request.
+		'''
+		locationIdTz = request["timeZone"].toZoneId()
+		if IS_CPYTHON:
+			ts_id = TimeSeriesIdentifierFactory.from_(OfficeId(request["officeId"]), request["tsId"], locationIdTz)
+		else:
+			ts_id = getattr(TimeSeriesIdentifierFactory, "from")(OfficeId(request["officeId"]), request["tsId"], locationIdTz)
+		return TimeSeriesTemplate(ts_id, request["startTime"], request["endTime"], Units(request["units"]))
+
+	@_timed
+	def _retrieveTimeSeriesMap_(self, dak, ts_templates, request) :
+		'''
+		Retrieve a list of TimeSeriesTemplates in one CwmsTimeSeriesDao call. All templates share
+		the retrieval flags of the resolved request.
+		'''
+		db_conn = self._factory.getDbConnection()
+		ts_dao = CwmsDaoServiceLookup.getDao(CwmsTimeSeriesDao, db_conn)
+
+		ht = HecTime(HecTime.SECOND_INCREMENT)
+		ht.set(request["versionTimeStr"])
+		if IS_CPYTHON:
+			versionTimestamp = Timestamp.from_(ht.getInstant(ZoneId.of("UTC")))
+		else:
+			versionTimestamp = getattr(Timestamp, "from")(ht.getInstant(ZoneId.of("UTC")))
+
+		startTimeInclusive = request["startTimeInclusive"]
+		endTimeInclusive = request["endTimeInclusive"]
+		getPrevious = request["getPrevious"]
+		getNext = request["getNext"]
+		maxVersion = request["maxVersion"]
+		trim = request["trim"]
+
+		# time_series_map is like: Map<TimeSeriesTemplate, TimeSeries>
+		logger.debug("Calling CwmsTimeSeriesDao.retrieveTimeSeries with: dak: {}, "
+		             "ts_templates: {}, startTimeInclusive: {}, endTimeInclusive: {}, "
+		             "getPrevious: {}, getNext: {}, versionTimestamp: {}, "
+		             "maxVersion: {}, trim: {}"
+		             .format(dak, ts_templates, startTimeInclusive, endTimeInclusive,
+		                     getPrevious, getNext, versionTimestamp, maxVersion, trim))
+		time_series_map = ts_dao.retrieveTimeSeries(dak, ts_templates, startTimeInclusive,
+		        endTimeInclusive, getPrevious, getNext, versionTimestamp, maxVersion, trim)
+		if time_series_map is None:
+			logger.warning("No time series found for ts_templates: {}, startTimeInclusive: {}, "
+			            "endTimeInclusive: {}, getPrevious: {}, getNext: {}, "
+			            "versionTimestamp: {}, maxVersion: {}, trim: {}"
+			            .format(ts_templates, startTimeInclusive, endTimeInclusive,
+			                    getPrevious, getNext, versionTimestamp, maxVersion, trim))
+		return time_series_map
+
+	def _toTimeSeriesContainer_(self, time_series, timeZone) :
+		'''
+		Convert a retrieved TimeSeries into a TimeSeriesContainer in the requested time zone.
+		'''
+		dstx = DataSetTx(time_series)
+		tsc = dstx.getTimeSeriesContainer()
+		fromTimezone = TimeZone.getTimeZone(tsc.timeZoneID)
+
+		if not timeZone.equals(fromTimezone):
+			logger.warning("Converting time zone from %s to %s" % (fromTimezone.getID(), timeZone.getID()))
+			tsc.convertTimeZone(timeZone)
+		return tsc
+
+	def _isDiskCacheable_(self, request) :
+		'''
+		Return whether a resolved request can be served through the window and disk caches. Reads
+		that include the previous or next value, and elevations (which carry vertical datum
+		information), are not
+		'''
+		if request["getPrevious"] or request["getNext"]:
+			return False
+		return not request["tsId"].split(".")[1].upper().startswith("ELEV")
+
+	def _expectWindows_(self, windows) :
+		'''
+		Announce a list of (tsId, startTimeStr, endTimeStr, units) windows that are about to be
+		read, so that overlapping reads of the same series are retrieved together
+		'''
+		windowCache = self._windowCache
+		if windowCache is None:
+			return
+		for tsId, startTimeStr, endTimeStr, units in windows:
+			try:
+				request = self._resolveTimeSeriesRequest_(tsId, startTimeStr, endTimeStr, units)
+			except:
+				#---------------------------------------#
+				# the read itself will report the error #
+				#---------------------------------------#
+				continue
+			if self._isDiskCacheable_(request):
+				windowCache.expect(DataCache.diskSeriesKey(request), request["startTime"], request["endTime"])
+
+	def _intervalRequest_(self, request, start, end) :
+		'''
+		Return the request for the untrimmed values of a resolved request over the closed UTC
+		interval [start, end], as retrieved for the window and disk caches
+		'''
+		intervalRequest = dict(request)
+		intervalRequest.update({
+			"timeZone"           : self._utcTimeZone,
+			"startTime"          : start,
+			"endTime"            : end,
+			"trim"               : False,
+			"startTimeInclusive" : True,
+			"endTimeInclusive"   : True,
+			"getPrevious"        : False,
+			"getNext"            : False})
+		return intervalRequest
+
+	def _toPoints_(self, time_series) :
+		'''
+		Convert a TimeSeries retrieved for an interval request into the (times, values, qualities,
+		vertDatumInfo) points kept by the window and disk caches
+		'''
+		tsc = self._toTimeSeriesContainer_(time_series, self._utcTimeZone)
+		qualities = tsc.quality
+		if qualities is None:
+			qualities = [0] * tsc.numberValues
+		return DBAPI.getTimesInMillis(tsc), list(tsc.values), list(qualities), None
+
+	def _getCachedTimeSeriesContainer_(self, request, fetched=None) :
+		'''
+		Read a time-series for a resolved request through the window and disk caches, retrieving
+		only the periods that are not already cached. fetched may hold the points of periods that
+		were already retrieved, or the exception raised retrieving them, keyed by (start, end) UTC
+		interval
+		'''
+		windowCache = self._windowCache
+		diskCache = self._diskCache
+
+		def fetch(start, end):
+			if fetched is not None and (start, end) in fetched:
+				points = fetched[(start, end)]
+				if isinstance(points, tuple) or points is None:
+					return points
+				raise points
+			fetchRequest = self._intervalRequest_(request, start, end)
+			ts_template = self._buildTimeSeriesTemplate_(fetchRequest)
+			dak = self._factory.getDataAccessKey("getTimeSeriesContainer")
+			try:
+				time_series_map = self._retrieveTimeSeriesMap_(dak, Collections.singletonList(ts_template), fetchRequest)
+			finally:
+				dak.close()
+			time_series = None
+			if time_series_map is not None:
+				time_series = time_series_map.get(ts_template)
+			if time_series is None:
+				return None
+			return self._toPoints_(time_series)
+
+		startTime, endTime = request["startTime"], request["endTime"]
+		seriesKey = DataCache.diskSeriesKey(request)
+		if diskCache is not None:
+			fetchFromServer = fetch
+			fetch = lambda start, end : diskCache.getPoints(seriesKey, start, end, fetchFromServer)
+		try:
+			if windowCache is not None:
+				points = windowCache.getPoints(seriesKey, startTime, endTime, fetch)
+			else:
+				points = fetch(startTime, endTime)
+		except DbIoException as e:
+			self._threadLocal.notFound = DBAPI.isNotFoundError(e)
+			logger.exception("Error getting TimeSeriesContainer")
+			return None
+		except Exception as e:
+			self._threadLocal.notFound = DBAPI.isNotFoundError(e)
+			logger.exception ('Undefined error')
+			return None
+		if points is None:
+			self._threadLocal.notFound = True
+			logger.warning("TimeSeries %s not found" % request["tsId"])
+			return None
+		times, values, qualities, vertDatumInfo = points
+		times, values, qualities = DataCache.selectPoints(
+			times,
+			values,
+			qualities,
+			startTime,
+			endTime,
+			request["startTimeInclusive"],
+			request["endTimeInclusive"],
+			request["trim"],
+			isUndefined)
+		return DBAPI.makeTimeSeriesContainer(
+			request["tsId"],
+			times,
+			values,
+			qualities,
+			request["units"],
+			request["timeZone"],
+			startTime,
+			endTime)
+
+	@_timed
+	def getTimeSeriesContainer(
+			self,
+			tsId,
+			startTimeStr = None,
+			endTimeStr = None,
+			units = None,
+			timeZone = None,
+			trim = None,
+			startInclusive = None,
+			endInclusive = None,
+			getPrevious = None,
+			getNext = None,
+			versionDate = None,
+			maxVersion = None,
+			officeId = None) :
+		'''
+		Read a time-series from the database and return it in a TimeSeriesContainer object.
+		'''
+
+		#----------------------------#
+		# get data from the database #
+		#----------------------------#
+		tsc = None
+		locked = self._readLock_()
+		try:
+			#----------------------#
+			# handle the arguments #
+			#----------------------#
+			request = self._resolveTimeSeriesRequest_(
+				tsId,
+				startTimeStr,
+				endTimeStr,
+				units,
+				timeZone,
+				trim,
+				startInclusive,
+				endInclusive,
+				getPrevious,
+				getNext,
+				versionDate,
+				maxVersion,
+				officeId)
+			accessLog = self._accessLog
+			if accessLog is not None:
+				accessLog.record(request, self._endTimeStr)
+
+			cache = self._tsCache
+			if cache is not None:
+				key = DataCache.timeSeriesKey(request)
+				tsc = cache.get(key)
+				if tsc is not None:
+					return tsc
+
+			if (self._windowCache is not None or self._diskCache is not None) and self._isDiskCacheable_(request):
+				tsc = self._getCachedTimeSeriesContainer_(request)
+				if tsc is not None and cache is not None:
+					cache.put(key, tsc)
+				return tsc
+
+			tsc = self._retrieveTimeSeriesContainer_(request)
+			if tsc is not None and cache is not None:
+				cache.put(key, tsc)
+		except DataSetIllegalArgumentException as e:
+			raise Exception("Illegal Argument", e)
+		finally:
+			self._readUnlock_(locked)
+
+		return tsc
+
+	def _retrieveTimeSeriesContainer_(self, request) :
+		'''
+		Read a time-series from the server for a resolved request, bypassing the caches
+		'''
+		tsc = None
+		ts_template = self._buildTimeSeriesTemplate_(request)
+
+		dak = self._factory.getDataAccessKey("getTimeSeriesContainer")
+		try:
+			ts_templates = Collections.singletonList(ts_template)
+
+			time_series = None
+			time_series_map = self._retrieveTimeSeriesMap_(dak, ts_templates, request)
+			if time_series_map is not None:
+				time_series = time_series_map.get(ts_template)
+				if time_series is None:
+					logger.warning("TimeSeries for ts_template: {} not found in time_series_map: {}"
+					            .format(ts_template, time_series_map))
+
+			if time_series is not None:
+				tsc = self._toTimeSeriesContainer_(time_series, request["timeZone"])
+			else:
+				self._threadLocal.notFound = True
+
+		except DbIoException as e:
+			self._threadLocal.notFound = DBAPI.isNotFoundError(e)
+			logger.exception("Error getting TimeSeriesContainer")
+		except Exception as e:
+			self._threadLocal.notFound = DBAPI.isNotFoundError(e)
+			logger.exception ('Undefined error')
+# 			traceback.print_exc(e)
+		finally:
+			dak.close()
+		return tsc
+
+	@_counted
+	def iterTimeSeries(
+			self,
+			tsId,
+			startTimeStr = None,
+			endTimeStr = None,
+			chunkDays = DBAPI.DEFAULT_CHUNK_DAYS,
+			units = None,
+			timeZone = None,
+			startInclusive = None,
+			endInclusive = None,
+			versionDate = None,
+			maxVersion = None,
+			officeId = None,
+			prefetch = DBAPI.DEFAULT_PREFETCH_CHUNKS) :
+		'''
+		Read a long time window of a time-series in chunks of chunkDays days, returning a generator
+		of one TimeSeriesContainer per chunk in time order. Chunks are retrieved in the background,
+		up to prefetch at a time, and are neither trimmed nor cached
+		'''
+		request = self._resolveTimeSeriesRequest_(
+			tsId,
+			startTimeStr,
+			endTimeStr,
+			units,
+			timeZone,
+			False,
+			startInclusive,
+			endInclusive,
+			False,
+			False,
+			versionDate,
+			maxVersion,
+			officeId)
+		return DBAPI.iterTimeSeriesChunks(self, request, chunkDays, prefetch, self._retrieveTimeSeriesContainer_)
+
+	@_timed
+	def getTimeSeriesContainers(
+			self,
+			tsIds,
+			startTimeStr = None,
+			endTimeStr = None,
+			units = None,
+			timeZone = None,
+			trim = None,
+			startInclusive = None,
+			endInclusive = None,
+			getPrevious = None,
+			getNext = None,
+			versionDate = None,
+			maxVersion = None,
+			officeId = None,
+			batchSize = None) :
+		'''
+		Read many time-series from the database, sending up to batchSize TimeSeriesTemplates in
+		each CwmsTimeSeriesDao call. When the window or disk cache is enabled, only the periods of
+		each series that are not cached are retrieved. Returns a dictionary of TimeSeriesContainer
+		objects keyed by time series id; ids that could not be retrieved map to None.
+
+		The units parameter may be None (default units for each parameter), a single unit string
+		applied to every id, or a dictionary of units keyed by time series id.
+		'''
+		if isinstance(tsIds, basestring) :
+			tsIds = [tsIds]
+		if batchSize is None :
+			batchSize = self.getBatchSize()
+		batchSize = int(batchSize)
+		if batchSize < 1 :
+			raise ValueError("Batch size must be a positive integer")
+
+		#-----------------------------------------#
+		# remove duplicate ids, keeping the order #
+		#-----------------------------------------#
+		uniqueIds = []
+		for tsId in tsIds :
+			if tsId not in uniqueIds :
+				uniqueIds.append(tsId)
+		results = dict([(tsId, None) for tsId in uniqueIds])
+
+		locked = self._readLock_()
+		try:
+			#----------------------#
+			# handle the arguments #
+			#----------------------#
+			cache = self._tsCache
+			windowCache = self._windowCache
+			diskCache = self._diskCache
+			accessLog = self._accessLog
+			requests = []
+			cachedRequests = []
+			for tsId in uniqueIds :
+				if isinstance(units, dict) :
+					tsUnits = units.get(tsId)
+				else :
+					tsUnits = units
+				request = self._resolveTimeSeriesRequest_(
+					tsId,
+					startTimeStr,
+					endTimeStr,
+					tsUnits,
+					timeZone,
+					trim,
+					startInclusive,
+					endInclusive,
+					getPrevious,
+					getNext,
+					versionDate,
+					maxVersion,
+					officeId)
+				if accessLog is not None :
+					accessLog.record(request, self._endTimeStr)
+				if cache is not None :
+					tsc = cache.get(DataCache.timeSeriesKey(request))
+					if tsc is not None :
+						results[tsId] = tsc
+						continue
+				if (windowCache is not None or diskCache is not None) and self._isDiskCacheable_(request):
+					try:
+						gaps = DataCache.uncachedIntervals(windowCache, diskCache, DataCache.diskSeriesKey(request), request["startTime"], request["endTime"])
+					except Exception as e:
+						logger.exception("Error getting TimeSeriesContainer %s" % tsId)
+						continue
+					cachedRequests.append((tsId, request, gaps))
+					continue
+				try:
+					requests.append((request, self._buildTimeSeriesTemplate_(request)))
+				except DataSetIllegalArgumentException as e:
+					logger.error("Illegal time series identifier %s: %s" % (tsId, e))
+
+			#------------------------------------#
+			# retrieve the templates in batches  #
+			#------------------------------------#
+			for i in range(0, len(requests), batchSize) :
+				batch = requests[i:i+batchSize]
+				ts_templates = ArrayList()
+				for request, ts_template in batch :
+					ts_templates.add(ts_template)
+
+				failed = False
+				dak = self._factory.getDataAccessKey("getTimeSeriesContainers")
+				try:
+					time_series_map = self._retrieveTimeSeriesMap_(dak, ts_templates, batch[0][0])
+					if time_series_map is None:
+						continue
+					for request, ts_template in batch :
+						time_series = time_series_map.get(ts_template)
+						if time_series is None:
+							logger.warning("TimeSeries for %s not found in batch results" % request["tsId"])
+						else:
+							tsc = self._toTimeSeriesContainer_(time_series, request["timeZone"])
+							if cache is not None :
+								cache.put(DataCache.timeSeriesKey(request), tsc)
+							results[request["tsId"]] = tsc
+				except DbIoException as e:
+					logger.exception("Error getting TimeSeriesContainers")
+					failed = True
+				except Exception as e:
+					logger.exception ('Undefined error')
+					failed = True
+				finally:
+					dak.close()
+				if failed and len(batch) > 1:
+					#------------------------------------------------------#
+					# one id that does not exist fails the whole batch, so #
+					# read the templates of the batch one at a time        #
+					#------------------------------------------------------#
+					for request, ts_template in batch :
+						if results[request["tsId"]] is not None:
+							continue
+						tsc = self._retrieveTimeSeriesContainer_(request)
+						if tsc is not None:
+							if cache is not None :
+								cache.put(DataCache.timeSeriesKey(request), tsc)
+							results[request["tsId"]] = tsc
+
+			#-------------------------------------------------------#
+			# retrieve the uncached periods of all cacheable series #
+			# in batches, then read each series through the caches  #
+			#-------------------------------------------------------#
+			fetched = self._retrieveUncachedIntervals_(cachedRequests, batchSize)
+			for (tsId, request, gaps), points in zip(cachedRequests, fetched) :
+				tsc = self._getCachedTimeSeriesContainer_(request, points)
+				if tsc is not None :
+					if cache is not None :
+						cache.put(DataCache.timeSeriesKey(request), tsc)
+					results[tsId] = tsc
+		finally:
+			self._readUnlock_(locked)
+
+		return results
+
+	def _retrieveUncachedIntervals_(self, cachedRequests, batchSize) :
+		'''
+		Retrieve the uncached intervals of a list of (tsId, request, intervals) with up to batchSize
+		TimeSeriesTemplates per CwmsTimeSeriesDao call. Returns a dictionary for each item of the
+		(times, values, qualities, vertDatumInfo) points keyed by (start, end) UTC interval, with
+		None for intervals of series that were not found and the exception raised for intervals
+		that could not be retrieved
+		'''
+		fetched = [{} for item in cachedRequests]
+		#-------------------------------------------------------#
+		# the n-th intervals of all series go in the same round #
+		# so that each series appears only once per call        #
+		#-------------------------------------------------------#
+		rounds = []
+		for index, (tsId, request, gaps) in enumerate(cachedRequests) :
+			for j, gap in enumerate(gaps) :
+				intervalRequest = self._intervalRequest_(request, gap[0], gap[1])
+				try:
+					ts_template = self._buildTimeSeriesTemplate_(intervalRequest)
+				except DataSetIllegalArgumentException as e:
+					logger.error("Illegal time series identifier %s: %s" % (tsId, e))
+					fetched[index][gap] = None
+					continue
+				if j == len(rounds) :
+					rounds.append([])
+				rounds[j].append((index, gap, intervalRequest, ts_template))
+		for intervals in rounds :
+			for i in range(0, len(intervals), batchSize) :
+				batch = intervals[i:i+batchSize]
+				ts_templates = ArrayList()
+				for index, gap, intervalRequest, ts_template in batch :
+					ts_templates.add(ts_template)
+				failed = False
+				dak = self._factory.getDataAccessKey("getTimeSeriesContainers")
+				try:
+					time_series_map = self._retrieveTimeSeriesMap_(dak, ts_templates, batch[0][2])
+					for index, gap, intervalRequest, ts_template in batch :
+						time_series = None
+						if time_series_map is not None:
+							time_series = time_series_map.get(ts_template)
+						fetched[index][gap] = None if time_series is None else self._toPoints_(time_series)
+				except DbIoException as e:
+					logger.exception("Error getting TimeSeriesContainers")
+					failed = True
+				except Exception as e:
+					logger.exception ('Undefined error')
+					failed = True
+				finally:
+					dak.close()
+				if failed :
+					#-------------------------------------------------#
+					# retrieve the intervals of the batch one by one, #
+					# keeping the error of those that still fail      #
+					#-------------------------------------------------#
+					for index, gap, intervalRequest, ts_template in batch :
+						dak = self._factory.getDataAccessKey("getTimeSeriesContainer")
+						try:
+							time_series_map = self._retrieveTimeSeriesMap_(dak, Collections.singletonList(ts_template), intervalRequest)
+							time_series = None
+							if time_series_map is not None:
+								time_series = time_series_map.get(ts_template)
+							fetched[index][gap] = None if time_series is None else self._toPoints_(time_series)
+						except:
+							fetched[index][gap] = sys.exc_info()[1]
+						finally:
+							dak.close()
+		return fetched
+
+	@_counted
+	def ref(self, tsId, startTimeStr=None, endTimeStr=None, units=None) :
+		'''
+		Declare a time series read without making it and return a TimeSeriesRef handle. The time
+		window (the default window if not specified) is fixed when the handle is created. The
+		first time the values of any pending handle are needed, all pending handles are read in
+		batched getTimeSeriesContainers() calls, one set of calls per time window
+		'''
+		if (not startTimeStr) != (not endTimeStr) :
+			raise ValueError("Start time and end time must be specified together")
+		self.lock()
+		try :
+			if not startTimeStr :
+				startTimeStr, endTimeStr = self._startTimeStr, self._endTimeStr
+			if not startTimeStr :
+				raise ValueError("No default or explicit time window")
+			handle = TimeSeriesRef(self, tsId, startTimeStr, endTimeStr, units)
+			self._pendingRefs.append(handle)
+		finally :
+			self.unlock()
+		return handle
+
+	@_counted
+	def getPendingRefCount(self) :
+		'''
+		Get the number of TimeSeriesRef handles that have not been read yet
+		'''
+		return len(self._pendingRefs)
+
+	@_timed
+	def _resolveRefs_(self, target=None) :
+		'''
+		Read all pending TimeSeriesRef handles, and the target handle if it is not resolved,
+		grouped by time window, and resolve them
+		'''
+		refLock = self._refLock
+		refLock.acquire()
+		try :
+			self.lock()
+			try :
+				handles = self._pendingRefs
+				self._pendingRefs = []
+			finally :
+				self.unlock()
+			if target is not None and not target._resolved and target not in handles :
+				handles.append(target)
+			#------------------------------------------------------------#
+			# one set of calls per window; the same id with other units  #
+			# in the same window goes into a later set of calls          #
+			#------------------------------------------------------------#
+			groups = collections.OrderedDict()
+			for handle in handles :
+				passes = groups.setdefault((handle._startTimeStr, handle._endTimeStr), [])
+				for handlesById in passes :
+					if handle._tsId not in handlesById or handlesById[handle._tsId][0]._units == handle._units :
+						break
+				else :
+					handlesById = collections.OrderedDict()
+					passes.append(handlesById)
+				handlesById.setdefault(handle._tsId, []).append(handle)
+			for (startTimeStr, endTimeStr), passes in groups.items() :
+				for handlesById in passes :
+					units = dict([(tsId, idHandles[0]._units) for tsId, idHandles in handlesById.items()])
+					try :
+						results = self.getTimeSeriesContainers(list(handlesById.keys()), startTimeStr, endTimeStr, units)
+						error = None
+					except :
+						results = {}
+						error = sys.exc_info()[1]
+					for tsId, idHandles in handlesById.items() :
+						for handle in idHandles :
+							handle._tsc = results.get(tsId)
+							handle._error = error
+							handle._resolved = True
+		finally :
+			refLock.release()
+
+	@_timed
+	def getValuesAt(
+			self,
+			tsIds,
+			instants,
+			policy = "exact",
+			units = None,
+			timeZone = None,
+			versionDate = None,
+			maxVersion = None,
+			officeId = None,
+			withTimes = False) :
+		'''
+		Read only the values of many time series at a few instants. Returns a dictionary keyed by
+		time series id of lists with one entry per instant: the value (None if missing), or
+		(time, value, quality) if withTimes is True, where the time is in milliseconds with the
+		wall clock time of the time zone treated as UTC. The policy "exact", "previous" or "next"
+		selects the sample at, at or before, or at or after each instant.
+
+		Each instant is one batched CwmsTimeSeriesDao call for all the ids over a zero-length
+		window, so only the selected samples are transferred.
+		'''
+		if isinstance(tsIds, basestring) :
+			tsIds = [tsIds]
+		if isinstance(instants, basestring) :
+			instants = [instants]
+		if policy not in DataCache.SAMPLE_POLICIES :
+			raise ValueError("Policy must be one of %s" % ", ".join(DataCache.SAMPLE_POLICIES))
+		uniqueIds = []
+		for tsId in tsIds :
+			if tsId not in uniqueIds :
+				uniqueIds.append(tsId)
+		results = dict([(tsId, []) for tsId in uniqueIds])
+		for instant in instants :
+			instantStr = instant.replace(":", "").replace(",", "")
+			instantTime = Date(RMAIO.parseDate(instantStr, self._utcTimeZone)).getTime()
+			tscs = self.getTimeSeriesContainers(
+				uniqueIds,
+				instant,
+				instant,
+				units,
+				timeZone,
+				False,
+				True,
+				True,
+				policy == "previous",
+				policy == "next",
+				versionDate,
+				maxVersion,
+				officeId)
+			for tsId in uniqueIds :
+				tsc = tscs.get(tsId)
+				sample = None
+				if tsc is not None and tsc.numberValues > 0 :
+					times = DBAPI.getTimesInMillis(tsc)
+					i = DataCache.selectSampleAt(times, instantTime, policy)
+					if i is not None :
+						value = tsc.values[i]
+						if isUndefined(value) :
+							value = None
+						quality = tsc.quality[i] if tsc.quality is not None else 0
+						sample = (times[i], value, quality) if withTimes else value
+				results[tsId].append(sample)
+		return results
+
+	@_timed
+	def getTimeSeriesVersions(
+			self,
+			tsId,
+			startTimeStr = None,
+			endTimeStr = None,
+			versionDates = None,
+			units = None,
+			timeZone = None,
+			trim = None,
+			startInclusive = None,
+			endInclusive = None,
+			officeId = None,
+			maxWorkers = WorkerPool.DEFAULT_MAX_WORKERS) :
+		'''
+		Read several versions of a versioned time-series over the same time window. Returns an
+		ordered dictionary of TimeSeriesContainer objects (None for versions that could not be
+		retrieved) keyed by version date in the order of versionDates.
+
+		The version dates must be listed, since the time series DAO cannot enumerate them. The
+		versions are retrieved in parallel on up to maxWorkers threads, and through the in-memory
+		cache if it is enabled.
+		'''
+		if versionDates is None :
+			raise ValueError("Version dates must be specified")
+		if isinstance(versionDates, basestring) :
+			versionDates = [versionDates]
+		cache = self._tsCache
+		results = collections.OrderedDict([(versionDate, None) for versionDate in versionDates])
+		requests = []
+		for versionDate in versionDates :
+			request = self._resolveTimeSeriesRequest_(
+				tsId,
+				startTimeStr,
+				endTimeStr,
+				units,
+				timeZone,
+				trim,
+				startInclusive,
+				endInclusive,
+				False,
+				False,
+				versionDate,
+				False,
+				officeId)
+			if cache is not None :
+				tsc = cache.get(DataCache.timeSeriesKey(request))
+				if tsc is not None :
+					results[versionDate] = tsc
+					continue
+			requests.append((versionDate, request))
+		if not requests :
+			return results
+
+		locked = self._readLock_()
+		try:
+			pool = WorkerPool.WorkerPool(min(int(maxWorkers), len(requests)), "getTimeSeriesVersions")
+			try :
+				futures = [pool.submit(self._retrieveTimeSeriesContainer_, request) for versionDate, request in requests]
+				retrieved = WorkerPool.waitAll(futures)
+			finally :
+				pool.shutdown(False)
+		finally:
+			self._readUnlock_(locked)
+		for (versionDate, request), tsc in zip(requests, retrieved) :
+			if tsc is None :
+				continue
+			if not isinstance(tsc, TimeSeriesContainer) :
+				logger.warning("Error retrieving version %s of %s: %s" % (versionDate, tsId, tsc))
+				continue
+			if cache is not None :
+				cache.put(DataCache.timeSeriesKey(request), tsc)
+			results[versionDate] = tsc
+		return results
+
 	@_timed
-	def getTimeSeriesContainer(
+	def putTimeSeriesContainer(
 			self,
-			tsId,
-			startTimeStr = None,
-			endTimeStr = None,
+			object,
 			units = None,
 			timeZone = None,
-			trim = None,
-			startInclusive = None,
-			endInclusive = None,
-			getPrevious = None,
-			getNext = None,
+			storeRule = None,
+			overrideProtection = None,
 			versionDate = None,
-			maxVersion = None,
 			officeId = None) :
 		'''
-		Read a time-series from the database and return it in a TimeSeriesContainer object.
+		Write a TimeSeriesContainer object to the database.
 		'''
+		#---------------------------------------#
+		# sanity checks and data initialization #
+		#---------------------------------------#
+		if not self.canWrite() :
+			raise Exception("Cannot write to database %s" % conn.getMetaData().getURL())
+		tsc, storeRule, overrideProtection, officeId = self._prepareTimeSeriesPut_(
+			object,
+			units,
+			timeZone,
+			storeRule,
+			overrideProtection,
+			versionDate,
+			officeId)
+		if self._storeChangedOnly :
+			request = self._storedValuesRequest_(tsc, officeId)
+			if request is not None :
+				tsc = self._changedTimeSeriesContainer_(tsc, self._retrieveTimeSeriesContainer_(request), storeRule, overrideProtection)
+				if tsc is None : return
 		
-		#----------------------------#
-		# get data from the database #
-		#----------------------------#
-		tsc = None
 		self.lock()
-		try:
-			#----------------------#
-			# handle the arguments #
-			#----------------------#
-			if (not startTimeStr) != (not endTimeStr):
-				raise ValueError("Start time and end time must be specified together")
-			if not startTimeStr:
-				startTimeStr = self._startTimeStr
-			if not endTimeStr:
-				endTimeStr = self._endTimeStr
-			if not startTimeStr or not endTimeStr:
-				raise ValueError("No default or explicit time window")
-			if not units:
-				unitSystem = self._unitSystem[:2].upper()
-				tsParts = tsId.split(".")
-				parameter = None
-				if tsParts and len(tsParts) > 1:
-					parameter = tsParts[1]
-					
-				if parameter:
-					parameter_units = self._getParameterUnits_()
-					if parameter_units and unitSystem in parameter_units:
-						parameters_in_units = parameter_units[unitSystem]
-						if parameter in parameters_in_units:
-							units = parameters_in_units[parameter]
-						else:
-							logger.warning("Parameter %s not found in units %s." % (parameter, unitSystem))
-					else:
-						logger.warning("Parameter units not found for unit system %s." % unitSystem)
-			if timeZone is not None:
-				timeZone = TimeZone.getTimeZone(timeZone)
-			else:
-				timeZone = self._timeZone
-			if trim is not None:
-				trim = bool(trim)
-			else:
-				trim = self._trim
-			if startInclusive is not None:
-				startTimeInclusive = bool(startInclusive)
-			else:
-				startTimeInclusive = self._startTimeInclusive
-			if endInclusive is not None:
-				endTimeInclusive = bool(endInclusive)
-			else:
-				endTimeInclusive = self._endTimeInclusive
-			if getPrevious is not None:
-				getPrevious = bool(getPrevious)
-			else:
-				getPrevious = self._getPrevious
-			if getNext is not None:
-				getNext = bool(getNext)
-			else:
-				getNext = self._getNext
-			if versionDate is None:
-				versionTimeStr = self._versionDate
-			else:
-				versionTimeStr = versionDate
-			if maxVersion is not None:
-				maxVersion = bool(maxVersion)
-			else:
-				maxVersion = self._maxVersion
-			if officeId is not None:
-				officeId = officeId.upper()
-			else:
-				officeId = self.getOfficeId()
-			startTimeStr = startTimeStr.replace(":", "").replace(",", "")
-			endTimeStr = endTimeStr.replace(":", "").replace(",", "")
-			
-			
-			locationIdTz = timeZone.toZoneId()
-			if IS_CPYTHON:
-				ts_id = TimeSeriesIdentifierFactory.from_(OfficeId(officeId), tsId, locationIdTz)
-			else:
-				ts_id = getattr(TimeSeriesIdentifierFactory, "from")(OfficeId(officeId), tsId, locationIdTz)
-			startTime = Date(RMAIO.parseDate(startTimeStr, self._utcTimeZone)).getTime()
-			endTime = Date(RMAIO.parseDate(endTimeStr, self._utcTimeZone)).getTime()
-			
-			ts_template = TimeSeriesTemplate(ts_id, startTime, endTime, Units(units))
+		try :
 			db_conn = self._factory.getDbConnection()
 			ts_dao = CwmsDaoServiceLookup.getDao(CwmsTimeSeriesDao, db_conn)
-			
-			dak = self._factory.getDataAccessKey("getTimeSeriesContainer")
-			try:
-				ts_templates = Collections.singletonList(ts_template)
-				ht = HecTime(HecTime.SECOND_INCREMENT)
-				ht.set(versionTimeStr)
-				if IS_CPYTHON:
-					versionTimestamp = Timestamp.from_(ht.getInstant(ZoneId.of("UTC")))
-				else:
-					versionTimestamp = getattr(Timestamp, "from")(ht.getInstant(ZoneId.of("UTC")))
-				
-				time_series = None
-				# time_series_map is like: Map<TimeSeriesTemplate, TimeSeries>
-				logger.debug("Calling CwmsTimeSeriesDao.retrieveTimeSeries with: dak: {}, "
-				             "ts_templates: {}, startTimeInclusive: {}, endTimeInclusive: {}, "
-				             "getPrevious: {}, getNext: {}, versionTimestamp: {}, "
-				             "maxVersion: {}, trim: {}"
-				             .format(dak, ts_templates, startTimeInclusive, endTimeInclusive,
-				                     getPrevious, getNext, versionTimestamp, maxVersion, trim))
-				time_series_map = ts_dao.retrieveTimeSeries(dak, ts_templates, startTimeInclusive,
-				        endTimeInclusive, getPrevious, getNext, versionTimestamp, maxVersion, trim)
-				if time_series_map is None:
-					logger.warning("No time series found for ts_templates: {}, startTimeInclusive: {}, "
-					            "endTimeInclusive: {}, getPrevious: {}, getNext: {}, "
-					            "versionTimestamp: {}, maxVersion: {}, trim: {}"
-					            .format(ts_templates, startTimeInclusive, endTimeInclusive,
-					                    getPrevious, getNext, versionTimestamp, maxVersion, trim))
-				else:
-					time_series = time_series_map.get(ts_template)
-					if time_series is None:
-						logger.warning("TimeSeries for ts_template: {} not found in time_series_map: {}"
-						            .format(ts_template, time_series_map))
-					
-				if time_series is not None:
-					dstx = DataSetTx(time_series)
-					tsc = dstx.getTimeSeriesContainer()
-					fromTimezone = TimeZone.getTimeZone(tsc.timeZoneID)
-					
-					if not timeZone.equals(fromTimezone):
-						logger.warning("Converting time zone from %s to %s" % (fromTimezone.getID(), timeZone.getID()))
-						tsc.convertTimeZone(timeZone)
-				
-			except DbIoException as e:
-				logger.exception("Error getting TimeSeriesContainer")
-			except Exception as e:
-				logger.exception ('Undefined error')
-# 				traceback.print_exc(e)
-			finally:
-				dak.close()
-		except DataSetIllegalArgumentException as e:
-			raise Exception("Illegal Argument", e)
+			dak = self._factory.getDataAccessKey("putTimeSeriesContainer")
+			self._storeTimeSeries_(ts_dao, dak, tsc, storeRule, overrideProtection, officeId)
 		finally:
 			self.unlock()
-			
-		return tsc
-	
+		self._updateCatalog_("ts", tsc.fullName)
+		
 	@_timed
-	def putTimeSeriesContainer(
+	def putTimeSeriesContainers(
 			self,
-			object,
+			tscs,
 			units = None,
 			timeZone = None,
 			storeRule = None,
 			overrideProtection = None,
 			versionDate = None,
-			officeId = None) :
+			officeId = None,
+			maxWorkers = WorkerPool.DEFAULT_MAX_WORKERS) :
 		'''
-		Write a TimeSeriesContainer object to the database.
+		Write a list of TimeSeriesContainer objects to the database. All of the series are stored
+		through one DAO and data access key instead of one per series. units may be a single unit
+		for all series or a dictionary keyed by time series id.
+
+		Returns an ordered dictionary keyed by time series id of None for each series stored and
+		the error message for each series that failed. A failure does not stop the others. If
+		only changed values are stored, the stored values are read on up to maxWorkers threads.
 		'''
-		#---------------------------------------#
-		# sanity checks and data initialization #
-		#---------------------------------------#
 		if not self.canWrite() :
-			raise Exception("Cannot write to database %s" % conn.getMetaData().getURL())
-			
+			raise Exception("Cannot write to database %s" % self._url)
+		results = collections.OrderedDict()
+		prepared = []
+		for tsc in tscs :
+			tsId = getattr(tsc, "fullName", None) or str(tsc)
+			try :
+				seriesUnits = units.get(tsId) if isinstance(units, dict) else units
+				prepared.append(self._prepareTimeSeriesPut_(
+					tsc,
+					seriesUnits,
+					timeZone,
+					storeRule,
+					overrideProtection,
+					versionDate,
+					officeId))
+				results[tsId] = None
+			except :
+				results[tsId] = str(sys.exc_info()[1])
+		if prepared and self._storeChangedOnly :
+			#---------------------------------------------------#
+			# series with nothing to change are already current #
+			#---------------------------------------------------#
+			requests = [self._storedValuesRequest_(put[0], put[3]) for put in prepared]
+			locked = self._readLock_()
+			try:
+				pool = WorkerPool.WorkerPool(min(int(maxWorkers), len(prepared)), "putTimeSeriesContainers")
+				try :
+					futures = [pool.submit(self._retrieveTimeSeriesContainer_, request) for request in requests if request is not None]
+					retrieved = WorkerPool.waitAll(futures)
+				finally :
+					pool.shutdown(False)
+			finally:
+				self._readUnlock_(locked)
+			retrieved = iter(retrieved)
+			reduced = []
+			for put, request in zip(prepared, requests) :
+				tsc, seriesStoreRule, seriesOverrideProtection, seriesOfficeId = put
+				if request is not None :
+					existing = next(retrieved)
+					if isinstance(existing, TimeSeriesContainer) :
+						tsc = self._changedTimeSeriesContainer_(tsc, existing, seriesStoreRule, seriesOverrideProtection)
+						if tsc is None : continue
+				reduced.append((tsc, seriesStoreRule, seriesOverrideProtection, seriesOfficeId))
+			prepared = reduced
+		if not prepared :
+			return results
+		
+		stored = []
+		self.lock()
+		try :
+			db_conn = self._factory.getDbConnection()
+			ts_dao = CwmsDaoServiceLookup.getDao(CwmsTimeSeriesDao, db_conn)
+			dak = self._factory.getDataAccessKey("putTimeSeriesContainers")
+			for tsc, seriesStoreRule, seriesOverrideProtection, seriesOfficeId in prepared :
+				try :
+					self._storeTimeSeries_(ts_dao, dak, tsc, seriesStoreRule, seriesOverrideProtection, seriesOfficeId)
+					stored.append(tsc.fullName)
+				except :
+					results[tsc.fullName] = str(sys.exc_info()[1])
+		finally:
+			self.unlock()
+		for tsId in stored :
+			self._updateCatalog_("ts", tsId)
+		for tsId, error in results.items() :
+			if error is not None :
+				logger.warning("Error storing %s: %s" % (tsId, error))
+		return results
+		
+	def _prepareTimeSeriesPut_(self, object, units, timeZone, storeRule, overrideProtection, versionDate, officeId) :
+		'''
+		Check a TimeSeriesContainer object and its store parameters. Returns the container and
+		the store rule, override protection and office to store it with.
+		'''
 		if not isinstance(object, TimeSeriesContainer) :
 			raise ValueError("Expected TimeSeriesContainer, got %s." % object.__class__.__name__)
 		tsc = object
@@ -1396,55 +2970,133 @@ def putTimeSeriesContainer(
 		if not storeRule : storeRule = self._storeRule
 		if not overrideProtection : overrideProtection = self._overrideProtection
 		if not officeId : officeId = self._officeId
+		return tsc, storeRule, overrideProtection, officeId
+		
+	def _storedValuesRequest_(self, tsc, officeId) :
+		'''
+		Return the resolved request for the values already stored in the time window of a
+		container, or None if the container is empty or has no time zone to compare times in.
+		'''
+		if not tsc.numberValues or not tsc.timeZoneID :
+			return None
+		t = HecTime()
+		t.set(tsc.times[0])
+		startTimeStr = t.dateAndTime(4)
+		t.set(tsc.times[tsc.numberValues - 1])
+		endTimeStr = t.dateAndTime(4)
+		return self._resolveTimeSeriesRequest_(
+			tsc.fullName,
+			startTimeStr,
+			endTimeStr,
+			tsc.units,
+			tsc.timeZoneID,
+			False,
+			True,
+			True,
+			False,
+			False,
+			None,
+			None,
+			officeId)
 		
+	def _changedTimeSeriesContainer_(self, tsc, existing, storeRule, overrideProtection) :
+		'''
+		Return the container reduced to the span of values that storing it would change given the
+		stored values in existing, or None if storing it would change nothing. The values in the
+		span that would not change are sent again as they are, which the store rules leave as
+		stored. If the stored values could not be read, the container is returned as is.
+		'''
+		if existing is None :
+			return tsc
+		undefined = lambda values : [None if DBAPI.isUndefined(value) else value for value in values]
+		qualities = lambda container : list(container.quality) if container.quality else [0] * container.numberValues
+		times = list(tsc.times)
+		changed = DataCache.changedPoints(
+			times,
+			undefined(tsc.values),
+			qualities(tsc),
+			(list(existing.times), undefined(existing.values), qualities(existing)),
+			storeRule,
+			overrideProtection)[0]
+		if not changed :
+			return None
+		first, last = times.index(changed[0]), times.index(changed[-1]) + 1
+		if first == 0 and last == tsc.numberValues :
+			return tsc
+		span = tsc.clone()
+		span.times = tsc.times[first:last]
+		span.values = tsc.values[first:last]
+		if tsc.quality : span.quality = tsc.quality[first:last]
+		span.numberValues = last - first
+		span.startTime = span.times[0]
+		span.endTime = span.times[-1]
+		return span
+		
+	def _storeTimeSeries_(self, ts_dao, dak, tsc, storeRule, overrideProtection, officeId) :
+		'''
+		Store a checked TimeSeriesContainer object through a time series DAO. The caller holds
+		the client lock.
+		'''
 		description_tx = DescriptionTx(officeId, tsc.getFullName())
 		dataset_tx = DataSetTx(tsc, description_tx)
 		
-		self.lock()
-		try :
-			db_conn = self._factory.getDbConnection()
-			ts_dao = CwmsDaoServiceLookup.getDao(CwmsTimeSeriesDao, db_conn)
-			dak = self._factory.getDataAccessKey("putTimeSeriesContainer")
-			
-			# Need a TimeSeries - build one
-			time_series = dataset_tx.getTimeSeries()
-			
-			# ts_dao method like:
-			# Timestamp storeTimeSeries(DataAccessKey dataAccessKey, TimeSeries dataset, int storeRule, boolean overrideProtection)
-			storeRuleInt = Const.getRuleNumber(storeRule)
-			ts_dao.storeTimeSeries(dak, time_series, storeRuleInt, bool(overrideProtection))
+		# Need a TimeSeries - build one
+		time_series = dataset_tx.getTimeSeries()
 		
-		finally:
-			self.unlock()
+		# ts_dao method like:
+		# Timestamp storeTimeSeries(DataAccessKey dataAccessKey, TimeSeries dataset, int storeRule, boolean overrideProtection)
+		storeRuleInt = Const.getRuleNumber(storeRule)
+		ts_dao.storeTimeSeries(dak, time_series, storeRuleInt, bool(overrideProtection))
+		self._invalidateCache_(tsc.fullName, officeId)
 		
-	@_timed
 	def _getParameterUnits_(self) :
 		'''
-		returns the _parameterUnits field, populating if necessary
+		returns the _parameterUnits field, populating if necessary. The table is loaded without
+		holding the client lock, so a background bootstrap load does not block other calls
 		'''
-		self.lock()
-		try :
-			if self._parameterUnits is None :
-				
-				try:
-					param_dict = self._fetch_and_load_csv()
-					self._setParameterUnits_(param_dict)
-				
-				except urllib2.HTTPError as e:
-					logger.exception("HTTPError code:%s"% str( e.code))
-				except urllib2.URLError as e:
-					logger.exception("URLError reason:%s"% str( e.reason))
-				except Exception as e:
-					logger.exception ('Undefined error") # %s %s'% e, traceback.format_exc())
-				
-			return self._parameterUnits
-		finally :
-			self.unlock()
+		self._awaitBootstrap_("units")
+		if self._parameterUnits is None :
+			
+			try:
+				param_dict = DataCache.getUnitsRegistry().getTable(self._getUnitsScope_(), self._fetch_and_load_csv)
+				self._setParameterUnits_(param_dict)
+			
+			except urllib2.HTTPError as e:
+				logger.exception("HTTPError code:%s"% str( e.code))
+			except urllib2.URLError as e:
+				logger.exception("URLError reason:%s"% str( e.reason))
+			except Exception as e:
+				logger.exception ('Undefined error") # %s %s'% e, traceback.format_exc())
+			
+		return self._parameterUnits
 	
-	@_timed
 	def _setParameterUnits_(self, param_dict):
 		self._parameterUnits = param_dict
 	
+	def _getUnitsScope_(self) :
+		'''
+		Return the scope of this server's parameter units in the shared units registry
+		'''
+		return "CDA %s" % self._url
+	
+	@_timed
+	def preloadParameterUnits(self, names=None) :
+		'''
+		Load the parameter units table into the process-wide registry ahead of the first
+		retrieval. names may list the parameters or time series ids a report will use; any that
+		have no units in the current unit system are logged. Returns the names without units.
+		'''
+		self._getParameterUnits_()
+		missing = []
+		for name in names or [] :
+			try :
+				self.unitsForParameter(DataCache.parameterOf(name))
+			except Exception :
+				missing.append(name)
+		if missing :
+			logger.warning("No %s units for: %s" % (self._unitSystem, ", ".join(missing)))
+		return missing
+	
 	@_timed
 	def _fetch_and_load_json(self):
 		url = self._url + "parameters?format=json"
@@ -1505,7 +3157,6 @@ def _build_param_dict_from_ParameterLookup(self):
 		
 		return retval
 	
-	@_timed
 	def unitsForParameter(self, parameter) :
 		units = None
 		unit_system_id = self._unitSystem[:2].upper()  # EN or SI
@@ -1549,31 +3200,135 @@ def getCatalogedPathnames_1(self, pattern) :
 		pathnameList = []
 		if not isinstance(pattern, basestring):
 			raise TypeError('Pattern for getCatalogedPathnames must be a string')
-		self.lock()
 		try:
-			dak = self._factory.getDataAccessKey("getCatalogedPathnames_1")
-			try:
-				ts_ids = self.getTimeSeriesCatalogIds(dak, pattern, self.getOfficeId())
-				if ts_ids is not None:
-					pathnameList.extend(ts_ids)
-				
-				# Need to also try rating catalog.
-				rating_ids = self.getRatingCatalogIds(dak, pattern, self.getOfficeId())
-				if rating_ids is not None:
-					pathnameList.extend(rating_ids)
+			pathnameList.extend(self._getCatalogIndex_("ts").match(pattern))
 			
-			except DbIoException as e:
-				logger.exception('DbIoException getting Catalog paths matching %s'% pattern)
-			except Exception as e:
-				logger.exception ('Undefined error')
-				# traceback.print_exc(e)
-			finally:
-				dak.close()
-		finally:
-			self.unlock()
+			# Need to also try rating catalog.
+			pathnameList.extend(self._getCatalogIndex_("rating").match(pattern))
+		
+		except DbIoException as e:
+			logger.exception('DbIoException getting Catalog paths matching %s'% pattern)
+		except Exception as e:
+			logger.exception ('Undefined error')
+			# traceback.print_exc(e)
 		
 		return pathnameList
 	
+	def _getCatalogIndex_(self, kind) :
+		'''
+		Return the time series ("ts") or rating ("rating") catalog snapshot, loading it if it has
+		not been loaded or has expired
+		'''
+		self._awaitBootstrap_("catalog")
+		self._catalogLock.acquire()
+		try:
+			index = self._catalogs.get(kind)
+			if index is None or index.isExpired():
+				officeId = self.getOfficeId()
+				locked = self._readLock_()
+				try:
+					dak = self._factory.getDataAccessKey("getCatalogedPathnames_1")
+					try:
+						if kind == "ts":
+							ids = self.getTimeSeriesCatalogIds(dak, "*", officeId)
+						else:
+							ids = self.getRatingCatalogIds(dak, "*", officeId)
+					finally:
+						dak.close()
+				finally:
+					self._readUnlock_(locked)
+				index = DataCache.CatalogIndex(ids or [], self.getCatalogTtl())
+				self._catalogs[kind] = index
+				logger.debug("Loaded %s catalog snapshot with %d identifiers" % (kind, len(index)))
+			return index
+		finally:
+			self._catalogLock.release()
+	
+	def _getLoadedCatalogIndex_(self, kind) :
+		'''
+		Return the catalog snapshot of a kind if it is loaded and current, without loading it
+		'''
+		self._catalogLock.acquire()
+		try :
+			index = self._catalogs.get(kind)
+			if index is None or index.isExpired() :
+				return None
+			return index
+		finally :
+			self._catalogLock.release()
+	
+	def _updateCatalog_(self, kind, id=None, added=True) :
+		'''
+		Keep a loaded catalog snapshot current after a store or delete. If no id is given the
+		snapshot is discarded
+		'''
+		if id is not None and added :
+			self._missingCache.remove((self.getOfficeId(), id.upper()))
+		self._catalogLock.acquire()
+		try:
+			index = self._catalogs.get(kind)
+			if index is None:
+				return
+			if id is None:
+				del self._catalogs[kind]
+			elif added:
+				index.add(id)
+			else:
+				index.remove(id)
+		finally:
+			self._catalogLock.release()
+	
+	@_counted
+	def setCatalogTtl(self, seconds) :
+		'''
+		Set the number of seconds a catalog snapshot is used before it is reloaded (None for the
+		whole session)
+		'''
+		self.lock()
+		try     : self._catalogTtl = seconds
+		finally : self.unlock()
+	
+	@_counted
+	def getCatalogTtl(self) :
+		'''
+		Get the number of seconds a catalog snapshot is used before it is reloaded
+		'''
+		self.lock()
+		try     : return self._catalogTtl
+		finally : self.unlock()
+	
+	@_timed
+	def refreshCatalog(self) :
+		'''
+		Discard the catalog snapshots so the next catalog call reloads them
+		'''
+		self._catalogLock.acquire()
+		try     : self._catalogs.clear()
+		finally : self._catalogLock.release()
+	
+	def exists(self, id) :
+		'''
+		Return whether a time series or rating identifier is in the catalog. Only the time series
+		or the rating catalog snapshot is consulted, depending on the form of the identifier
+		'''
+		if isRatingId(id):
+			return self._getCatalogIndex_("rating").exists(id)
+		return self._getCatalogIndex_("ts").exists(id)
+	
+	@_timed
+	def getCatalogedTimeSeriesIds(self, pattern="*") :
+		'''
+		Returns the time series identifiers in the catalog that match the specified glob pattern
+		'''
+		return self._getCatalogIndex_("ts").match(pattern)
+	
+	@_timed
+	def getCatalogedRatingIds(self, pattern="*") :
+		'''
+		Returns the rating identifiers in the catalog that match the specified glob pattern
+		'''
+		return self._getCatalogIndex_("rating").match(pattern)
+	
 	@_timed
 	def getTimeSeriesCatalogIds(self, dak, pattern, officeId=None):
 		retval = []
@@ -1627,8 +3382,9 @@ def getCatalogedPathnames_2(self, forceNew) :
 		'''
 		Returns the current catalog
 
-		NOTE: forceNew is now obsolete
+		NOTE: forceNew reloads the catalog snapshot
 		'''
+		if forceNew : self.refreshCatalog()
 		return self.getCatalogedPathnames_1('*')
 	
 	@_timed
@@ -1638,8 +3394,9 @@ def getCatalogedPathnames_3(self, pattern, forceNew) :
 
 		NOTE: pattern must use glob chars (*, ?) and not SQL chars (% ,_)
 
-		NOTE: forceNew is now obsolete
+		NOTE: forceNew reloads the catalog snapshot
 		'''
+		if forceNew : self.refreshCatalog()
 		return self.getCatalogedPathnames_1(pattern)
 
 	@_timed
@@ -1691,7 +3448,7 @@ def _getTimeSeriesExtents_(self, tsId) :
 		'''
 		Returns the time series extents for a time series id
 		'''
-		self.lock()
+		locked = self._readLock_()
 		
 		try :
 			db_conn = self._factory.getDbConnection()
@@ -1713,7 +3470,7 @@ def _getTimeSeriesExtents_(self, tsId) :
 			return \
 				startDate.getTime(), endDate.getTime()
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
 	
 	@_timed
 	def getPathnameList(self) :
@@ -1758,8 +3515,13 @@ def get_2(self, id, getEntireTimeWindow=False, units=None) :
 	@_timed
 	def get(self, *args, **kwargs) :
 		'''
-		Overloader for get_? methods
+		Overloader for get_? methods. With missing='none', behaves as getIfExists()
 		'''
+		missing = kwargs.pop('missing', 'raise')
+		if missing == 'none' :
+			return self.getIfExists(*args, **kwargs)
+		if missing != 'raise' :
+			raise ValueError("missing must be 'raise' or 'none'")
 		count = len(args) + len(kwargs)
 		meth = None
 		if   count == 1 : meth = self.get_1
@@ -1769,12 +3531,54 @@ def get(self, *args, **kwargs) :
 			if len(args) > 1 :
 				meth = (self.get_2, self.get_1)[isinstance(args[1], basestring)]
 			else :
-				meth = (self.get_1, self.get_2)[kwargs.has_key('getEntireTimeWindow')]
+				meth = (self.get_1, self.get_2)['getEntireTimeWindow' in kwargs]
 		if not meth :
 			raise TypeError('get() too many arguments; expected 2 to 5, got %d' % count + 1)
 		
 		return meth(*args, **kwargs)
 	
+	def getIfExists(self, *args, **kwargs) :
+		'''
+		Same as get(), but returns None instead of raising if the object does not exist.
+		Identifiers the server reports not to exist are remembered for a short time, and
+		identifiers absent from a loaded catalog snapshot are not requested at all. A read that
+		fails for any other reason is not remembered
+		'''
+		id = args[0] if args else kwargs.get('id')
+		key = (self.getOfficeId(), id.upper())
+		if self._missingCache.get(key) :
+			return None
+		index = self._getLoadedCatalogIndex_(("rating", "ts")[isTsId(id)])
+		if index is not None and not index.exists(id) :
+			self._missingCache.put(key, True)
+			return None
+		#---------------------------------------------------------#
+		# the read paths flag a result of None that the server    #
+		# confirmed, as opposed to one that hides a failed read   #
+		#---------------------------------------------------------#
+		self._threadLocal.notFound = False
+		try :
+			result = self.get(*args, **kwargs)
+		except :
+			#---------------------------------------------------------#
+			# under Jython, java exceptions are not Python Exceptions #
+			#---------------------------------------------------------#
+			e = sys.exc_info()[1]
+			if not DBAPI.isNotFoundError(e) :
+				raise
+			self._threadLocal.notFound = True
+			result = None
+		if result is None and self._threadLocal.notFound :
+			self._missingCache.put(key, True)
+		return result
+	
+	@_counted
+	def clearMissingCache(self) :
+		'''
+		Forget the identifiers found not to exist by getIfExists()
+		'''
+		self._missingCache.clear()
+	
 	@_timed
 	def put(self, object, *args) :
 		if not self.canWrite() :
@@ -1871,16 +3675,17 @@ def _readRating_(self, loadMethodStr, ratingId, startTimeStr=None, endTimeStr=No
 		'''
 		Retrieves a rating from the database as a RatingSet object
 		'''
-		self.lock()
+		locked = self._readLock_()
 		try :
 			if (startTimeStr == None) != (endTimeStr == None) :
 				raise ValueException("Start time and end time must both be specified, or neither.")
 			if startTimeStr :
-				self._utcCal.setTimeInMillis(RMAIO.parseDate(startTimeStr, self._utcTimeZone))
-				startZDT = ZonedDateTime.ofInstant(self._utcCal.toInstant(), self._utcTimeZone.toZoneId())
+				utcCal = self._threadState_().utcCal
+				utcCal.setTimeInMillis(RMAIO.parseDate(startTimeStr, self._utcTimeZone))
+				startZDT = ZonedDateTime.ofInstant(utcCal.toInstant(), self._utcTimeZone.toZoneId())
 				
-				self._utcCal.setTimeInMillis(RMAIO.parseDate(endTimeStr, self._utcTimeZone))
-				endZDT = ZonedDateTime.ofInstant(self._utcCal.toInstant(), self._utcTimeZone.toZoneId())
+				utcCal.setTimeInMillis(RMAIO.parseDate(endTimeStr, self._utcTimeZone))
+				endZDT = ZonedDateTime.ofInstant(utcCal.toInstant(), self._utcTimeZone.toZoneId())
 				
 			else :
 				startZDT = None
@@ -1918,9 +3723,9 @@ def _readRating_(self, loadMethodStr, ratingId, startTimeStr=None, endTimeStr=No
 				logger.exception ('Undefined error getting rating %s'% ratingId)
 				
 		finally :
-			self.unlock()
+			self._readUnlock_(locked)
 		
-	@_timed
+	@_counted
 	def _build_rating_getOne_url_(self, ratingId, officeId=None):
 		url = None
 		try:
@@ -1940,7 +3745,7 @@ def _build_rating_getOne_url_(self, ratingId, officeId=None):
 			logger.exception ('Undefined error %s %s'% (e, traceback.format_exc()))
 		return url
 		
-	@_timed
+	@_counted
 	def _build_rating_getAll_url_(self, ratingId, startZDT, endZDT):
 		url = None
 		try:
@@ -2029,6 +3834,7 @@ def storeRating(self, object, fail_if_exists=None) :
 		# fyi CwmsRatingRadarDao wants failIfExists to be False and replace_base to be True
 		replace_base = True
 		rating_dao.storeRatingSet(dak, rating, fail_if_exists, replace_base)
+		self._updateCatalog_("rating")
 		
 	
 ##############################################################################
@@ -2040,7 +3846,17 @@ def open(*args, **kwargs) :
 	'''
 	return RadarAccess(*args, **kwargs)
 
-@_timed
+def aopen(*args, **kwargs) :
+	'''
+	Return a new asyncio facade over a RadarAccess object (CPython only). The maxConcurrency
+	keyword argument bounds the number of requests in flight; see AsyncRADARAPI.
+	'''
+	if not IS_CPYTHON :
+		raise NotImplementedError("aopen() requires CPython; use open() under Jython")
+	import AsyncRADARAPI
+	return AsyncRADARAPI.open(*args, **kwargs)
+
+@_counted
 def getVersion() :
 	'''
 	Returns the version of this module in the form "X.XX ddMMMyyyy"
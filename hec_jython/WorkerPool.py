@@ -0,0 +1,202 @@
+'''
+This module provides a small bounded thread pool for running independent
+DBAPI and RADARAPI requests in parallel. It uses only the Python threading
+module so that it behaves the same under Jython 2.7 and CPython (JPype).
+
+   pool = WorkerPool.WorkerPool(4)
+   future = pool.submit(db.get, tsId, startTime, endTime)
+   tsc = future.result()
+   pool.shutdown()
+
+Version History
+
+   22.1  18Oct2026   Original version
+
+'''
+
+import threading, time, sys
+
+try :
+	import Queue as queue
+except ImportError :
+	import queue
+
+DEFAULT_MAX_WORKERS = 4
+
+class Future :
+	'''
+	The pending result of a call submitted to a WorkerPool
+	'''
+	def __init__(self) :
+		self._done      = threading.Event()
+		self._result    = None
+		self._exception = None
+		self.elapsed    = None
+
+	def done(self) :
+		'''
+		Return whether the call has completed
+		'''
+		return self._done.is_set()
+
+	def _setResult_(self, result, exception, elapsed) :
+		self._result    = result
+		self._exception = exception
+		self.elapsed    = elapsed
+		self._done.set()
+
+	def exception(self, timeout=None) :
+		'''
+		Wait for the call to complete and return the exception it raised, or None
+		'''
+		if not self._done.wait(timeout) and not self._done.is_set() :
+			raise RuntimeError("Timed out waiting for result")
+		return self._exception
+
+	def result(self, timeout=None) :
+		'''
+		Wait for the call to complete and return its result, raising any exception it raised
+		'''
+		exception = self.exception(timeout)
+		if exception is not None :
+			raise exception
+		return self._result
+
+
+class WorkerPool :
+	'''
+	A fixed-size pool of daemon worker threads fed from a work queue. Threads are
+	started on demand, up to maxWorkers.
+	'''
+	def __init__(self, maxWorkers=DEFAULT_MAX_WORKERS, name="WorkerPool") :
+		maxWorkers = int(maxWorkers)
+		if maxWorkers < 1 :
+			raise ValueError("Maximum number of workers must be a positive integer")
+		self._maxWorkers = maxWorkers
+		self._name       = name
+		self._queue      = queue.Queue()
+		self._threads    = []
+		self._idle       = 0
+		self._pending    = 0
+		self._shutdown   = False
+		self._lock       = threading.Lock()
+
+	def getMaxWorkers(self) :
+		'''
+		Return the maximum number of worker threads
+		'''
+		return self._maxWorkers
+
+	def submit(self, func, *args, **kwargs) :
+		'''
+		Queue func(*args, **kwargs) for execution and return a Future for its result
+		'''
+		future = Future()
+		self._lock.acquire()
+		try :
+			if self._shutdown :
+				raise RuntimeError("Cannot submit to a pool that has been shut down")
+			self._queue.put((future, func, args, kwargs))
+			self._pending += 1
+			#-----------------------------------------------------#
+			# start a thread unless enough workers are waiting in #
+			# the queue for the work not yet taken                #
+			#-----------------------------------------------------#
+			if self._pending > self._idle and len(self._threads) < self._maxWorkers :
+				thread = threading.Thread(
+					target=self._work_,
+					name="%s-%d" % (self._name, len(self._threads) + 1))
+				thread.daemon = True
+				self._threads.append(thread)
+				thread.start()
+		finally :
+			self._lock.release()
+		return future
+
+	def map(self, func, items) :
+		'''
+		Submit func(item) for each item and return the list of Futures in the same order
+		'''
+		return [self.submit(func, item) for item in items]
+
+	def _work_(self) :
+		while True :
+			self._lock.acquire()
+			try     : self._idle += 1
+			finally : self._lock.release()
+			item = self._queue.get()
+			self._lock.acquire()
+			try :
+				self._idle -= 1
+				if item is not None :
+					self._pending -= 1
+			finally :
+				self._lock.release()
+			if item is None :
+				break
+			future, func, args, kwargs = item
+			t0 = time.time()
+			try :
+				result = func(*args, **kwargs)
+				future._setResult_(result, None, time.time() - t0)
+			except :
+				#---------------------------------------------------------#
+				# under Jython, java exceptions are not Python Exceptions #
+				#---------------------------------------------------------#
+				future._setResult_(None, sys.exc_info()[1], time.time() - t0)
+
+	def shutdown(self, wait=True, cancel=False) :
+		'''
+		Stop accepting work and let the worker threads exit once the queue is drained. If cancel
+		is True, work that has not started is dropped and its Futures raise RuntimeError. May be
+		called again to cancel or wait after the pool has been shut down
+		'''
+		self._lock.acquire()
+		try :
+			first = not self._shutdown
+			self._shutdown = True
+			threads = self._threads[:]
+		finally :
+			self._lock.release()
+		if cancel :
+			self._cancelQueued_()
+		if first :
+			for thread in threads :
+				self._queue.put(None)
+		if wait :
+			for thread in threads :
+				thread.join()
+
+	def _cancelQueued_(self) :
+		'''
+		Remove the work that has not started from the queue, keeping the stop markers
+		'''
+		stops = 0
+		while True :
+			try :
+				item = self._queue.get_nowait()
+			except queue.Empty :
+				break
+			if item is None :
+				stops += 1
+				continue
+			self._lock.acquire()
+			try     : self._pending -= 1
+			finally : self._lock.release()
+			item[0]._setResult_(None, RuntimeError("Cancelled"), 0.0)
+		for i in range(stops) :
+			self._queue.put(None)
+
+
+def waitAll(futures) :
+	'''
+	Wait for all futures and return their results, or the exceptions they raised, in order
+	'''
+	results = []
+	for future in futures :
+		exception = future.exception()
+		if exception is not None :
+			results.append(exception)
+		else :
+			results.append(future.result())
+	return results